@@ -0,0 +1,13 @@
+import os
+import sys
+
+# Add the package directory to sys.path, as the scripts do, so that extractor and model import
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        from server import main
+        main(sys.argv[2:])
+    else:
+        from cli import main
+        main()
@@ -0,0 +1,142 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from extractor.batch import ExtractionPool, warm_up, MODELS, CHUNKSIZE
+from extractor.transaction_extractor import FIELDS
+
+# Chunks read ahead per worker; at most this many windows of SMS are held at a time
+CHUNKS_PER_WORKER = 4
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+def open_input(path: str, newline: str = None) -> io.TextIOBase:
+    """Open a file, or stdin for "-", as UTF-8 text, unzipping it if it is gzip."""
+    raw = sys.stdin.buffer if path == "-" else open(path, "rb")
+    if not isinstance(raw, io.BufferedReader):
+        raw = io.BufferedReader(raw)
+    if raw.peek(2)[:2] == GZIP_MAGIC:
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline=newline)
+
+def input_format(path: str) -> str:
+    """Tell the format from the file name ("x.csv", "x.csv.gz"); stdin and anything else is JSONL."""
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+def read_records(stream, fmt: str, text_field: str = "text", sender_field: str = "sender",
+                 id_field: str = "id"):
+    """Yield one {"line", "text", "sender", "id"} dict per SMS in a JSONL or CSV stream, reading as it goes.
+
+    A JSONL line is either a JSON string, the SMS, or an object holding it
+    under text_field. A CSV has a header row naming its columns. A record
+    without text is reported on stderr and skipped; a sender that is not a
+    string ("sender": 7) is read as its text.
+    """
+    rows = csv.DictReader(stream) if fmt == "csv" else stream
+    for line, row in enumerate(rows, 1):
+        if fmt != "csv":
+            if not row.strip():
+                continue
+            try:
+                row = json.loads(row)
+            except ValueError:
+                row = None
+            if isinstance(row, str):
+                row = {text_field: row}
+        text = row.get(text_field) if isinstance(row, dict) else None
+        if not isinstance(text, str):
+            print(f"line {line}: no '{text_field}' found, skipped", file=sys.stderr)
+            continue
+        sender = row.get(sender_field)
+        if sender is not None and not isinstance(sender, str):
+            sender = str(sender)
+        yield {"line": line, "text": text, "sender": sender or None, "id": row.get(id_field)}
+
+def windows(records, size: int):
+    """Group records into lists of at most size."""
+    window = []
+    for record in records:
+        window.append(record)
+        if len(window) == size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+def process(records, workers: int = 1, chunksize: int = CHUNKSIZE, fields: tuple = None,
+            only_financial: bool = False, now: datetime = None):
+    """Classify and extract a stream of records, yielding one result dict per record, in order.
+
+    The records are read a window at a time. Each window is classified in one
+    call to the classifier, and the financial SMS in it are extracted on the
+    worker pool, which is started once for the stream. A result holds the line
+    (and id and sender, if given), "financial", and "details", which is None
+    for an SMS that is not financial.
+    """
+    warm_up(classifier=True)
+    classifier = MODELS["classifier"]
+    now = now or datetime.now()
+    with ExtractionPool(workers, chunksize) as pool:
+        for window in windows(records, max(workers, 1) * chunksize * CHUNKS_PER_WORKER):
+            financial = classifier.predict([record["text"] for record in window]) == 1
+            chosen = [record for record, is_financial in zip(window, financial) if is_financial]
+            details = iter(pool.extract([record["text"] for record in chosen], now,
+                                        [record["sender"] for record in chosen], fields=fields))
+            for record, is_financial in zip(window, financial):
+                if only_financial and not is_financial:
+                    continue
+                result = {"line": record["line"]}
+                for key in ("id", "sender"):
+                    if record[key] is not None:
+                        result[key] = record[key]
+                result["financial"] = bool(is_financial)
+                result["details"] = next(details) if is_financial else None
+                yield result
+
+def parse_fields(value: str) -> tuple:
+    fields = tuple(field.strip() for field in value.split(",") if field.strip())
+    for field in fields:
+        if field not in FIELDS:
+            raise argparse.ArgumentTypeError(f"unknown field '{field}' (choose from {', '.join(FIELDS)})")
+    return fields
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sms_transaction_detector",
+        description="Classify SMS from a JSONL or CSV dump (optionally gzip) and extract their "
+                    "transaction details, writing one JSON result per line.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, or - for stdin (the default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout (the default)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="input format; told from the file name by default")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for extraction")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="SMS sent to a worker at a time")
+    parser.add_argument("--fields", type=parse_fields, help=f"comma-separated fields to extract, out of {','.join(FIELDS)}")
+    parser.add_argument("--only-financial", action="store_true", help="write only the SMS classified as financial")
+    parser.add_argument("--text-field", default="text", help="the JSON key or CSV column of the SMS")
+    parser.add_argument("--sender-field", default="sender", help="the JSON key or CSV column of the sender ID")
+    parser.add_argument("--id-field", default="id", help="the JSON key or CSV column copied to the result")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunksize < 1:
+        parser.error("--workers and --chunksize must be at least 1")
+
+    fmt = args.format or input_format(args.input)
+    stream = open_input(args.input, newline="" if fmt == "csv" else None)
+    out = sys.stdout if args.output == "-" else (
+        gzip.open(args.output, "wt", encoding="utf-8") if args.output.endswith(".gz")
+        else open(args.output, "w", encoding="utf-8"))
+    try:
+        records = read_records(stream, fmt, args.text_field, args.sender_field, args.id_field)
+        for result in process(records, args.workers, args.chunksize, args.fields, args.only_financial):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    except BrokenPipeError:
+        # The reader went away (| head). Point stdout at devnull so that the flush at exit does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        stream.close()
+        if out is not sys.stdout:
+            out.close()
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from .batch import classify_messages, recognize_entities
+from .transaction_extractor import extract_transaction_details, MAX_SMS_LENGTH
+
+# Calls an AsyncExtractor runs at once; the others wait their turn
+CONCURRENCY_LIMIT = 64
+
+# Concurrent calls to a model are coalesced into batches of at most this many SMS,
+# waiting at most this many seconds for the batch to fill
+MAX_BATCH = 32
+MAX_WAIT = 0.002
+
+def _extract(sms: str, now: datetime, sender: str, max_length: int, budget: float, fields: tuple) -> dict:
+    # Every field is read here, in the executor, not on the event loop
+    return extract_transaction_details(sms, now, sender, max_length, budget, fields).copy()
+
+def _resolve(batch: list, task: asyncio.Future):
+    """Hand each caller of a batch its result, or the error of the batch."""
+    error = asyncio.CancelledError() if task.cancelled() else task.exception()
+    results = None if error else task.result()
+    for index, (_, future) in enumerate(batch):
+        if future.done():
+            continue
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(results[index])
+
+class MicroBatcher:
+    """Coalesce concurrent calls of a function over lists into batches.
+
+    submit(item) waits for function([..., item, ...])[i]. The batch is run in
+    the executor as soon as it holds max_size items, or max_wait seconds after
+    its first item came, whichever is first. A batcher belongs to one event
+    loop. batches and items count what was run.
+    """
+
+    __slots__ = ("function", "max_size", "max_wait", "executor", "batches", "items", "_pending", "_timer")
+
+    def __init__(self, function, max_size: int = MAX_BATCH, max_wait: float = MAX_WAIT, executor: Executor = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.function = function
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        # Callers that gave up while waiting are left out
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        task = loop.run_in_executor(self.executor, self.function, [item for item, _ in batch])
+        task.add_done_callback(partial(_resolve, batch))
+
+class AsyncExtractor:
+    """Extraction, classification and NER for asyncio code, run off the event loop.
+
+    Every call runs in the shared executor, so the event loop is never blocked
+    for the milliseconds an SMS takes. At most limit calls run at once; the
+    others wait. Concurrent classify and recognize calls are coalesced into
+    batches (see MicroBatcher), so the classifier and nlp.pipe see many SMS
+    at a time.
+
+    The executor is a thread pool by default, made on first use. For
+    extraction on several cores, pass a ProcessPoolExecutor (whose workers
+    load the models on first use, or on warm_up as its initializer).
+    """
+
+    __slots__ = ("executor", "limit", "max_batch", "max_wait", "_own_executor", "_loop", "_semaphore",
+                 "_classifier", "_recognizer")
+
+    def __init__(self, executor: Executor = None, limit: int = CONCURRENCY_LIMIT, max_batch: int = MAX_BATCH,
+                 max_wait: float = MAX_WAIT):
+        self.executor = executor
+        self.limit = limit
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._own_executor = executor is None
+        self._loop = None
+
+    def _bind(self):
+        """Make the executor, semaphore and batchers on first use, for the running event loop.
+
+        An extractor belongs to one event loop at a time, so that its limit
+        holds for every call and no batch is left waiting on another loop.
+        Once that loop is closed (as at the end of asyncio.run) it may be used
+        from a new one.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop and self._loop is not None and not self._loop.is_closed():
+            raise RuntimeError("This AsyncExtractor is in use by another event loop")
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(min(self.limit, os.cpu_count() or 1), "sms-extractor")
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._classifier = MicroBatcher(classify_messages, self.max_batch, self.max_wait, self.executor)
+            self._recognizer = MicroBatcher(recognize_entities, self.max_batch, self.max_wait, self.executor)
+        return loop
+
+    async def extract(self, sms: str, now: datetime = None, sender: str = None, max_length: int = MAX_SMS_LENGTH,
+                      budget: float = None, fields: tuple = None) -> dict:
+        """Same as extract_transaction_details, as a plain dict.
+
+        There is no time budget unless one is given: the executor's threads
+        share the GIL, and a wall-clock budget would cut SMS short under load.
+        """
+        loop = self._bind()
+        async with self._semaphore:
+            return await loop.run_in_executor(self.executor, _extract, sms, now, sender, max_length, budget, fields)
+
+    async def classify(self, sms: str) -> bool:
+        """Same as is_financial_transaction."""
+        self._bind()
+        async with self._semaphore:
+            return await self._classifier.submit(sms)
+
+    async def recognize(self, sms: str) -> dict:
+        """The NER entities of the SMS, as {label: (start, end)} (see batch.recognize_entities)."""
+        self._bind()
+        async with self._semaphore:
+            return await self._recognizer.submit(sms)
+
+    def close(self):
+        """Shut down the executor, if this extractor made it."""
+        if self._own_executor and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self._loop = None
+
+# The shared extractor behind the functions below
+ASYNC_EXTRACTOR = AsyncExtractor()
+
+async def extract_transaction_details_async(sms: str, now: datetime = None, sender: str = None,
+                                            max_length: int = MAX_SMS_LENGTH, budget: float = None,
+                                            fields: tuple = None) -> dict:
+    """Same as extract_transaction_details, run on the shared executor."""
+    return await ASYNC_EXTRACTOR.extract(sms, now, sender, max_length, budget, fields)
+
+async def is_financial_transaction_async(sms: str) -> bool:
+    """Same as is_financial_transaction, batched with concurrent calls on the shared executor."""
+    return await ASYNC_EXTRACTOR.classify(sms)
+
+async def recognize_entities_async(sms: str) -> dict:
+    """The NER entities of the SMS, batched with concurrent calls on the shared executor."""
+    return await ASYNC_EXTRACTOR.recognize(sms)
@@ -0,0 +1,142 @@
+"""Fuzz the registered patterns for catastrophic backtracking.
+
+Every pattern is searched in generated inputs of growing length, made of its
+own literal words ("to to to ...", "used a used a ...") and of runs of single
+characters, and the patterns whose search time grows faster than the input
+are reported. Run from the package directory:
+
+    python -m extractor.audit [--prefix payee] [--sizes 128,256,512,1024]
+"""
+import argparse
+import importlib.util
+import math
+import os
+import random
+import re
+import time
+from .patterns import PATTERNS
+from . import transaction_extractor, templates  # noqa: F401 (importing them registers their patterns)
+
+# Input lengths tried for each pattern, in order
+SIZES = (128, 256, 512, 1024)
+
+# A pattern is reported if its search time grows faster than size ** GROWTH_LIMIT
+GROWTH_LIMIT = 1.5
+
+# Search times below this, at the largest size tried, are timer noise and never reported
+MIN_SECONDS = 0.001
+
+# Once an input takes longer than this, larger sizes are not tried for the pattern
+STOP_SECONDS = 0.25
+
+# Each search is timed this many times, and the fastest time kept
+REPEATS = 3
+
+# Single characters that inputs are padded with, and run of
+_FILLERS = (" ", "a", "A", "1", "x", ".", "(", "@", "/", "-", ",", ":")
+_ESCAPE = re.compile(r"\\.")
+_WORD = re.compile(r"[A-Za-z]{2,}")
+
+def pattern_words(pattern: re.Pattern) -> list:
+    """Return the literal words of a pattern, which its generated inputs are made of."""
+    return sorted(set(_WORD.findall(_ESCAPE.sub(" ", pattern.pattern)))) or ["a"]
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+def generate_inputs(pattern: re.Pattern, size: int, seed: int = 0):
+    """Yield (kind, text) pairs: inputs of size characters for the pattern.
+
+    The kind names how an input was made, and is the same for every size, so
+    that the growth of one kind of input can be followed.
+    """
+    words = pattern_words(pattern)
+    for filler in _FILLERS:
+        yield f"run {filler!r}", filler * size
+    for word in words:
+        yield f"repeat {word!r}", _repeat(f"{word} ", size)
+        yield f"repeat {word!r} a", _repeat(f"{word} a ", size)
+    pieces = words + list(_FILLERS) + ["Rs.1,000", "XX1234", "05-04-25"]
+    for index in range(3):
+        rng = random.Random(seed + index)
+        yield f"soup {index}", _repeat(" ".join(rng.choice(pieces) for _ in range(64)) + " ", size)
+
+def _time_search(pattern: re.Pattern, text: str) -> float:
+    best = math.inf
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        pattern.search(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def audit_pattern(pattern: re.Pattern, sizes: tuple = SIZES) -> tuple:
+    """Time a pattern on every kind of generated input, and return its worst growth.
+
+    Returns (exponent, seconds, kind, size): the growth exponent of the kind of
+    input whose search time grew fastest between the two largest sizes tried
+    (1.0 is linear, 2.0 quadratic), with its time and length at the larger one.
+    The exponent is None if even the smallest size took over STOP_SECONDS.
+    """
+    times = {}
+    tried = []
+    for size in sizes:
+        tried.append(size)
+        slowest = 0.0
+        for kind, text in generate_inputs(pattern, size):
+            seconds = _time_search(pattern, text)
+            times[kind, size] = seconds
+            slowest = max(slowest, seconds)
+        if slowest > STOP_SECONDS:
+            break
+
+    if len(tried) == 1:
+        kind, size = max(times, key=times.get)
+        return None, times[kind, size], kind, size
+
+    small, large = tried[-2], tried[-1]
+    worst = (0.0, 0.0, None, large)
+    for (kind, size), seconds in times.items():
+        if size != large:
+            continue
+        growth = math.log(max(seconds, 1e-9) / max(times[kind, small], 1e-9)) / math.log(large / small)
+        if seconds >= MIN_SECONDS and growth > worst[0]:
+            worst = (growth, seconds, kind, large)
+    return worst
+
+def audit_patterns(prefix: str = "", sizes: tuple = SIZES) -> list:
+    """Audit the registered patterns whose name starts with prefix.
+
+    Returns (name, exponent, seconds, kind, size) for every pattern whose
+    search time grows faster than size ** GROWTH_LIMIT, slowest growth last.
+    """
+    findings = []
+    for name, pattern in sorted(PATTERNS.items()):
+        if not name.startswith(prefix):
+            continue
+        exponent, seconds, kind, size = audit_pattern(pattern, sizes)
+        if exponent is None or exponent > GROWTH_LIMIT:
+            findings.append((name, exponent, seconds, kind, size))
+    return sorted(findings, key=lambda finding: math.inf if finding[1] is None else finding[1])
+
+def _load_fallback_rules():
+    """Import ml-model/fallback_rules.py, so that its patterns are registered as well."""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml-model", "fallback_rules.py")
+    spec = importlib.util.spec_from_file_location("fallback_rules", path)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+def main():
+    parser = argparse.ArgumentParser(description="Report patterns whose search time grows faster than the input.")
+    parser.add_argument("--prefix", default="", help="only audit patterns whose name starts with this")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated input lengths")
+    args = parser.parse_args()
+
+    _load_fallback_rules()
+    sizes = tuple(int(size) for size in args.sizes.split(","))
+    findings = audit_patterns(args.prefix, sizes)
+    for name, exponent, seconds, kind, size in findings:
+        growth = "  >>" if exponent is None else f"{exponent:4.1f}"
+        print(f"{growth}  {seconds * 1000:9.2f} ms  {name:<28} {kind} x {size}")
+    print(f"{len(findings)} of {len(PATTERNS)} patterns grow faster than size ** {GROWTH_LIMIT}")
+
+if __name__ == "__main__":
+    main()
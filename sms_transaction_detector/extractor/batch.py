@@ -0,0 +1,277 @@
+import gc
+import importlib
+import itertools
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from .normalizer import normalize_sms
+from .segmenter import crop_trailers
+from .transaction_extractor import extract_transaction_details, missing_field, FIELDS, MAX_SMS_LENGTH, FAILURE_ERROR
+
+# Messages sent to a worker at a time
+CHUNKSIZE = 512
+
+# Chunks submitted per worker at a time; the rest wait in this process
+IN_FLIGHT = 2
+
+# The trained NER model, next to the package's other models
+NER_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml-model", "ner_model")
+
+# The models loaded by warm_up, by name: "classifier" and "ner"
+MODELS = {}
+
+# The classifier module, beside this package: sms_transaction_detector.model when the
+# extractor is imported through the package, model when it is a top-level package
+_PARENT = __package__.rpartition(".")[0]
+CLASSIFIER_MODULE = f"{_PARENT}.model.transaction_classifier" if _PARENT else "model.transaction_classifier"
+
+def warm_up(classifier: bool = True, ner: bool = False):
+    """Load what extraction and classification need, once per process.
+
+    The patterns are compiled when the extractor is imported. The joblib
+    classifier is loaded if asked for, and so is the spaCy model if spaCy is
+    installed. Called before the workers fork, the memory is shared with them
+    copy-on-write; a worker that does not fork loads them itself.
+    """
+    if classifier and "classifier" not in MODELS:
+        MODELS["classifier"] = importlib.import_module(CLASSIFIER_MODULE).model
+    if ner and "ner" not in MODELS and importlib.util.find_spec("spacy"):
+        import spacy
+        MODELS["ner"] = spacy.load(NER_MODEL_PATH)
+
+def classify_messages(texts: list) -> list:
+    """Tell which SMS are financial transactions, with one call to the classifier."""
+    warm_up(classifier=True)
+    return [bool(label == 1) for label in MODELS["classifier"].predict(list(texts))]
+
+def recognize_entities(texts: list) -> list:
+    """Find the NER entities of each SMS, as {label: (start, end)} in the original text.
+
+    The texts go through the model together (nlp.pipe), each normalised and
+    without its trailer clauses, as in ml-model/extract_entities.py.
+    """
+    warm_up(classifier=False, ner=True)
+    if "ner" not in MODELS:
+        raise RuntimeError("The NER model needs spaCy, which is not installed")
+    normalized = [normalize_sms(text) for text in texts]
+    docs = MODELS["ner"].pipe(crop_trailers(sms.text) for sms in normalized)
+    return [{ent.label_: sms.original_span(ent.start_char, ent.end_char) for ent in doc.ents}
+            for sms, doc in zip(normalized, docs)]
+
+def _start_method() -> str:
+    return "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+
+def _failed(fields: tuple) -> dict:
+    return {field: missing_field(field, FAILURE_ERROR) for field in fields}
+
+# In a worker, where it reports the chunks it starts (see _run)
+_started = None
+
+def _initialize(classifier: bool, ner: bool, started):
+    global _started
+    _started = started
+    warm_up(classifier, ner)
+
+def _extract_chunk(chunk: list, now: datetime, max_length: int, budget: float, fields: tuple,
+                   start: int = None) -> list:
+    """Extract a chunk of (sms, sender) pairs; an SMS whose extraction raises gets a failed result."""
+    if _started is not None:
+        _started.put(start)
+    results = []
+    for sms, sender in chunk:
+        try:
+            results.append(extract_transaction_details(sms, now, sender, max_length, budget, fields).copy())
+        except Exception:
+            results.append(_failed(fields))
+    return results
+
+def _run(pool: ProcessPoolExecutor, started, chunks: dict, options: tuple, in_flight: int) -> tuple:
+    """Extract chunks ({start: pairs}) on a pool whose workers report the chunks they start to started.
+
+    At most in_flight chunks are submitted at a time, and started is read as
+    they finish, so that neither the pool's queue nor the pipe behind started
+    grows with the batch (a worker blocks on a full pipe).
+
+    Returns the results by start, and the starts of the chunks lost to a
+    worker crash, split into those a worker had started (one of which
+    crashed it) and those still queued.
+    """
+    done, lost, running = {}, set(), set()
+    waiting = iter(chunks.items())
+    futures = {}
+
+    def submit(count: int):
+        for start, chunk in itertools.islice(waiting, count):
+            try:
+                futures[pool.submit(_extract_chunk, chunk, *options, start)] = start
+            except BrokenProcessPool:
+                lost.add(start)
+                return
+
+    submit(in_flight)
+    while futures:
+        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+        while not started.empty():
+            running.add(started.get())
+        for future in finished:
+            start = futures.pop(future)
+            try:
+                done[start] = future.result()
+            except BrokenProcessPool:
+                lost.add(start)
+        if not lost:
+            submit(len(finished))
+    # Chunks never submitted were queued
+    lost.update(start for start, _ in waiting)
+    while not started.empty():
+        running.add(started.get())
+    return done, lost & running, lost - running
+
+class ExtractionPool:
+    """Worker processes that extract batch after batch of SMS, started once.
+
+    The models are loaded by warm_up before the workers fork (classifier and
+    ner say which, for callers whose workers need them; extraction needs
+    none), so each worker starts with them and its memory is shared. The
+    workers start with the first batch that needs them and are kept until
+    close(); use the pool as a context manager. A pool broken by a crashed
+    worker is replaced.
+
+    Args:
+        workers: The worker processes; one per CPU by default. With one, or
+            a batch of a single chunk, a batch is extracted in this process.
+        chunksize: The SMS sent to a worker at a time.
+    """
+
+    __slots__ = ("workers", "chunksize", "classifier", "ner", "_pool", "_started", "_frozen")
+
+    def __init__(self, workers: int = None, chunksize: int = CHUNKSIZE, classifier: bool = False,
+                 ner: bool = False):
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.classifier = classifier
+        self.ner = ner
+        self._pool = self._started = None
+        self._frozen = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start(self, workers: int) -> tuple:
+        """Start a pool of workers, and the queue they report started chunks to."""
+        warm_up(self.classifier, self.ner)
+        if not self._frozen:
+            # Objects made so far are left out of collection, so that the collector does
+            # not write to (and so copy) the pages the workers share
+            gc.freeze()
+            self._frozen = True
+        context = multiprocessing.get_context(_start_method())
+        started = context.SimpleQueue()
+        pool = ProcessPoolExecutor(workers, context, initializer=_initialize,
+                                   initargs=(self.classifier, self.ner, started))
+        return pool, started
+
+    def _round(self, chunks: dict, options: tuple) -> tuple:
+        """_run on the kept pool, which is dropped if a worker crashed."""
+        if self._pool is None:
+            self._pool, self._started = self._start(self.workers)
+        done, running, queued = _run(self._pool, self._started, chunks, options, self.workers * IN_FLIGHT)
+        if running or queued:
+            self._discard()
+        return done, running, queued
+
+    def _alone(self, start: int, chunk: list, options: tuple) -> list:
+        """Extract a chunk on a worker of its own, so that a crash is its own; None if it crashes."""
+        pool, started = self._start(1)
+        try:
+            done, _, _ = _run(pool, started, {start: chunk}, options, 1)
+        finally:
+            pool.shutdown()
+            started.close()
+        return done.get(start)
+
+    def extract(self, messages, now: datetime = None, senders=None, max_length: int = MAX_SMS_LENGTH,
+                budget: float = None, fields: tuple = None) -> list:
+        """Extract the details of a batch of SMS on the workers.
+
+        The result is the list of extract_transaction_details results (as
+        plain dicts), in input order. now is fixed once for the batch;
+        senders, if given, has one sender ID (or None) per SMS.
+
+        An SMS whose extraction raises gets FAILURE_ERROR for every field.
+        When a worker crashes, the chunks still queued are run again as they
+        were, and those being extracted are split in halves and run again,
+        until the SMS that crashed it is found; that SMS is retried alone and
+        failed, and the rest of the batch is kept.
+        """
+        if fields is None:
+            fields = FIELDS
+        for field in fields:
+            if field not in FIELDS:
+                raise ValueError(f"Unknown field '{field}'")
+        messages = list(messages)
+        if senders is None:
+            senders = [None] * len(messages)
+        elif len(senders) != len(messages):
+            raise ValueError("senders must have one entry per message")
+        options = (now or datetime.now(), max_length, budget, fields)
+
+        pairs = list(zip(messages, senders))
+        chunksize = self.chunksize
+        if self.workers == 1 or len(pairs) <= chunksize:
+            return _extract_chunk(pairs, *options)
+
+        results = {}
+        pending = {start: pairs[start:start + chunksize] for start in range(0, len(pairs), chunksize)}
+        suspects = set()
+        while pending:
+            done, running, queued = self._round(pending, options)
+            if not done and not running:
+                raise RuntimeError("The worker processes failed to start")
+            results.update(done)
+            chunks, pending = pending, {start: pending[start] for start in queued}
+            for start in running:
+                chunk = chunks[start]
+                if len(chunk) > 1:
+                    half = len(chunk) // 2
+                    pending[start], pending[start + half] = chunk[:half], chunk[half:]
+                elif start not in suspects:
+                    suspects.add(start)
+                    pending[start] = chunk
+                else:
+                    # Lost twice while running beside others: run it alone
+                    results[start] = self._alone(start, chunk, options) or [_failed(fields)]
+        return [result for start in sorted(results) for result in results[start]]
+
+    def _discard(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._started.close()
+            self._pool = self._started = None
+
+    def close(self):
+        """Stop the workers."""
+        self._discard()
+        if self._frozen:
+            gc.unfreeze()
+            self._frozen = False
+
+def extract_transaction_details_batch(messages, workers: int = None, chunksize: int = CHUNKSIZE,
+                                      now: datetime = None, senders=None, max_length: int = MAX_SMS_LENGTH,
+                                      budget: float = None, fields: tuple = None,
+                                      classifier: bool = False, ner: bool = False) -> list:
+    """Extract the details of a batch of SMS on a pool of worker processes, started for it.
+
+    See ExtractionPool, which keeps its workers for many batches, for the
+    arguments and how a crashed worker is handled.
+    """
+    with ExtractionPool(workers, chunksize, classifier, ner) as pool:
+        return pool.extract(messages, now, senders, max_length, budget, fields)
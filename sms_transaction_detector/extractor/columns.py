@@ -0,0 +1,162 @@
+from datetime import datetime
+import numpy as np
+from .helpers.amount_helpers import to_paise
+from .transaction_extractor import extract_transaction_details, FIELDS, MAX_SMS_LENGTH
+
+# The values a transaction type can take; its column holds the index into these
+TRANSACTION_TYPES = ("debit", "credit")
+
+# What a column holds for a field that was not found
+MISSING_AMOUNT = -1
+MISSING_CODE = -1
+
+# Fields whose column holds codes into a list of categories
+CATEGORICAL = ("transaction_type", "bank")
+
+class TransactionColumns:
+    """The details of a batch of SMS, one NumPy array per field.
+
+    values[field] holds one entry per SMS, in input order:
+      amount           int64 paise, MISSING_AMOUNT when not found
+      date             datetime64[D], NaT when not found
+      transaction_type int8 index into categories["transaction_type"], MISSING_CODE when not found
+      bank             int32 index into categories["bank"], MISSING_CODE when not found
+      payee, account_from, account_to
+                       str objects, None when not found
+    confidences[field] is a float32 array of the confidence of each value.
+    The banks are listed in categories["bank"] in the order they were first seen.
+    """
+
+    __slots__ = ("values", "confidences", "categories")
+
+    def __init__(self, values: dict, confidences: dict, categories: dict):
+        self.values = values
+        self.confidences = confidences
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(next(iter(self.confidences.values()), ()))
+
+    def to_pandas(self):
+        """Return the columns as a pandas DataFrame (pandas must be installed).
+
+        There is one column per field and one "<field>_confidence" column per
+        field. The amount is in nullable Int64 paise, the bank and type are
+        categoricals, and a field not found is NA.
+        """
+        import pandas as pd
+
+        frame = {}
+        for field, column in self.values.items():
+            if field == "amount":
+                column = pd.arrays.IntegerArray(column, column == MISSING_AMOUNT)
+            elif field in CATEGORICAL:
+                column = pd.Categorical.from_codes(column, categories=list(self.categories[field]))
+            frame[field] = column
+            frame[field + "_confidence"] = self.confidences[field]
+        return pd.DataFrame(frame)
+
+    def to_arrow(self):
+        """Return the columns as a pyarrow Table (pyarrow must be installed), with the same columns as to_pandas.
+
+        The bank and type are dictionary arrays; a field not found is null.
+        """
+        import pyarrow as pa
+
+        arrays = {}
+        for field, column in self.values.items():
+            if field == "amount":
+                array = pa.array(column, mask=column == MISSING_AMOUNT)
+            elif field == "date":
+                array = pa.array(column, mask=np.isnat(column))
+            elif field in CATEGORICAL:
+                indices = pa.array(column, mask=column == MISSING_CODE)
+                array = pa.DictionaryArray.from_arrays(indices, pa.array(self.categories[field], pa.string()))
+            else:
+                array = pa.array(column, pa.string())
+            arrays[field] = array
+            arrays[field + "_confidence"] = pa.array(self.confidences[field])
+        return pa.table(arrays)
+
+def extract_transaction_columns(messages, now: datetime = None, senders=None,
+                                max_length: int = MAX_SMS_LENGTH, budget: float = None,
+                                fields: tuple = None, output: str = "numpy"):
+    """Extract the details of a batch of SMS straight into columns.
+
+    Each SMS is extracted as by extract_transaction_details, and its fields
+    are written into preallocated arrays as they are read, so no result dict
+    outlives its SMS. now is fixed once for the batch; senders, if given, has
+    one sender ID (or None) per SMS.
+
+    Args:
+        messages: The SMS texts. A sequence, or any iterable (which is read into a list).
+        fields: The fields wanted, out of FIELDS; all of them by default.
+        output: "numpy" for a TransactionColumns, "pandas" for a DataFrame or
+            "arrow" for a pyarrow Table.
+
+    Returns:
+        The columns of the batch, in the form asked for by output.
+    """
+    if output not in ("numpy", "pandas", "arrow"):
+        raise ValueError(f"Unknown output '{output}'")
+    if fields is None:
+        fields = FIELDS
+    for field in fields:
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field '{field}'")
+    if not isinstance(messages, (list, tuple)):
+        messages = list(messages)
+    if senders is None:
+        senders = [None] * len(messages)
+    elif len(senders) != len(messages):
+        raise ValueError("senders must have one entry per message")
+    now = now or datetime.now()
+
+    size = len(messages)
+    values, confidences = {}, {}
+    for field in fields:
+        if field == "amount":
+            values[field] = np.full(size, MISSING_AMOUNT, dtype=np.int64)
+        elif field == "date":
+            values[field] = np.full(size, np.datetime64("NaT"), dtype="datetime64[D]")
+        elif field == "transaction_type":
+            values[field] = np.full(size, MISSING_CODE, dtype=np.int8)
+        elif field == "bank":
+            values[field] = np.full(size, MISSING_CODE, dtype=np.int32)
+        else:
+            values[field] = np.full(size, None, dtype=object)
+        confidences[field] = np.zeros(size, dtype=np.float32)
+
+    type_codes = {txn_type: code for code, txn_type in enumerate(TRANSACTION_TYPES)}
+    bank_codes = {}
+    for index, (sms, sender) in enumerate(zip(messages, senders)):
+        details = extract_transaction_details(sms, now, sender, max_length, budget, fields)
+        for field in fields:
+            result = details[field]
+            value = result["value"]
+            if value is None:
+                continue
+            try:
+                if field == "amount":
+                    value = to_paise(value)
+                elif field == "transaction_type":
+                    value = type_codes[value]
+                elif field == "bank":
+                    value = bank_codes.setdefault(value, len(bank_codes))
+                values[field][index] = value
+            except (ValueError, KeyError):
+                # A value that does not fit its column is left missing, rather than failing the batch
+                continue
+            confidences[field][index] = result["confidence"]
+
+    categories = {}
+    if "transaction_type" in values:
+        categories["transaction_type"] = TRANSACTION_TYPES
+    if "bank" in values:
+        categories["bank"] = tuple(bank_codes)
+    columns = TransactionColumns(values, confidences, categories)
+    if output == "pandas":
+        return columns.to_pandas()
+    if output == "arrow":
+        return columns.to_arrow()
+    return columns
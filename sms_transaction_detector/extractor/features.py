@@ -0,0 +1,104 @@
+import re
+from .patterns import register
+
+# Anchor words scanned once per SMS. Each is a single bit in the feature bitmap.
+TO = 1 << 0
+AT = 1 << 1
+AT_SIGN = 1 << 2
+FROM = 1 << 3
+FR = 1 << 4
+ACCOUNT = 1 << 5
+UPI = 1 << 6
+CURRENCY = 1 << 7
+CREDITED = 1 << 8
+BENEFICIARY = 1 << 9
+PAYEE = 1 << 10
+BILL = 1 << 11
+DUES = 1 << 12
+SERVICE = 1 << 13
+RECURRING = 1 << 14
+PAID = 1 << 15
+CARD = 1 << 16
+PAREN = 1 << 17
+DASH = 1 << 18
+REF = 1 << 19
+BANK = 1 << 20
+FIRST = 1 << 21
+FOR = 1 << 22
+YOUR = 1 << 23
+MERCHANT = 1 << 24
+DEBIT_CUE = 1 << 25
+TWO = 1 << 26
+DIGIT = 1 << 27
+MASKED = 1 << 28
+
+ALL = (1 << 29) - 1
+
+# Substrings of the lowercased SMS that set each feature. A feature is set if
+# any of its substrings is present, so it is a necessary (never sufficient)
+# condition for a pattern that contains one of those words.
+_ANCHORS = [
+    (TO, ("to",)),
+    (AT, ("at",)),
+    (AT_SIGN, ("@",)),
+    (FROM, ("from",)),
+    (FR, ("fr",)),
+    (ACCOUNT, ("a/c", "acct", "account")),
+    (UPI, ("upi",)),
+    (CURRENCY, ("rs", "inr")),
+    (CREDITED, ("credited",)),
+    (BENEFICIARY, ("benef", "recipient")),
+    (PAYEE, ("payee",)),
+    (BILL, ("bill", "payment", "recharge", "subscription")),
+    (DUES, ("bill", "invoice", "receipt", "statement", "dues", "fee")),
+    (SERVICE, ("service", "consultation", "fee", "invoice", "subscription")),
+    (RECURRING, ("subscription", "membership", "recurring")),
+    (PAID, ("paid", "payment")),
+    (CARD, ("card",)),
+    (PAREN, ("(",)),
+    (DASH, ("-",)),
+    (REF, ("ref",)),
+    (BANK, ("bank",)),
+    (FIRST, ("first",)),
+    (FOR, ("for",)),
+    (YOUR, ("your",)),
+    (MERCHANT, ("merchant",)),
+    (DEBIT_CUE, ("debited", "txn", "transaction")),
+    (TWO, ("2",)),
+]
+
+_DIGIT = register("features.digit", r"\d")
+# Four account characters in a row, the minimum any account pattern captures
+_MASKED = register("features.masked", r"[xX\d]{4}")
+
+def scan_features(sms: str) -> int:
+    """Build the feature bitmap for an SMS.
+
+    Non-ASCII messages get every feature: case-insensitive patterns can match
+    characters (e.g. the Kelvin sign for "k") that str.lower() does not fold.
+    """
+    if not sms.isascii():
+        return ALL
+    lowered = sms.lower()
+    features = 0
+    for feature, anchors in _ANCHORS:
+        for anchor in anchors:
+            if anchor in lowered:
+                features |= feature
+                break
+    if _DIGIT.search(sms):
+        features |= DIGIT
+    if _MASKED.search(sms):
+        features |= MASKED
+    return features
+
+def can_match(features: int, needs: tuple) -> bool:
+    """Check a pattern's needs against the feature bitmap.
+
+    needs is a tuple of bit masks; every mask must share at least one bit with
+    the features. An empty tuple means the pattern has no anchor and always runs.
+    """
+    for clause in needs:
+        if not features & clause:
+            return False
+    return True
@@ -0,0 +1,73 @@
+from ..patterns import register, register_tier
+from ..features import can_match, TO, FROM, AT_SIGN, UPI, CREDITED, BENEFICIARY, PAREN, REF, MASKED
+
+# Enhanced account extraction patterns, each paired with the features it needs (see features.py).
+# These tiers are few short patterns, tried one by one (see PatternTier).
+ACCOUNT_TIER = register_tier("account.generic", [
+    (r"(?:A\/C|A\/c|Acct|Card|account)?\s*(?:xx|x|XX|ending|[Ee]nding in)?\s*([xX\d]{4,})", (MASKED,)),
+    (r"[Aa](?:\/)?[Cc](?:count)?\s*(?:\w+\s*)?(?:no\.?)?\s*(?:xx|x|XX)?\s*([xX\d]{4,})", (MASKED,)),
+    (r"(?:acct|account|a\/c)[.\s]*(?:no\.?)?[.\s]*(?:xx|x|XX)?[.\s]*([xX\d]{4,})", (MASKED,)),
+    (r"(?:xx|XX)(\d{4,})", (MASKED,))
+], alternate=False)
+
+# First look for accounts with explicit role indicators
+FROM_ACCOUNT_PATTERN = register("account.from", r"(?i)from\s+(?:A\/C|A\/c|Acct|account)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})")
+FROM_ACCOUNT_NEEDS = (FROM, MASKED)
+
+# Enhanced patterns for "account to" detection
+TO_ACCOUNT_TIER = register_tier("account.to", [
+    (r"(?i)to\s+(?:.*?)\s*\((?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})\)", (TO, PAREN, MASKED)),  # to Name (A/c XX1234)
+    (r"(?i)to\s+(?:A\/C|A\/c|Acct|account)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})", (TO, MASKED)),  # to A/c XX1234
+    (r"(?i)credited\s+to\s+(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})", (CREDITED, MASKED)),  # credited to A/c XX1234
+    (r"(?i)transferred\s+to\s+(?:.*?)\s+(?:\()?(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})(?:\))?", (TO, MASKED)),  # transferred to Name A/c XX1234
+    (r"(?i)deposited\s+to\s+(?:your)?\s+(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX)?\s*([xX\d]{4,})", (TO, MASKED)),  # deposited to your A/c XX1234
+    (r"(?i)beneficiary\s+(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX)?\s*([xX\d]{4,})", (BENEFICIARY, MASKED)),  # beneficiary A/c XX1234
+    (r"(?i)to\s+(?:.*?)@(?:\w+)/([\d]{4,})", (TO, AT_SIGN, MASKED)),  # to name@bank/1234567890 (UPI format with embedded account)
+    (r"(?i)UPI[- ]P2A[- ](?:.*?)(?:to|a/c|account)[- ](\d{4,})", (UPI, MASKED)),  # UPI P2A transfer to 1234567890
+    (r"(?i)UPI/([\d]{4,})/", (UPI, MASKED)),  # UPI/1234567890/reference
+    (r"(?i)to\s+(?:.*?)\s+via\s+IMPS\s+Ref:\s+(\d{4,})", (TO, REF, MASKED)),  # to Name via IMPS Ref: 123456
+    (r"(?i)to\s+(?:.*?)\s+using\s+NEFT\s+Ref:\s+(\d{4,})", (TO, REF, MASKED)),  # to Name using NEFT Ref: 123456
+    (r"(?i)to\s+(?:.*?)\s+via\s+RTGS\s+Ref:\s+(\d{4,})", (TO, REF, MASKED))  # to Name via RTGS Ref: 123456
+], alternate=False)
+
+def resolve_accounts_with_spans(sms: str, features: int, tokens: list, plan: dict = None) -> tuple:
+    """Resolve the source and destination accounts of an SMS in one pass.
+
+    Accounts named with an explicit role ("from A/c XX1234", "to A/c XX5678")
+    win. Otherwise the first account number in the SMS is the source if the SMS
+    has a debit keyword, and the destination if it has a credit keyword; it is
+    looked up once, and only if one of those keywords is present in the tokens.
+
+    Returns (from_account, from_confidence, to_account, to_confidence), the shape
+    of bank_helpers.extract_accounts, followed by (from_span, to_span), the
+    (start, end) of each account number in the SMS; missing accounts are None
+    with confidence 0.0 and span None.
+    A sender plan (see plans.py) is passed on to the pattern tiers.
+    """
+    from_account, from_confidence, from_span = None, 0.0, None
+    to_account, to_confidence, to_span = None, 0.0, None
+
+    from_match = can_match(features, FROM_ACCOUNT_NEEDS) and FROM_ACCOUNT_PATTERN.search(sms)
+    if from_match:
+        from_account, from_confidence, from_span = from_match.group(1), 0.95, from_match.span(1)
+
+    _, to_match = TO_ACCOUNT_TIER.search(sms, features=features, plan=plan)
+    if to_match:
+        to_account, to_confidence, to_span = to_match.group(1), 0.95, to_match.span(1)
+
+    kinds = {token.kind for token in tokens}
+    needs_from = not from_account and "debit" in kinds
+    needs_to = not to_account and "credit" in kinds
+    if needs_from or needs_to:
+        _, account_match = ACCOUNT_TIER.search(sms, features=features, plan=plan)
+        if account_match:
+            if needs_from:
+                from_account, from_confidence, from_span = account_match.group(1), 0.8, account_match.span(1)
+            if needs_to:
+                to_account, to_confidence, to_span = account_match.group(1), 0.8, account_match.span(1)
+
+    return from_account, from_confidence, to_account, to_confidence, from_span, to_span
+
+def resolve_accounts(sms: str, features: int, tokens: list, plan: dict = None) -> tuple:
+    """Same as resolve_accounts_with_spans, without the spans: (from, from confidence, to, to confidence)."""
+    return resolve_accounts_with_spans(sms, features, tokens, plan)[:4]
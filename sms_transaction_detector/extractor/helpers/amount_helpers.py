@@ -1,9 +1,63 @@
 import re
+from ..patterns import register
 
-def match_amount_pattern(sms: str) -> tuple:
-    """Helper function to match amount pattern in SMS."""
-    amount_match = re.search(r"(?i)(?:rs\.?|inr)\s?([0-9,]+(?:\.[0-9]{1,2})?)(?:\s*\/\-)?", sms)
+AMOUNT_PATTERN = register("amount.currency", r"(?i)(?:rs\.?|inr)\s?([0-9,]+(?:\.[0-9]{1,2})?)(?:\s*\/\-)?")
+
+def match_amount_pattern_with_span(sms: str) -> tuple:
+    """Helper function to match amount pattern in SMS.
+
+    Returns (amount, confidence, span), where span is the (start, end) of the
+    currency mention in the SMS; (None, 0.0, None) if there is none.
+    """
+    amount_match = AMOUNT_PATTERN.search(sms)
     if amount_match:
         amount_value = amount_match.group(1).replace(",", "")
-        return amount_value, 1.0
-    return None, 0.0
\ No newline at end of file
+        return amount_value, 1.0, amount_match.span()
+    return None, 0.0, None
+
+def match_amount_pattern(sms: str) -> tuple:
+    """Same as match_amount_pattern_with_span, without the span: (amount, confidence)."""
+    return match_amount_pattern_with_span(sms)[:2]
+
+# Every currency mention: ₹/Rs/INR before the number, or "/-" after a bare number
+MONEY_PATTERN = register("amount.mention", r"""
+    (?:₹|\b(?:rs|inr)\.?)\s?(?P<prefixed>\d[0-9,]*(?:\.[0-9]{1,2})?)(?:\s*\/\-)?   # ₹500, Rs.1,23,456.78, INR 500/-
+  | \b(?P<suffixed>\d[0-9,]*(?:\.[0-9]{1,2})?)\s*\/\-                          # 500/-
+""", re.IGNORECASE | re.VERBOSE)
+
+# Words just before an amount that say what it is. Amounts without one are the transaction amount.
+ROLE_CUES = register("amount.role_cue", r"""
+    (?P<available_balance>\b(?:avl|avbl|avail|available|aval)\.?\s*(?:bal|balance)\b|\bbal(?:ance)?\b)
+  | (?P<min_due>\bmin(?:imum)?\.?\s*(?:amt\.?|amount)?\s*(?:is\s+)?due\b)
+  | (?P<total_due>\b(?:total|tot)\.?\s*(?:amt\.?|amount)?\s*(?:is\s+)?due\b|\bamount\s+due\b)
+  | (?P<limit>\b(?:limit|lmt)\b)
+""", re.IGNORECASE | re.VERBOSE)
+
+# How far before an amount to look for its role cue, e.g. "Avl Bal as on 05-Apr: Rs.500"
+ROLE_WINDOW = 30
+
+def to_paise(amount: str) -> int:
+    """Convert an amount such as "1,23,456.78" (or ".50") to integer paise, without going through float."""
+    rupees, _, paise = amount.replace(",", "").partition(".")
+    return int(rupees or 0) * 100 + int(paise.ljust(2, "0"))
+
+def scan_money_mentions(sms: str) -> list:
+    """Find every currency mention in the SMS in one pass and label its role.
+
+    Returns a list of {"value", "role", "start", "end"} dicts in order of
+    position, where value is the amount in integer paise and role is one of
+    "transaction", "available_balance", "min_due", "total_due" or "limit".
+    A role cue is looked for in the text just before the amount, but never
+    before the end of the previous mention.
+    """
+    mentions = []
+    previous_end = 0
+    for match in MONEY_PATTERN.finditer(sms):
+        amount = match.group("prefixed") or match.group("suffixed")
+        role = "transaction"
+        window_start = max(previous_end, match.start() - ROLE_WINDOW)
+        for cue in ROLE_CUES.finditer(sms, window_start, match.start()):
+            role = cue.lastgroup  # the cue closest to the amount wins
+        mentions.append({"value": to_paise(amount), "role": role, "start": match.start(), "end": match.end()})
+        previous_end = match.end()
+    return mentions
@@ -1,37 +1,246 @@
 import re
 from datetime import datetime, timedelta
+from types import MappingProxyType
+from ..patterns import register, register_family
 
-def match_bank_patterns(sms: str, known_banks: list, bank_patterns: list) -> tuple:
-    """Helper function to match bank patterns in SMS."""
+BANK_PREFIX = register("bank.prefix", r"^(?:from|alert|to|in|your)\s+", re.IGNORECASE)
+UPI_SUFFIX = register("bank.upi_suffix", r'@([a-z]+)', re.IGNORECASE)
+ACCOUNT_PREFIX = register("bank.account_prefix", r'(?:xx|x|XX)(\d{2})\d+')
+
+# Account From patterns
+FROM_PATTERNS = register_family("accounts.from", [
+    # Account number patterns
+    r'(?:from|debited from|withdrawn from|fr)[^a-zA-Z0-9]*(?:a\/c|ac|acct|account)[^a-zA-Z0-9]*([A-Z]{2}\d+|\d+|[xX]+\d+)',
+    r'(?:from|debited from|withdrawn from|fr)[^a-zA-Z0-9]*((?:[xX]{2,}|\*{2,})\d{4,})',
+    r'(?:from|debited from|withdrawn from)[^a-zA-Z0-9]*((?:\d{2,}[xX]{2,}|\d{2,}\*{2,}))',
+    r'(?:a\/c|ac|acct|account)[^a-zA-Z0-9]*([xX]{2,}\d{4,}|\d{2,}[xX]{2,}|\*{2,}\d{4,}|\d{2,}\*{2,})[^a-zA-Z0-9]*(?:debited|txn|transaction)',
+    
+    # UPI handles
+    r'(?:from|debited from|withdrawn from)[^a-zA-Z0-9]*(\w+@\w+)',
+    
+    # Card references
+    r'(?:card)[^a-zA-Z0-9]*([xX]{2,}\d{4,}|\d{2,}[xX]{2,})',
+    r'(?:using|via)[^a-zA-Z0-9]*card[^a-zA-Z0-9]*(\d+[xX]+\d+|\d+)',
+], re.IGNORECASE)
+
+# Account To patterns
+TO_PATTERNS = register_family("accounts.to", [
+    # Account number patterns
+    r'(?:to|credited to|deposited to|deposit to|transferred to|transfer to)[^a-zA-Z0-9]*(?:a\/c|ac|acct|account)[^a-zA-Z0-9]*([A-Z]{2}\d+|\d+|[xX]+\d+)',
+    r'(?:to|credited to|deposited to|deposit to|transferred to|transfer to)[^a-zA-Z0-9]*((?:[xX]{2,}|\*{2,})\d{4,})',
+    r'(?:to|credited to|deposited to|deposit to|transferred to|transfer to)[^a-zA-Z0-9]*((?:\d{2,}[xX]{2,}|\d{2,}\*{2,}))',
+    
+    # UPI handles and beneficiaries
+    r'(?:to|credited to|deposited to|paid to)[^a-zA-Z0-9]*([a-zA-Z0-9_.]+@[a-zA-Z0-9]+)',
+    r'(?:to|credited to|deposited to|paid to|transfer to)[^a-zA-Z0-9]*([A-Za-z\s.]+)[^a-zA-Z0-9]*(?:via|using|on|through)',
+    r'(?:beneficiary|benef|payee)[^a-zA-Z0-9]*([A-Za-z\s.]+)[^a-zA-Z0-9]*(?:is|with)',
+    
+    # Merchant references
+    r'(?:merchant)[^a-zA-Z0-9]*([A-Za-z0-9\s.]+)',
+], re.IGNORECASE)
+
+# Masked digits in an extracted account, e.g. XX1234 or 1234XX
+MASKED_LEADING = register("accounts.masked_leading", r'[xX*]{2,}\d+')
+MASKED_TRAILING = register("accounts.masked_trailing", r'\d+[xX*]{2,}')
+
+def _trie_pattern(words: list) -> str:
+    """Build a regex that matches any of the words, shaped as a trie of their characters.
+
+    Shared prefixes are written once ("HDFC|HSBC" becomes "H(?:DFC|SBC)"), so
+    at each position re tries one branch per distinct next character rather
+    than one per word, and adding words barely changes the cost of a scan. A
+    longer word is preferred over a word that is its prefix.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return emit(trie)
+
+class BankMatcher:
+    """Finds every bank mention in a text in one pass and maps it to its bank.
+
+    Built once from an alias table {bank: [alias, ...]}. The aliases are
+    compiled into a single trie-shaped pattern (see _trie_pattern), registered
+    under the given name. With words, an alias is only found as a whole word,
+    not inside another ("YES" in "yesterday"). The aliases in cased, which
+    are also ordinary words, are only found as written ("UNION", not "union").
+    """
+
+    def __init__(self, name: str, aliases: dict, flags: int = 0, words: bool = False, cased: tuple = ()):
+        self.banks = {}
+        for bank, names in aliases.items():
+            for alias in names:
+                self.banks[alias.upper() if flags & re.IGNORECASE else alias] = bank
+        self.order = {bank: index for index, bank in enumerate(aliases)}
+        self.cased = frozenset(cased)
+        self._ignore_case = bool(flags & re.IGNORECASE)
+        pattern = _trie_pattern(sorted(self.banks))
+        if words:
+            pattern = r"(?<![A-Za-z0-9])(?:" + pattern + r")(?![A-Za-z0-9])"
+        self.pattern = register(name, pattern, flags)
+
+    def _bank(self, alias: str) -> str:
+        return self.banks[alias.upper() if self._ignore_case else alias]
+
+    def _matches(self, text: str):
+        if not self.cased:
+            return self.pattern.finditer(text)
+        return (match for match in self.pattern.finditer(text)
+                if match.group() in self.cased or match.group().upper() not in self.cased)
+
+    def search(self, text: str) -> bool:
+        """Check if any alias occurs in the text."""
+        if not self.cased:
+            return self.pattern.search(text) is not None
+        return next(self._matches(text), None) is not None
+
+    def find_all(self, text: str) -> list:
+        """Return (bank, start, end) for every non-overlapping mention, in order of position."""
+        return [(self._bank(match.group()), match.start(), match.end()) for match in self._matches(text)]
+
+    def first_bank(self, text: str) -> str:
+        """Return the mentioned bank that comes first in the alias table, or None."""
+        banks = {self._bank(match.group()) for match in self._matches(text)}
+        return min(banks, key=self.order.get) if banks else None
+
+    def first_bank_mention(self, text: str) -> tuple:
+        """Same as first_bank, as (bank, start, end) of its first mention, or None."""
+        mentions = self.find_all(text)
+        if not mentions:
+            return None
+        bank = min({bank for bank, _, _ in mentions}, key=self.order.get)
+        return next(mention for mention in mentions if mention[0] == bank)
+
+# Banks recognised in SMS text, by the code extract_bank reports for them
+KNOWN_BANKS = [
+    "HDFC", "SBI", "ICICI", "AXIS", "IDFC FIRST", "YES", "KOTAK", "PNB",
+    "BOB", "BOI", "CANARA", "UNION", "DEUTSCHE", "INDUSIND", "FEDERAL",
+    "RBL", "CITI", "HSBC", "IDBI", "UCO", "BANDHAN", "KARNATAKA", "INDIAN"
+]
+
+# Other names the known banks go by, merged with the codes themselves
+BANK_ALIASES = {bank: [bank, bank + " BANK"] for bank in KNOWN_BANKS}
+BANK_ALIASES["SBI"] += ["STATE BANK", "STATE BANK OF INDIA"]
+BANK_ALIASES["KOTAK"] += ["KOTAK MAHINDRA"]
+BANK_ALIASES["PNB"] += ["PUNJAB NATIONAL BANK"]
+BANK_ALIASES["BOB"] += ["BANK OF BARODA"]
+BANK_ALIASES["BOI"] += ["BANK OF INDIA"]
+BANK_ALIASES["UNION"] += ["UNION BANK OF INDIA"]
+BANK_ALIASES["IDFC FIRST"] += ["IDFC", "IDFC BANK"]
+
+# Codes that are also ordinary words or names ("yes", "Bob's"), which only name the
+# bank in capitals or followed by "Bank"
+WORD_CODES = ("YES", "BOB", "UNION", "FEDERAL", "INDIAN", "KARNATAKA")
+
+# The codes only, as matched against an upper-cased candidate in match_bank_patterns,
+# anywhere in it ("HDFCBK" names HDFC)
+KNOWN_BANK_CODES = BankMatcher("bank.known_codes", {bank: [bank] for bank in KNOWN_BANKS})
+# Every alias, in any case (but see WORD_CODES), as a whole word
+BANK_MENTIONS = BankMatcher("bank.mentions", BANK_ALIASES, re.IGNORECASE, words=True, cased=WORD_CODES)
+
+# UPI handles (the part of a VPA after the "@"), lowercase, by the bank or payment
+# app behind them. A handle named after a known bank code maps to that code.
+UPI_HANDLES = MappingProxyType({
+    **{bank.lower(): bank for bank in KNOWN_BANKS if " " not in bank},
+    "okhdfcbank": "HDFC", "hdfcbank": "HDFC", "payzapp": "HDFC", "pthdfc": "HDFC",
+    "oksbi": "SBI", "ptsbi": "SBI",
+    "okicici": "ICICI", "ibl": "ICICI",
+    "okaxis": "AXIS", "axl": "AXIS", "axisbank": "AXIS", "apl": "AXIS", "ptaxis": "AXIS", "okbizaxis": "AXIS",
+    "ybl": "YES", "yesbank": "YES", "ptyes": "YES",
+    "kmbl": "KOTAK", "kotak811": "KOTAK",
+    "idfcbank": "IDFC FIRST", "idfcfirst": "IDFC FIRST",
+    "barodampay": "BOB",
+    "unionbank": "UNION", "unionbankofindia": "UNION",
+    "cnrb": "CANARA",
+    "indus": "INDUSIND",
+    "fbl": "FEDERAL",
+    "kbl": "KARNATAKA",
+    "indianbank": "INDIAN",
+    "paytm": "PAYTM",
+})
+# Handles that are also recognised inside a longer handle, e.g. "okicicix"
+EMBEDDED_HANDLES = ("okicici", "okaxis", "ybl")
+
+def vpa_bank(vpa: str) -> str:
+    """Return the bank or payment app behind a VPA (user@handle) or bare handle, or None."""
+    handle = vpa.rpartition("@")[2].lower()
+    bank = UPI_HANDLES.get(handle)
+    if bank is None:
+        for embedded in EMBEDDED_HANDLES:
+            if embedded in handle:
+                return UPI_HANDLES[embedded]
+    return bank
+
+def find_bank_mentions(sms: str) -> list:
+    """Return (bank code, start, end) for every bank named in the SMS, in one pass."""
+    return BANK_MENTIONS.find_all(sms)
+
+def _names_known_bank(known_banks, text: str) -> bool:
+    """Check if an upper-cased text contains a known bank, given as a BankMatcher or a list of codes."""
+    if isinstance(known_banks, BankMatcher):
+        return known_banks.search(text)
+    return any(bank in text for bank in known_banks)
+
+def match_bank_patterns_with_span(sms: str, known_banks, bank_patterns: list) -> tuple:
+    """Helper function to match bank patterns in SMS.
+
+    known_banks is a BankMatcher (such as KNOWN_BANK_CODES) or a list of bank
+    codes; the patterns are compiled or, as strings, searched ignoring case.
+    Returns (bank, confidence, span), where span is the (start, end) of the bank
+    name in the SMS; (None, 0.0, None) if there is none.
+    """
+    # A candidate is only accepted if it names a known bank, which it cannot do
+    # if the SMS itself names none
+    if not _names_known_bank(known_banks, sms.upper()):
+        return None, 0.0, None
     for pattern in bank_patterns:
-        match = re.search(pattern, sms, re.IGNORECASE)
+        match = re.search(pattern, sms, re.IGNORECASE) if isinstance(pattern, str) else pattern.search(sms)
         if match:
             potential_bank = match.group(1).strip().strip('.:,')
-            potential_bank = re.sub(r"^(?:from|alert|to|in|your)\s+", "", potential_bank, flags=re.IGNORECASE)
-            for known_bank in known_banks:
-                if known_bank in potential_bank.upper():
-                    return potential_bank, 0.9
-    return None, 0.0
+            potential_bank = BANK_PREFIX.sub("", potential_bank)
+            if _names_known_bank(known_banks, potential_bank.upper()):
+                # What is left is part of the group: find where
+                start = sms.find(potential_bank, match.start(1), match.end(1))
+                return potential_bank, 0.9, (start, start + len(potential_bank))
+    return None, 0.0, None
+
+def match_bank_patterns(sms: str, known_banks, bank_patterns: list) -> tuple:
+    """Same as match_bank_patterns_with_span, without the span: (bank, confidence)."""
+    return match_bank_patterns_with_span(sms, known_banks, bank_patterns)[:2]
 
 def match_upi_or_account(sms: str, known_banks: list, account_prefix_to_bank: dict) -> dict:
-    """Helper function to match UPI or account prefix for bank inference."""
-    upi_match = re.search(r'@([a-z]+)', sms, re.IGNORECASE)
+    """Helper function to match UPI handle or account prefix for bank inference.
+
+    The handle is looked up in UPI_HANDLES; one that is not there but is named
+    after a bank in known_banks maps to that bank.
+    """
+    upi_match = UPI_SUFFIX.search(sms)
     if upi_match:
-        upi_suffix = upi_match.group(1).upper()
-        if upi_suffix in [bank.upper() for bank in known_banks]:
-            return {"value": upi_suffix, "confidence": 0.65, "error": None}
-        elif "OKICICI" in upi_suffix:
-            return {"value": "ICICI", "confidence": 0.65, "error": None}
-        elif "OKAXIS" in upi_suffix:
-            return {"value": "AXIS", "confidence": 0.65, "error": None}
-        elif "YBL" in upi_suffix:
-            return {"value": "YES", "confidence": 0.65, "error": None}
-    account_match = re.search(r'(?:xx|x|XX)(\d{2})\d+', sms)
+        bank = vpa_bank(upi_match.group(1))
+        if bank is None and upi_match.group(1).upper() in known_banks:
+            bank = upi_match.group(1).upper()
+        if bank:
+            return {"value": bank, "confidence": 0.65, "error": None, "span": upi_match.span(1)}
+    account_match = ACCOUNT_PREFIX.search(sms)
     if account_match:
         prefix = account_match.group(1)
         if prefix in account_prefix_to_bank:
-            return {"value": account_prefix_to_bank[prefix], "confidence": 0.5, "error": None}
-    return {"value": None, "confidence": 0.0, "error": "Bank name not found"}
+            return {"value": account_prefix_to_bank[prefix], "confidence": 0.5, "error": None,
+                    "span": account_match.span()}
+    return {"value": None, "confidence": 0.0, "error": "Bank name not found", "span": None}
 
 def extract_accounts(text):
     """
@@ -40,54 +249,22 @@ def extract_accounts(text):
     Identifies both source (from) and destination (to) accounts.
     Returns a tuple of (from_account, from_confidence, to_account, to_confidence)
     """
-    # Account From patterns
-    from_patterns = [
-        # Account number patterns
-        r'(?:from|debited from|withdrawn from|fr)[^a-zA-Z0-9]*(?:a\/c|ac|acct|account)[^a-zA-Z0-9]*([A-Z]{2}\d+|\d+|[xX]+\d+)',
-        r'(?:from|debited from|withdrawn from|fr)[^a-zA-Z0-9]*((?:[xX]{2,}|\*{2,})\d{4,})',
-        r'(?:from|debited from|withdrawn from)[^a-zA-Z0-9]*((?:\d{2,}[xX]{2,}|\d{2,}\*{2,}))',
-        r'(?:a\/c|ac|acct|account)[^a-zA-Z0-9]*([xX]{2,}\d{4,}|\d{2,}[xX]{2,}|\*{2,}\d{4,}|\d{2,}\*{2,})[^a-zA-Z0-9]*(?:debited|txn|transaction)',
-        
-        # UPI handles
-        r'(?:from|debited from|withdrawn from)[^a-zA-Z0-9]*(\w+@\w+)',
-        
-        # Card references
-        r'(?:card)[^a-zA-Z0-9]*([xX]{2,}\d{4,}|\d{2,}[xX]{2,})',
-        r'(?:using|via)[^a-zA-Z0-9]*card[^a-zA-Z0-9]*(\d+[xX]+\d+|\d+)',
-    ]
-    
-    # Account To patterns
-    to_patterns = [
-        # Account number patterns
-        r'(?:to|credited to|deposited to|deposit to|transferred to|transfer to)[^a-zA-Z0-9]*(?:a\/c|ac|acct|account)[^a-zA-Z0-9]*([A-Z]{2}\d+|\d+|[xX]+\d+)',
-        r'(?:to|credited to|deposited to|deposit to|transferred to|transfer to)[^a-zA-Z0-9]*((?:[xX]{2,}|\*{2,})\d{4,})',
-        r'(?:to|credited to|deposited to|deposit to|transferred to|transfer to)[^a-zA-Z0-9]*((?:\d{2,}[xX]{2,}|\d{2,}\*{2,}))',
-        
-        # UPI handles and beneficiaries
-        r'(?:to|credited to|deposited to|paid to)[^a-zA-Z0-9]*([a-zA-Z0-9_.]+@[a-zA-Z0-9]+)',
-        r'(?:to|credited to|deposited to|paid to|transfer to)[^a-zA-Z0-9]*([A-Za-z\s.]+)[^a-zA-Z0-9]*(?:via|using|on|through)',
-        r'(?:beneficiary|benef|payee)[^a-zA-Z0-9]*([A-Za-z\s.]+)[^a-zA-Z0-9]*(?:is|with)',
-        
-        # Merchant references
-        r'(?:merchant)[^a-zA-Z0-9]*([A-Za-z0-9\s.]+)',
-    ]
-    
     # Account From extraction
     from_account = None
     from_confidence = 0.0
     
-    for pattern in from_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in FROM_PATTERNS:
+        match = pattern.search(text)
         if match:
             from_account = match.group(1).strip()
             from_confidence = 0.7  # Base confidence
             
             # Boost confidence for clearer patterns
-            if 'a/c' in pattern or 'account' in pattern:
+            if 'a/c' in pattern.pattern or 'account' in pattern.pattern:
                 from_confidence = 0.8
                 
             # Extra boost for account with masked digits
-            if re.search(r'[xX*]{2,}\d+', from_account) or re.search(r'\d+[xX*]{2,}', from_account):
+            if MASKED_LEADING.search(from_account) or MASKED_TRAILING.search(from_account):
                 from_confidence = 0.85
                 
             break
@@ -96,14 +273,14 @@ def extract_accounts(text):
     to_account = None
     to_confidence = 0.0
     
-    for pattern in to_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in TO_PATTERNS:
+        match = pattern.search(text)
         if match:
             to_account = match.group(1).strip()
             to_confidence = 0.7  # Base confidence
             
             # Boost confidence for clearer patterns
-            if 'a/c' in pattern or 'account' in pattern:
+            if 'a/c' in pattern.pattern or 'account' in pattern.pattern:
                 to_confidence = 0.8
                 
             # Boost for email-like UPI handles
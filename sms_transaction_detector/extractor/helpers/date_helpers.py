@@ -1,87 +1,281 @@
 import re
 import datetime
+import functools
 from dateutil import parser
 from dateutil.relativedelta import relativedelta
 import pytz
 import calendar
+from ..patterns import register, register_family
+from ..lexicon import Lexicon
 
-def match_date_patterns(sms: str, date_patterns: list, today: datetime.datetime) -> tuple:
-    """Helper function to match date patterns in SMS."""
+IST = pytz.timezone('Asia/Kolkata')
+
+# Distinct (date text, reference day) pairs kept by each parse cache
+DATE_CACHE_SIZE = 4096
+
+def _month_name_parts() -> dict:
+    """Map every lowercase part of a month name to the first month whose name contains it.
+
+    This is what looping over calendar.month_name (then month_abbr) and testing
+    `part in month.lower()` finds: "mar" -> 3, "ju" -> 6.
+    """
+    parts = {}
+    for names in (calendar.month_name, calendar.month_abbr):
+        for number, name in enumerate(names[1:], 1):
+            name = name.lower()
+            for start in range(len(name)):
+                for end in range(start + 1, len(name) + 1):
+                    parts.setdefault(name[start:end], number)
+    return parts
+
+MONTH_NAME_PARTS = _month_name_parts()
+
+ORDINAL_SUFFIX = register("date.ordinal_suffix", r'(?:st|nd|rd|th)')
+TODAY = register("date.relative.today", r'\btoday\b', re.IGNORECASE)
+YESTERDAY = register("date.relative.yesterday", r'\byesterday\b', re.IGNORECASE)
+TOMORROW = register("date.relative.tomorrow", r'\btomorrow\b', re.IGNORECASE)
+
+SERVICE_TERMS = ['bill', 'recharge', 'payment', 'subscription', 'utility', 'electricity',
+                 'broadband', 'mobile', 'dth', 'gas', 'water', 'landline', 'insurance']
+SERVICE_TERM_PATTERN = register("date.context.service", r'\b(?:' + '|'.join(map(re.escape, SERVICE_TERMS)) + r')\b', re.IGNORECASE)
+REFERENCE_PATTERN = register("date.context.reference", r'\b(?:ref|reference)\b[^a-zA-Z0-9]*[a-zA-Z0-9]+', re.IGNORECASE)
+BILL_PATTERN = register("date.context.bill", r'\bbill\b', re.IGNORECASE)
+SUBSCRIPTION_PATTERN = register("date.context.subscription", r'\bsubscription\b', re.IGNORECASE)
+# The same terms as word sets, for the lexicon
+SERVICE_TERM_SET = frozenset(SERVICE_TERMS)
+REFERENCE_WORDS = frozenset(['ref', 'reference'])
+BILL_WORDS = frozenset(['bill'])
+SUBSCRIPTION_WORDS = frozenset(['subscription'])
+BILL_PERIOD_PATTERN = register("date.context.bill_period", r'(?:bill|payment)\s+(?:for|of)\s+(?:month|period)?\s*(?:of)?\s*([a-zA-z]{3,9})(?:[,-]?\s*(\d{2,4}))?', re.IGNORECASE)
+TIME_PATTERN = register("date.time", r'(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)', re.IGNORECASE)
+# The parts of a time found by TIME_PATTERN
+TIME_PARTS = register("date.time_parts", r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([ap]m)?', re.IGNORECASE)
+
+# Define custom patterns with their format
+CUSTOM_PATTERNS = register_family("date.custom", [
+    # DD-MM-YY with various separators
+    (r'(\d{1,2})[-./](\d{1,2})[-./](\d{2})\b', "%d-%m-%y"),
+    
+    # DD-MM-YYYY with various separators
+    (r'(\d{1,2})[-./](\d{1,2})[-./](20\d{2})\b', "%d-%m-%Y"),
+    
+    # YYYY-MM-DD format (ISO)
+    (r'(20\d{2})[-./](\d{1,2})[-./](\d{1,2})\b', "%Y-%m-%d"),
+    
+    # DD-MMM-YY with abbreviated month
+    (r'(\d{1,2})[-./\s]([A-Za-z]{3})[-./\s](\d{2})\b', "%d-%b-%y"),
+    
+    # DD-MMM-YYYY with abbreviated month
+    (r'(\d{1,2})[-./\s]([A-Za-z]{3})[-./\s](20\d{2})\b', "%d-%b-%Y"),
+    
+    # Month DD, YYYY format
+    (r'([A-Za-z]{3,9})\s+(\d{1,2})(?:st|nd|rd|th)?,?\s*(20\d{2})', "%B %d %Y"),
+    
+    # DD Month, YYYY format
+    (r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9}),?\s*(20\d{2})', "%d %B %Y"),
+    
+    # DD Month format (without year)
+    (r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\b(?!\s*\d)', "%d %B"),
+    
+    # DD-MM format (without year)
+    (r'(\d{1,2})[-./](\d{1,2})\b(?!\s*\d)', "%d-%m"),
+    
+    # Month DD format (without year)
+    (r'([A-Za-z]{3,9})\s+(\d{1,2})(?:st|nd|rd|th)?\b(?!\s*\d)', "%B %d"),
+], re.IGNORECASE)
+
+# Common date patterns in SMS with explicit date indicators
+EXPLICIT_PATTERNS = register_family("date.indicator", [
+    # Common date patterns with "on", "dated", "date", etc.
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4})',
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/\-.\s]+\d{2,4})',
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December)[/\-.\s]+\d{2,4})',
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{4}[/\-.]\d{1,2}[/\-.]\d{1,2})',
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*)',
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December))',
+    
+    # Relative dates
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(today)',
+    r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(yesterday)',
+], re.IGNORECASE)
+
+# Date patterns without explicit date indicators
+IMPLICIT_PATTERNS = register_family("date.implicit", [
+    # DD-MM-YYYY or DD/MM/YYYY formats without indicators
+    r'(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{4})',
+    r'(\d{1,2}[/\-.]\d{1,2}[/\-.]2\d{1})', # 2-digit year with 2 prefix (like 21)
+    
+    # YYYY-MM-DD formats (ISO)
+    r'(20\d{2}[/\-.]\d{1,2}[/\-.]\d{1,2})',
+    
+    # DD-MMM-YYYY formats
+    r'(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/\-.\s]+\d{4})',
+    r'(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December)[/\-.\s]+\d{4})',
+    
+    # Month DD, YYYY formats
+    r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/\-.\s]+\d{1,2}(?:st|nd|rd|th)?[/\-.\s,]+\d{4})',
+    r'((?:January|February|March|April|May|June|July|August|September|October|November|December)[/\-.\s]+\d{1,2}(?:st|nd|rd|th)?[/\-.\s,]+\d{4})',
+    
+    # Month DD formats (without year)
+    r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/\-.\s]+\d{1,2}(?:st|nd|rd|th)?)',
+    r'((?:January|February|March|April|May|June|July|August|September|October|November|December)[/\-.\s]+\d{1,2}(?:st|nd|rd|th)?)',
+    
+    # DD Month formats (without year)
+    r'(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*)',
+    r'(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December))',
+    
+    # Abbreviated formats
+    r'(\d{1,2}[/-]\d{1,2})',  # DD-MM or MM-DD (common in SMS)
+], re.IGNORECASE)
+
+# Combined patterns for timestamp date-time formats
+TIMESTAMP_PATTERNS = register_family("date.timestamp", [
+    # Date + Time patterns
+    r'(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4})[^a-zA-Z0-9]*(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)',
+    r'(\d{4}[/\-.]\d{1,2}[/\-.]\d{1,2})[^a-zA-Z0-9]*(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)',
+    r'(\d{1,2}(?:st|nd|rd|th)?[/\-.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/\-.\s]+\d{2,4})[^a-zA-Z0-9]*(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)',
+], re.IGNORECASE)
+
+# Every date the explicit, timestamp and implicit patterns can find contains one
+# of these: a digit, a date separator and another digit (with at least two
+# separators if the first is a dot, as a lone dot is usually a decimal point),
+# a month name or "today"/"yesterday". An SMS without any is ruled out in one scan.
+DATE_GATE = register("date.gate", r"""
+    \d(?:[/\-]\d|\.\d{1,2}[/\-.]\d)
+  | (?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|today|yesterday)
+""", re.IGNORECASE | re.VERBOSE)
+
+def parse_date_match(match, fmt: str) -> str:
+    """Read a date pattern match as "YYYY-MM-DD" using its format, or None if it is no valid date."""
+    return _parse_date_groups(match.groups(), fmt)
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date_groups(groups: tuple, fmt: str) -> str:
+    """parse_date_match, cached on the groups of the match: the same few dates recur in a batch."""
+    try:
+        if "-%b-" in fmt:
+            day, month_abbr, year = groups
+            month_dict = {
+                'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
+                'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
+                'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
+            }
+            month = month_dict.get(month_abbr.lower(), '01')
+            dt_str = f"{day}-{month}-{year}"
+            if len(year) == 2:
+                year_prefix = "20" if int(year) < 50 else "19"
+                dt = datetime.datetime.strptime(f"{day}-{month}-{year_prefix}{year}", "%d-%m-%Y")
+            else:
+                dt = datetime.datetime.strptime(dt_str, "%d-%m-%Y")
+        elif "%B" in fmt:
+            if "%d %B %Y" == fmt:
+                day, month_name, year = groups
+            else:
+                month_name, day, year = groups
+            day = ORDINAL_SUFFIX.sub('', day)
+            dt_str = f"{day} {month_name} {year}"
+            dt = datetime.datetime.strptime(dt_str, "%d %B %Y")
+        else:
+            dt_str = "-".join(groups)
+            dt = datetime.datetime.strptime(dt_str, fmt)
+    except (ValueError, KeyError):
+        return None
+    if dt.year < 2000:
+        dt = dt.replace(year=dt.year + 2000)
+    return dt.strftime("%Y-%m-%d")
+
+def date_span(match) -> tuple:
+    """Return the (start, end) of the date in a date pattern match, without words such as "on"."""
+    return match.start(1), match.end(match.lastindex)
+
+def match_date_patterns_with_span(sms: str, date_patterns: list, today: datetime.datetime) -> tuple:
+    """Helper function to match date patterns in SMS.
+
+    Returns (date, confidence, span), where span is the (start, end) of the
+    date text in the SMS; (None, 0.0, None) if there is none.
+    """
     for pattern, fmt in date_patterns:
-        match = re.search(pattern, sms, re.IGNORECASE)
+        match = pattern.search(sms)
         if match:
-            try:
-                if "-%b-" in fmt:
-                    day, month_abbr, year = match.groups()
-                    month_dict = {
-                        'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
-                        'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
-                        'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
-                    }
-                    month = month_dict.get(month_abbr.lower(), '01')
-                    dt_str = f"{day}-{month}-{year}"
-                    if len(year) == 2:
-                        year_prefix = "20" if int(year) < 50 else "19"
-                        dt = datetime.datetime.strptime(f"{day}-{month}-{year_prefix}{year}", "%d-%m-%Y")
-                    else:
-                        dt = datetime.datetime.strptime(dt_str, "%d-%m-%Y")
-                elif "%B" in fmt:
-                    groups = match.groups()
-                    if "%d %B %Y" == fmt:
-                        day, month_name, year = groups
-                    else:
-                        month_name, day, year = groups
-                    day = re.sub(r'(?:st|nd|rd|th)', '', day)
-                    dt_str = f"{day} {month_name} {year}"
-                    dt = datetime.datetime.strptime(dt_str, "%d %B %Y")
-                else:
-                    dt_str = "-".join(match.groups())
-                    dt = datetime.datetime.strptime(dt_str, fmt)
-                if dt.year < 2000:
-                    dt = dt.replace(year=dt.year + 2000)
-                return dt.strftime("%Y-%m-%d"), 0.95
-            except (ValueError, KeyError):
-                continue
-    return None, 0.0
+            date_value = parse_date_match(match, fmt)
+            if date_value:
+                return date_value, 0.95, date_span(match)
+    return None, 0.0, None
+
+def match_date_patterns(sms: str, date_patterns: list, today: datetime.datetime) -> tuple:
+    """Same as match_date_patterns_with_span, without the span: (date, confidence)."""
+    return match_date_patterns_with_span(sms, date_patterns, today)[:2]
+
+def match_date_tier_with_span(sms: str, tier, formats: dict, plan: dict = None) -> tuple:
+    """Same as match_date_patterns_with_span, with the patterns searched as a PatternTier.
+
+    formats maps each pattern of the tier to its date format. The tier can take
+    a sender plan (see plans.py), which the plain loop cannot.
+    """
+    parsed = {}
+
+    def parses(match) -> bool:
+        parsed[match] = parse_date_match(match, formats[match.re])
+        return parsed[match] is not None
+
+    _, match = tier.search(sms, accept=parses, plan=plan)
+    if match is None:
+        return None, 0.0, None
+    return parsed[match], 0.95, date_span(match)
+
+def match_date_tier(sms: str, tier, formats: dict, plan: dict = None) -> tuple:
+    """Same as match_date_tier_with_span, without the span: (date, confidence)."""
+    return match_date_tier_with_span(sms, tier, formats, plan)[:2]
+
+# Days from the reference day of each relative date word
+RELATIVE_DAYS = {"today": 0, "yesterday": -1, "tomorrow": 1}
+
+def match_relative_dates_with_span(sms: str, today: datetime.datetime) -> tuple:
+    """Helper function to match relative dates in SMS.
+
+    Returns (date, confidence, span), where span is the (start, end) of the
+    word in the SMS; (None, 0.0, None) if there is none.
+    """
+    for word, pattern in (("today", TODAY), ("yesterday", YESTERDAY), ("tomorrow", TOMORROW)):
+        match = pattern.search(sms)
+        if match:
+            day = today + datetime.timedelta(days=RELATIVE_DAYS[word])
+            return day.strftime("%Y-%m-%d"), 0.85, match.span()
+    return None, 0.0, None
 
 def match_relative_dates(sms: str, today: datetime.datetime) -> tuple:
-    """Helper function to match relative dates in SMS."""
-    if re.search(r'\btoday\b', sms, re.IGNORECASE):
-        return today.strftime("%Y-%m-%d"), 0.85
-    elif re.search(r'\byesterday\b', sms, re.IGNORECASE):
-        yesterday = today - datetime.timedelta(days=1)
-        return yesterday.strftime("%Y-%m-%d"), 0.85
-    elif re.search(r'\btomorrow\b', sms, re.IGNORECASE):
-        tomorrow = today + datetime.timedelta(days=1)
-        return tomorrow.strftime("%Y-%m-%d"), 0.85
-    return None, 0.0
+    """Same as match_relative_dates_with_span, without the span: (date, confidence)."""
+    return match_relative_dates_with_span(sms, today)[:2]
 
-def extract_transaction_context(sms: str) -> dict:
+def match_relative_tokens_with_span(tokens: list, today: datetime.datetime) -> tuple:
+    """Same as match_relative_dates_with_span, from the relative tokens of the SMS lexer."""
+    first = {}
+    for token in tokens:
+        if token.kind == "relative":
+            first.setdefault(token.value, token)
+    for word in ("today", "yesterday", "tomorrow"):
+        token = first.get(word)
+        if token:
+            day = today + datetime.timedelta(days=RELATIVE_DAYS[word])
+            return day.strftime("%Y-%m-%d"), 0.85, (token.start, token.end)
+    return None, 0.0, None
+
+def match_relative_tokens(tokens: list, today: datetime.datetime) -> tuple:
+    """Same as match_relative_tokens_with_span, without the span: (date, confidence)."""
+    return match_relative_tokens_with_span(tokens, today)[:2]
+
+def extract_transaction_context(sms: str, lexicon: Lexicon = None) -> dict:
     """Extract context from SMS to help with date inference."""
+    if lexicon is None:
+        lexicon = Lexicon(sms)
+
     context = {
-        'is_service_payment': False,
-        'contains_reference': False,
-        'contains_bill': False,
-        'contains_subscription': False
+        'is_service_payment': lexicon.has_word(SERVICE_TERM_SET, SERVICE_TERM_PATTERN),
+        'contains_reference': lexicon.followed_by_alnum(REFERENCE_WORDS, REFERENCE_PATTERN),
+        'contains_bill': lexicon.has_word(BILL_WORDS, BILL_PATTERN),
+        'contains_subscription': lexicon.has_word(SUBSCRIPTION_WORDS, SUBSCRIPTION_PATTERN)
     }
     
-    service_terms = ['bill', 'recharge', 'payment', 'subscription', 'utility', 'electricity', 
-                     'broadband', 'mobile', 'dth', 'gas', 'water', 'landline', 'insurance']
-    
-    for term in service_terms:
-        if re.search(r'\b' + re.escape(term) + r'\b', sms, re.IGNORECASE):
-            context['is_service_payment'] = True
-            break
-    
-    if re.search(r'\b(?:ref|reference)\b[^a-zA-Z0-9]*[a-zA-Z0-9]+', sms, re.IGNORECASE):
-        context['contains_reference'] = True
-    
-    if re.search(r'\bbill\b', sms, re.IGNORECASE):
-        context['contains_bill'] = True
-    
-    if re.search(r'\bsubscription\b', sms, re.IGNORECASE):
-        context['contains_subscription'] = True
-    
     return context
 
 def infer_date_from_context(sms: str, context: dict, now: datetime.datetime) -> tuple:
@@ -89,8 +283,7 @@ def infer_date_from_context(sms: str, context: dict, now: datetime.datetime) ->
     # For service payments without dates, assume it's recent (today or yesterday)
     if context['is_service_payment']:
         # Check if it contains a bill period
-        bill_period_match = re.search(r'(?:bill|payment)\s+(?:for|of)\s+(?:month|period)?\s*(?:of)?\s*([a-zA-z]{3,9})(?:[,-]?\s*(\d{2,4}))?', 
-                                      sms, re.IGNORECASE)
+        bill_period_match = BILL_PERIOD_PATTERN.search(sms)
         if bill_period_match:
             try:
                 month_name = bill_period_match.group(1)
@@ -99,11 +292,7 @@ def infer_date_from_context(sms: str, context: dict, now: datetime.datetime) ->
                     year = "20" + year
                 
                 # Map month name to number
-                month_number = None
-                for i, month in enumerate(calendar.month_name[1:], 1):
-                    if month_name.lower() in month.lower():
-                        month_number = i
-                        break
+                month_number = MONTH_NAME_PARTS.get(month_name.lower())
                 
                 if month_number:
                     # Assume bill payment is for last month
@@ -130,43 +319,19 @@ def infer_date_from_context(sms: str, context: dict, now: datetime.datetime) ->
     return None, 0.0
 
 def parse_date_with_custom_formats(date_text: str, now: datetime.datetime) -> tuple:
-    """Try to parse dates with custom formats not handled well by dateutil."""
-    
-    # Define custom patterns with their format
-    custom_patterns = [
-        # DD-MM-YY with various separators
-        (r'(\d{1,2})[-./](\d{1,2})[-./](\d{2})\b', "%d-%m-%y"),
-        
-        # DD-MM-YYYY with various separators
-        (r'(\d{1,2})[-./](\d{1,2})[-./](20\d{2})\b', "%d-%m-%Y"),
-        
-        # YYYY-MM-DD format (ISO)
-        (r'(20\d{2})[-./](\d{1,2})[-./](\d{1,2})\b', "%Y-%m-%d"),
-        
-        # DD-MMM-YY with abbreviated month
-        (r'(\d{1,2})[-./\s]([A-Za-z]{3})[-./\s](\d{2})\b', "%d-%b-%y"),
-        
-        # DD-MMM-YYYY with abbreviated month
-        (r'(\d{1,2})[-./\s]([A-Za-z]{3})[-./\s](20\d{2})\b', "%d-%b-%Y"),
-        
-        # Month DD, YYYY format
-        (r'([A-Za-z]{3,9})\s+(\d{1,2})(?:st|nd|rd|th)?,?\s*(20\d{2})', "%B %d %Y"),
-        
-        # DD Month, YYYY format
-        (r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9}),?\s*(20\d{2})', "%d %B %Y"),
-        
-        # DD Month format (without year)
-        (r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\b(?!\s*\d)', "%d %B"),
-        
-        # DD-MM format (without year)
-        (r'(\d{1,2})[-./](\d{1,2})\b(?!\s*\d)', "%d-%m"),
-        
-        # Month DD format (without year)
-        (r'([A-Za-z]{3,9})\s+(\d{1,2})(?:st|nd|rd|th)?\b(?!\s*\d)', "%B %d"),
-    ]
-    
-    for pattern, fmt in custom_patterns:
-        match = re.search(pattern, date_text, re.IGNORECASE)
+    """Try to parse dates with custom formats not handled well by dateutil.
+
+    Only the day of now matters, so results are cached per (date_text, day).
+    """
+    return _parse_custom_for_day(date_text, now.date())
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_custom_for_day(date_text: str, reference_day: datetime.date) -> tuple:
+    """parse_date_with_custom_formats for a reference day."""
+    now = datetime.datetime.combine(reference_day, datetime.time())
+
+    for pattern, fmt in CUSTOM_PATTERNS:
+        match = pattern.search(date_text)
         if match:
             try:
                 groups = match.groups()
@@ -229,21 +394,10 @@ def parse_date_with_custom_formats(date_text: str, now: datetime.datetime) -> tu
                         year = str(now.year)
                     
                     # Remove ordinal indicators
-                    day = re.sub(r'(?:st|nd|rd|th)', '', day)
-                    
-                    # Try to match month name to calendar months
-                    month_number = None
-                    for i, month in enumerate(calendar.month_name[1:], 1):
-                        if month_name.lower() in month.lower():
-                            month_number = i
-                            break
+                    day = ORDINAL_SUFFIX.sub('', day)
                     
-                    if not month_number:
-                        # Try abbreviated month names as fallback
-                        for i, month in enumerate(calendar.month_abbr[1:], 1):
-                            if month_name.lower() in month.lower():
-                                month_number = i
-                                break
+                    # Try to match month name to calendar months (or their abbreviations)
+                    month_number = MONTH_NAME_PARTS.get(month_name.lower())
                     
                     if month_number:
                         # Normalize day
@@ -297,77 +451,75 @@ def parse_date_with_custom_formats(date_text: str, now: datetime.datetime) -> tu
     
     return None, 0.0
 
-def extract_date(text):
+def parse_date_with_dateutil(date_text: str, now: datetime.datetime, implicit: bool = False) -> str:
+    """Parse a date the custom formats could not read with dateutil, or return None.
+
+    Only the day of now matters (dateutil fills in missing parts from it), so
+    results are cached per (date_text, day).
+    """
+    return _parse_dateutil_for_day(date_text, now.date(), implicit)
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_dateutil_for_day(date_text: str, reference_day: datetime.date, implicit: bool) -> str:
+    """parse_date_with_dateutil for a reference day."""
+    now = datetime.datetime.combine(reference_day, datetime.time())
+    try:
+        parsed_date = parser.parse(date_text, default=now, fuzzy=True)
+        
+        # Fix years that might be parsed incorrectly
+        if parsed_date.year < 2000:
+            parsed_date = parsed_date.replace(year=parsed_date.year + 2000)
+        
+        # Handle future dates (likely parsing errors); for implicit dates, only
+        # for two-digit year formats
+        if (not implicit or len(date_text) <= 10) and parsed_date.date() > now.date() + datetime.timedelta(days=30):
+            # If more than a month in the future, assume it's this or last year
+            parsed_date = parsed_date.replace(year=now.year)
+            if parsed_date.date() > now.date() + datetime.timedelta(days=30):
+                parsed_date = parsed_date.replace(year=now.year - 1)
+        
+        return parsed_date.strftime('%Y-%m-%d')
+    except:
+        return None
+
+def parse_time(time_text: str) -> datetime.time:
+    """Read a time found by TIME_PATTERN ("10:30", "10:30:15 PM"); raises ValueError if it is not a valid time."""
+    hour, minute, second, meridiem = TIME_PARTS.fullmatch(time_text).groups()
+    hour = int(hour)
+    if meridiem:
+        if hour > 12:
+            raise ValueError("Invalid hour specified for 12-hour clock")
+        if meridiem.lower() == 'pm' and hour < 12:
+            hour += 12
+        elif meridiem.lower() == 'am' and hour == 12:
+            hour = 0
+    return datetime.time(hour, int(minute), int(second or 0))
+
+def extract_date(text, now: datetime.datetime = None):
     """
     Extract transaction date from SMS
     Returns a tuple of (date_str, confidence_score)
     
     Enhanced version with improved pattern matching, relative date handling,
-    and context-based inference for service payments
+    and context-based inference for service payments.
+
+    Relative and incomplete dates are resolved against now, which defaults to
+    the current time (local, and in IST); a batch can fix it once to get the
+    same results on every message.
     """
     # Get current date for reference
-    now = datetime.datetime.now()
-    ist_timezone = pytz.timezone('Asia/Kolkata')
-    now_ist = datetime.datetime.now(ist_timezone)
-    
-    # Common date patterns in SMS with explicit date indicators
-    explicit_patterns = [
-        # Common date patterns with "on", "dated", "date", etc.
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}[/-\.]\d{1,2}[/-\.]\d{2,4})',
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/-\.\s]+\d{2,4})',
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December)[/-\.\s]+\d{2,4})',
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{4}[/-\.]\d{1,2}[/-\.]\d{1,2})',
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*)',
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December))',
-        
-        # Relative dates
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(today)',
-        r'(?:on|dated|date|as\s+of)[^a-zA-Z0-9]*(yesterday)',
-    ]
-    
-    # Date patterns without explicit date indicators
-    implicit_patterns = [
-        # DD-MM-YYYY or DD/MM/YYYY formats without indicators
-        r'(\d{1,2}[/-\.]\d{1,2}[/-\.]\d{4})',
-        r'(\d{1,2}[/-\.]\d{1,2}[/-\.]2\d{1})', # 2-digit year with 2 prefix (like 21)
-        
-        # YYYY-MM-DD formats (ISO)
-        r'(20\d{2}[/-\.]\d{1,2}[/-\.]\d{1,2})',
-        
-        # DD-MMM-YYYY formats
-        r'(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/-\.\s]+\d{4})',
-        r'(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December)[/-\.\s]+\d{4})',
-        
-        # Month DD, YYYY formats
-        r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/-\.\s]+\d{1,2}(?:st|nd|rd|th)?[/-\.\s,]+\d{4})',
-        r'((?:January|February|March|April|May|June|July|August|September|October|November|December)[/-\.\s]+\d{1,2}(?:st|nd|rd|th)?[/-\.\s,]+\d{4})',
-        
-        # Month DD formats (without year)
-        r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/-\.\s]+\d{1,2}(?:st|nd|rd|th)?)',
-        r'((?:January|February|March|April|May|June|July|August|September|October|November|December)[/-\.\s]+\d{1,2}(?:st|nd|rd|th)?)',
-        
-        # DD Month formats (without year)
-        r'(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*)',
-        r'(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:January|February|March|April|May|June|July|August|September|October|November|December))',
-        
-        # Abbreviated formats
-        r'(\d{1,2}[/-]\d{1,2})',  # DD-MM or MM-DD (common in SMS)
-    ]
-    
-    # Combined patterns for timestamp date-time formats
-    timestamp_patterns = [
-        # Date + Time patterns
-        r'(\d{1,2}[/-\.]\d{1,2}[/-\.]\d{2,4})[^a-zA-Z0-9]*(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)',
-        r'(\d{4}[/-\.]\d{1,2}[/-\.]\d{1,2})[^a-zA-Z0-9]*(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)',
-        r'(\d{1,2}(?:st|nd|rd|th)?[/-\.\s]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[/-\.\s]+\d{2,4})[^a-zA-Z0-9]*(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)',
-    ]
-    
-    # Check context of the SMS for better date inference
-    context = extract_transaction_context(text)
+    if now is None:
+        now = datetime.datetime.now()
+        now_ist = datetime.datetime.now(IST)
+    else:
+        now_ist = now
     
+    # The pattern families below are only tried if the SMS has something date-like in it
+    dated = DATE_GATE.search(text) is not None
+
     # 1. First, try to find explicit date indicators with high confidence
-    for pattern in explicit_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in (EXPLICIT_PATTERNS if dated else ()):
+        match = pattern.search(text)
         if match:
             date_text = match.group(1).strip()
             
@@ -384,27 +536,13 @@ def extract_date(text):
                 return date_str, confidence
                 
             # Fallback to dateutil parser for flexibility
-            try:
-                parsed_date = parser.parse(date_text, fuzzy=True)
-                
-                # Fix years that might be parsed incorrectly
-                if parsed_date.year < 2000:
-                    parsed_date = parsed_date.replace(year=parsed_date.year + 2000)
-                
-                # Handle future dates (likely parsing errors)
-                if parsed_date.date() > now.date() + datetime.timedelta(days=30):
-                    # If more than a month in the future, assume it's this or last year
-                    parsed_date = parsed_date.replace(year=now.year)
-                    if parsed_date.date() > now.date() + datetime.timedelta(days=30):
-                        parsed_date = parsed_date.replace(year=now.year - 1)
-                
-                return parsed_date.strftime('%Y-%m-%d'), 0.85
-            except:
-                pass
+            date_str = parse_date_with_dateutil(date_text, now)
+            if date_str:
+                return date_str, 0.85
     
     # 2. Check for timestamp patterns which often contain both date and time
-    for pattern in timestamp_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in (TIMESTAMP_PATTERNS if dated else ()):
+        match = pattern.search(text)
         if match:
             date_text = match.group(1).strip()
             
@@ -414,27 +552,13 @@ def extract_date(text):
                 return date_str, confidence + 0.05  # Slightly higher confidence for timestamps
                 
             # Fallback to dateutil parser
-            try:
-                parsed_date = parser.parse(date_text, fuzzy=True)
-                
-                # Fix years that might be parsed incorrectly
-                if parsed_date.year < 2000:
-                    parsed_date = parsed_date.replace(year=parsed_date.year + 2000)
-                
-                # Handle future dates (likely parsing errors)
-                if parsed_date.date() > now.date() + datetime.timedelta(days=30):
-                    # If more than a month in the future, assume it's this or last year
-                    parsed_date = parsed_date.replace(year=now.year)
-                    if parsed_date.date() > now.date() + datetime.timedelta(days=30):
-                        parsed_date = parsed_date.replace(year=now.year - 1)
-                
-                return parsed_date.strftime('%Y-%m-%d'), 0.85
-            except:
-                pass
+            date_str = parse_date_with_dateutil(date_text, now)
+            if date_str:
+                return date_str, 0.85
     
     # 3. Try implicit date patterns (without explicit indicators)
-    for pattern in implicit_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in (IMPLICIT_PATTERNS if dated else ()):
+        match = pattern.search(text)
         if match:
             date_text = match.group(1).strip()
             
@@ -444,36 +568,24 @@ def extract_date(text):
                 return date_str, confidence - 0.05  # Slightly lower confidence for implicit dates
                 
             # Fallback to dateutil parser
-            try:
-                parsed_date = parser.parse(date_text, fuzzy=True)
-                
-                # Fix years that might be parsed incorrectly
-                if parsed_date.year < 2000:
-                    parsed_date = parsed_date.replace(year=parsed_date.year + 2000)
-                
-                # For two-digit year formats, handle future dates
-                if len(date_text) <= 10 and parsed_date.date() > now.date() + datetime.timedelta(days=30):
-                    parsed_date = parsed_date.replace(year=now.year)
-                    if parsed_date.date() > now.date() + datetime.timedelta(days=30):
-                        parsed_date = parsed_date.replace(year=now.year - 1)
-                
-                return parsed_date.strftime('%Y-%m-%d'), 0.75
-            except:
-                pass
+            date_str = parse_date_with_dateutil(date_text, now, implicit=True)
+            if date_str:
+                return date_str, 0.75
     
     # 4. If still no date, try to infer from context
+    context = extract_transaction_context(text)
     if context['is_service_payment']:
         date_str, confidence = infer_date_from_context(text, context, now_ist)
         if date_str:
             return date_str, confidence
     
     # 5. Last resort: Look for time references that might indicate today/yesterday
-    time_match = re.search(r'(\d{1,2}:\d{2}(?::\d{2})?(?:\s*[aApP][mM])?)', text, re.IGNORECASE)
+    time_match = TIME_PATTERN.search(text)
     if time_match:
         # If we find a time but no date, assume it's today
         try:
             time_str = time_match.group(1)
-            parsed_time = parser.parse(time_str).time()
+            parsed_time = parse_time(time_str)
             
             # If the time is in the future today, it might be from yesterday or today
             current_time = now.time()
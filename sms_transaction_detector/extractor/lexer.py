@@ -0,0 +1,108 @@
+import re
+from collections import namedtuple
+from .patterns import register
+
+# A typed piece of an SMS. value is the normalised text (e.g. the amount without
+# commas); start and end are offsets into the original message.
+Token = namedtuple("Token", ["kind", "value", "start", "end"])
+
+# Month names accepted in date-like tokens. Only whole month words are consumed,
+# so a date token never swallows the start of an amount or a keyword.
+_MONTHS = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+           r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b")
+
+# Token grammar, tried in this order at each position. It is written in lowercase
+# and run on the lowercased SMS (see tokenize). The amount alternative is the same
+# expression as "amount.currency" and the keyword alternatives are the words of
+# "type.*", so the first amount token and the keyword tokens are exactly what those
+# patterns find: no other token can start before them and cover their first character.
+#
+# Word-start alternatives check the character class first and the word boundary
+# second ("(?=[...])(?<!\w)" rather than "\b"): re skips an alternative cheaply
+# when its first character cannot match, which keeps the single pass fast.
+_GRAMMAR = r"""
+    (?P<amount>(?:rs\.?|inr)\s?([0-9,]+(?:\.[0-9]{1,2})?)(?:\s*\/\-)?)              # Rs.1,234.50/-
+  | (?P<vpa>@)                                                                     # user@bank, widened below
+  | (?P<account>[x*]+\d{3,})                                                       # XX1234, x2228, ****5432
+  | (?P<used>used\b)                                                               # "card ... used", as in "type.card_used"
+  | (?P<time>\d(?<=\b\d)\d?:\d{2}(?::\d{2})?(?:\s*[ap]m\b)?)                        # 10:30, 10:30:15 PM
+  | (?P<date>\d(?<=\b\d)(?:\d?[/\-.]\d{1,2}[/\-.]\d{2,4}                              # 03-04-25, 05.04.2025
+                        |\d{3}-\d{1,2}-\d{1,2}                                       # 2025-03-25
+                        |\d?(?:st|nd|rd|th)?[\s\-]+""" + _MONTHS + r"""(?:[\s,\-]+\d{2,4})?  # 5th April 2025, 01-Apr-25
+                       )\b
+            |(?=[adfjmnos])(?<!\w)""" + _MONTHS + r"""[\s\-]+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?\b)  # April 5th, 2025
+  | (?=[rtuy])(?<!\w)(?:
+      (?P<ref>(?:ref|reference|rrn|utr)\b(?:\s*(?:no|id|number)\b)?[\s:#.\-]*(\d{4,}))  # Ref No: 512345678901
+    | (?P<relative>(?:today|yesterday|tomorrow)\b)
+    )
+  | (?=[acdfprstw])(?<!\w)(?:
+      (?P<debit>(?:debited|spent|paid|sent|withdrawn|withdrawal|purchase|payment)\b)
+    | (?P<credit>(?:credited|received|deposit|salary|credit|cash\s+in)\b)
+    | (?P<transfer>(?:transferred|transfer)\b)
+    | (?P<card>card)
+    | (?P<cue>(?:to|from|at)\b)
+    )
+"""
+TOKEN_PATTERN = register("lexer.token", _GRAMMAR, re.VERBOSE)
+# Used on messages with non-ASCII text, where lowercasing can change offsets and
+# case-insensitive matching folds characters that str.lower() does not
+TOKEN_PATTERN_IGNORECASE = register("lexer.token_ignorecase", _GRAMMAR, re.VERBOSE | re.IGNORECASE)
+
+# Capture groups holding the value of amount and ref tokens
+_AMOUNT_VALUE = TOKEN_PATTERN.groupindex["amount"] + 1
+_REF_VALUE = TOKEN_PATTERN.groupindex["ref"] + 1
+
+# Characters allowed on either side of the "@" of a VPA
+_VPA_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-")
+
+def _vpa_token(sms: str, at: int) -> Token:
+    """Widen an "@" into a user@handle token, or return None if either side is empty.
+
+    Only the "@" is consumed by the token pattern, so words and amounts either
+    side of it are still tokenised on their own.
+    """
+    start, end = at, at + 1
+    while start > 0 and sms[start - 1] in _VPA_CHARS:
+        start -= 1
+    while end < len(sms) and sms[end] in _VPA_CHARS:
+        end += 1
+    if start == at or end == at + 1:
+        return None
+    return Token("vpa", sms[start:end], start, end)
+
+def tokenize(sms: str) -> list:
+    """Walk the SMS once and return its typed tokens in order of position.
+
+    Token kinds: amount (value without commas), vpa, date, time, account (masked
+    number), ref (the number after Ref/UTR/RRN), the keyword kinds debit, credit,
+    transfer, card and used, cue (to/from/at) and relative (today/yesterday/tomorrow).
+    Keyword and cue values are casefolded.
+    """
+    if sms.isascii():
+        matches = TOKEN_PATTERN.finditer(sms.lower())
+    else:
+        matches = TOKEN_PATTERN_IGNORECASE.finditer(sms)
+    tokens = []
+    for match in matches:
+        kind = match.lastgroup
+        if kind == "vpa":
+            token = _vpa_token(sms, match.start())
+            if token:
+                tokens.append(token)
+        elif kind == "amount":
+            tokens.append(Token(kind, match.group(_AMOUNT_VALUE).replace(",", ""), match.start(), match.end()))
+        elif kind == "ref":
+            tokens.append(Token(kind, match.group(_REF_VALUE), match.start(), match.end()))
+        elif kind in ("date", "time", "account"):
+            tokens.append(Token(kind, sms[match.start():match.end()], match.start(), match.end()))
+        else:
+            # casefold, not lower: "yeſterday" matches case-insensitively and must read "yesterday"
+            tokens.append(Token(kind, match.group().casefold(), match.start(), match.end()))
+    return tokens
+
+def first_token(tokens: list, kind: str) -> Token:
+    """Return the first token of the given kind, or None."""
+    for token in tokens:
+        if token.kind == kind:
+            return token
+    return None
@@ -0,0 +1,54 @@
+from .patterns import register
+
+WORD = register("lexicon.word", r"\w+")
+
+class Lexicon:
+    """The lowercase words of an SMS, scanned once, for answering keyword questions.
+
+    A whole-word check such as r"\\bbill\\b" is a set lookup, and a substring
+    check such as r"credited" is an `in` test on the lowercased text. Each
+    question is asked together with the pattern it replaces: for messages with
+    non-ASCII text the pattern itself is used, because case-insensitive matching
+    folds characters (e.g. the long s) that str.lower() does not.
+    """
+
+    __slots__ = ("sms", "ascii", "text", "words", "word_set")
+
+    def __init__(self, sms: str):
+        self.sms = sms
+        self.ascii = sms.isascii()
+        if self.ascii:
+            self.text = sms.lower()
+            self.words = WORD.findall(self.text)
+            self.word_set = set(self.words)
+
+    def has_word(self, words: frozenset, pattern) -> bool:
+        """Check if any of the words occurs as a whole word (pattern: r"\\b(?:word|...)\\b")."""
+        if not self.ascii:
+            return bool(pattern.search(self.sms))
+        return not self.word_set.isdisjoint(words)
+
+    def has_phrase(self, first: str, second: str, pattern) -> bool:
+        """Check for two words separated only by whitespace (pattern: r"\\bfirst\\s+second\\b")."""
+        if self.ascii and (first not in self.word_set or second not in self.word_set):
+            return False
+        return bool(pattern.search(self.sms))
+
+    def contains(self, substrings: tuple, patterns: list) -> bool:
+        """Check if any of the substrings occurs anywhere (patterns: one case-insensitive regex per substring)."""
+        if not self.ascii:
+            return any(pattern.search(self.sms) for pattern in patterns)
+        return any(substring in self.text for substring in substrings)
+
+    def followed_by_alnum(self, words: frozenset, pattern) -> bool:
+        """Check if one of the words is followed, anywhere later, by an ASCII letter or digit.
+
+        pattern: r"\\b(?:word|...)\\b[^a-zA-Z0-9]*[a-zA-Z0-9]+".
+        """
+        if not self.ascii:
+            return bool(pattern.search(self.sms))
+        for index, word in enumerate(self.words):
+            if word in words:
+                # Only the first occurrence matters: anything after a later one is after it too
+                return any(later.strip("_") for later in self.words[index + 1:])
+        return False
@@ -0,0 +1,121 @@
+import re
+import unicodedata
+from .patterns import register
+
+# Characters that are invisible in an SMS and only get in the way of matching
+ZERO_WIDTH = frozenset("\u00ad\u200b\u200c\u200d\u2060\ufeff")
+
+# Rewrites applied to the NFKC text, in one pass. Each alternative is replaced
+# by the canonical form in _REPLACEMENTS; a match that is already canonical is
+# left alone. As in the lexer, the leading character class lets re skip most
+# positions cheaply, and the words are spelled out in both cases rather than
+# matched with IGNORECASE, which would disable that.
+_CANONICAL = register("normalizer.canonical", r"""
+  (?=[\s₹RIAria])(?:
+    (?P<newline>[^\S\n]*\n\s*)                                              # line breaks, with the blanks around them
+  | (?P<space>[^\S\n]{2,}|[^\S\n ])                                          # runs of blanks, tabs
+  | (?P<currency>(?:₹|(?<!\w)(?:[rR][sS]|[iI][nN][rR]))(?=\.?\s?\d))        # ₹500, INR 500, rs.500 (the dot is kept)
+  | (?P<account>(?<!\w)(?:[aA]/[cC]|[aA][cC][cC][tT]\.?)(?![a-zA-Z]))        # A/C, a/c, Acct.
+  )
+""", re.VERBOSE)
+
+_REPLACEMENTS = {"newline": "\n", "space": " ", "currency": "Rs", "account": "A/c"}
+
+class NormalizedSms:
+    """An SMS in canonical form, with a map from its offsets back to the original.
+
+    text is NFKC-normalised, without zero-width characters, with whitespace
+    collapsed (a run containing a line break becomes one line break), every
+    currency prefix written "Rs" (a dot after it is kept) and every "a/c" or "acct" written "A/c".
+    starts[i] and ends[i] are the original offsets of the characters that
+    text[i] came from; both are None when text is the original unchanged.
+    """
+
+    __slots__ = ("original", "text", "starts", "ends")
+
+    def __init__(self, original: str, text: str, starts: list = None, ends: list = None):
+        self.original = original
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    def original_span(self, start: int, end: int) -> tuple:
+        """Map a (start, end) span of text to the span of the original it came from."""
+        if self.starts is None:
+            return start, end
+        if start >= len(self.text):
+            return len(self.original), len(self.original)
+        if end <= start:
+            return self.starts[start], self.starts[start]
+        return self.starts[start], self.ends[end - 1]
+
+def _unicode_pass(sms: str) -> tuple:
+    """NFKC-normalise the SMS and drop zero-width characters, keeping the offset map.
+
+    Each base character is normalised together with the combining marks after it,
+    so every output character maps to the original characters it came from.
+    """
+    pieces, starts, ends = [], [], []
+    index = 0
+    while index < len(sms):
+        end = index + 1
+        while end < len(sms) and unicodedata.combining(sms[end]):
+            end += 1
+        cluster = sms[index:end]
+        if cluster not in ZERO_WIDTH:
+            cluster = unicodedata.normalize("NFKC", cluster)
+            pieces.append(cluster)
+            starts.extend([index] * len(cluster))
+            ends.extend([end] * len(cluster))
+        index = end
+    return "".join(pieces), starts, ends
+
+def _is_canonical(sms: str) -> bool:
+    """Cheaply rule out any rewrite for an ASCII SMS (a False answer may still need none)."""
+    # Every whitespace character other than the blank is unprintable
+    if "  " in sms or not sms.isprintable():
+        return False
+    lower = sms.lower()
+    return ("inr" not in lower and "acct" not in lower
+            and lower.count("a/c") == sms.count("A/c") and lower.count("rs") == sms.count("Rs"))
+
+def normalize_sms(sms: str) -> NormalizedSms:
+    """Put an SMS into canonical form once, for the rules and the NER model to share."""
+    starts = ends = None
+    text = sms
+    if sms.isascii():
+        if _is_canonical(sms):
+            return NormalizedSms(sms, sms)
+    elif not unicodedata.is_normalized("NFKC", sms) or not ZERO_WIDTH.isdisjoint(sms):
+        text, starts, ends = _unicode_pass(sms)
+
+    pieces, new_starts, new_ends = [], [], []
+    last = 0
+    for match in _CANONICAL.finditer(text):
+        replacement = _REPLACEMENTS[match.lastgroup]
+        if match.group() == replacement:
+            continue
+        pieces.append(text[last:match.start()])
+        if starts is None:
+            new_starts.extend(range(last, match.start()))
+            new_ends.extend(range(last + 1, match.start() + 1))
+            span = (match.start(), match.end())
+        else:
+            new_starts.extend(starts[last:match.start()])
+            new_ends.extend(ends[last:match.start()])
+            span = (starts[match.start()], ends[match.end() - 1])
+        pieces.append(replacement)
+        new_starts.extend([span[0]] * len(replacement))
+        new_ends.extend([span[1]] * len(replacement))
+        last = match.end()
+
+    if not pieces:
+        return NormalizedSms(sms, text, starts, ends)
+    pieces.append(text[last:])
+    if starts is None:
+        new_starts.extend(range(last, len(text)))
+        new_ends.extend(range(last + 1, len(text) + 1))
+    else:
+        new_starts.extend(starts[last:])
+        new_ends.extend(ends[last:])
+    return NormalizedSms(sms, "".join(pieces), new_starts, new_ends)
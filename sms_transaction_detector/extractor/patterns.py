@@ -0,0 +1,213 @@
+import re
+
+# Every regex used by the rule-based extractor is compiled once, at import time,
+# and registered here under a dotted name such as "payee.merchant.0".
+PATTERNS = {}
+
+def register(name: str, pattern: str, flags: int = 0) -> re.Pattern:
+    """Compile a pattern and register it under the given name.
+
+    Registering the same name twice is allowed only if the pattern and flags
+    are identical (a module may be loaded more than once by the test scripts).
+    """
+    compiled = re.compile(pattern, flags)
+    existing = PATTERNS.get(name)
+    if existing is not None and (existing.pattern, existing.flags) != (compiled.pattern, compiled.flags):
+        raise ValueError(f"Pattern '{name}' is already registered with a different pattern")
+    PATTERNS[name] = compiled
+    return compiled
+
+def register_family(prefix: str, patterns: list, flags: int = 0) -> list:
+    """Compile and register an ordered list of patterns as "<prefix>.<index>".
+
+    Entries may also be tuples of (pattern, *extra); the pattern is compiled and
+    the extra items are passed through unchanged, e.g. (pattern, date_format).
+    """
+    family = []
+    for index, entry in enumerate(patterns):
+        if isinstance(entry, tuple):
+            pattern, *extra = entry
+            family.append((register(f"{prefix}.{index}", pattern, flags), *extra))
+        else:
+            family.append(register(f"{prefix}.{index}", entry, flags))
+    return family
+
+def get_pattern(name: str) -> re.Pattern:
+    """Return the compiled pattern registered under the given name."""
+    return PATTERNS[name]
+
+def get_family(prefix: str) -> list:
+    """Return (name, pattern) pairs whose name starts with the given prefix, in registration order."""
+    return [(name, pattern) for name, pattern in PATTERNS.items()
+            if name == prefix or name.startswith(prefix + ".")]
+
+def stripped_span(match: re.Match, group: int = 0) -> tuple:
+    """Return the span of a group without the blanks around it, as match.group(n).strip() reads it."""
+    text = match.group(group)
+    start = match.start(group) + len(text) - len(text.lstrip())
+    return start, start + len(text.strip())
+
+# Leading global inline flags such as "(?i)"; they are lifted onto the combined pattern
+_INLINE_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+
+# Feature bitmaps seen per tier before its candidate cache is reset
+_MAX_CANDIDATE_SETS = 4096
+
+class PatternTier:
+    """An ordered family of patterns searched as a single alternation.
+
+    One scan of the alternation finds the leftmost position where any pattern
+    matches. search() returns exactly what trying the patterns one by one with
+    pattern.search would have returned: the first pattern in order that matches
+    anywhere, with its own match object (so group numbers are unchanged).
+
+    Each pattern may declare the features it needs (see features.can_match);
+    patterns whose anchors are missing from the SMS are left out of the scan.
+
+    For a few short patterns, trying them one by one beats the alternation;
+    with alternate=False the tier does that, and uses alternations only to
+    check a sender plan.
+    """
+
+    def __init__(self, name: str, patterns: list, needs: list = None, alternate: bool = True):
+        flags = {pattern.flags for pattern in patterns}
+        if len(flags) != 1:
+            raise ValueError(f"Patterns in tier '{name}' must share the same flags")
+        self.name = name
+        self.patterns = patterns
+        self.needs = needs or [()] * len(patterns)
+        self._flags = flags.pop()
+        self.alternate = alternate
+        self._alternations = {}
+        self._candidates = {}
+        if alternate:
+            # The full alternation is what most searches use, so compile it up front
+            self._alternation(tuple(range(len(patterns))))
+
+    def _alternation(self, indices: tuple) -> re.Pattern:
+        """Return the compiled alternation of the patterns at indices, built on first use.
+
+        The alternatives are not wrapped in groups: that would stop the re
+        parser from factoring out prefixes the patterns share.
+        """
+        alternation = self._alternations.get(indices)
+        if alternation is None:
+            alternation = re.compile("|".join(
+                _INLINE_FLAGS.sub("", self.patterns[index].pattern) for index in indices
+            ), self._flags)
+            self._alternations[indices] = alternation
+        return alternation
+
+    def candidates(self, features: int) -> tuple:
+        """Return the indices of the patterns whose needs are met by the feature bitmap."""
+        candidates = self._candidates.get(features)
+        if candidates is None:
+            if len(self._candidates) >= _MAX_CANDIDATE_SETS:
+                self._candidates.clear()
+            candidates = tuple(index for index, needs in enumerate(self.needs)
+                               if all(features & clause for clause in needs))
+            self._candidates[features] = candidates
+        return candidates
+
+    def _search_from(self, text: str, candidates: tuple) -> tuple:
+        """Find the first of the candidate patterns that matches anywhere in text."""
+        if not self.alternate:
+            for index in candidates:
+                match = self.patterns[index].search(text)
+                if match:
+                    return index, match
+            return None, None
+        if candidates:
+            # The leading pattern of a tier is the most common winner, and when it
+            # matches no other pattern needs to be looked at
+            match = self.patterns[candidates[0]].search(text)
+            if match:
+                return candidates[0], match
+            candidates = candidates[1:]
+        found = None, None
+        pos = 0
+        while candidates:
+            hit = self._alternation(candidates).search(text, pos)
+            if hit is None:
+                break
+            # The alternation took the first pattern that matches at this position
+            pos = hit.start()
+            for count, index in enumerate(candidates):
+                match = self.patterns[index].match(text, pos)
+                if match:
+                    break
+            found = index, match
+            # No earlier pattern matched at or before this position, so only
+            # patterns before the winner can still beat it further right.
+            candidates, pos = candidates[:count], pos + 1
+        return found
+
+    def _search_accepted(self, text: str, candidates: tuple, accept) -> tuple:
+        """Find the first of the candidate patterns that matches and passes accept(match)."""
+        while True:
+            index, match = self._search_from(text, candidates)
+            if match is None or accept is None or accept(match):
+                return index, match
+            candidates = tuple(candidate for candidate in candidates if candidate > index)
+
+    def _search_hinted(self, text: str, candidates: tuple, position: int, accept) -> tuple:
+        """Search the candidates with a guess at the winner, candidates[position].
+
+        With alternations, the candidates up to the guess are scanned first and
+        the rest only if none of them is accepted. Tried one by one, the guess
+        comes first and the patterns before it are ruled out in one scan.
+        Either way the winner is the one search() would find without the guess.
+        """
+        earlier, hint, later = candidates[:position], candidates[position], candidates[position + 1:]
+        if self.alternate:
+            index, match = self._search_accepted(text, candidates[:position + 1], accept)
+            if match is not None:
+                return index, match
+            return self._search_accepted(text, later, accept)
+
+        match = self.patterns[hint].search(text)
+        if match is not None and accept is not None and not accept(match):
+            match = None
+        if match is not None and (not earlier or self._alternation(earlier).search(text) is None):
+            return hint, match
+        index, found = self._search_accepted(text, earlier, accept)
+        if found is not None:
+            return index, found
+        if match is not None:
+            return hint, match
+        return self._search_accepted(text, later, accept)
+
+    def search(self, text: str, accept=None, features: int = None, plan: dict = None) -> tuple:
+        """Return (index, match) of the first pattern that matches and passes accept(match).
+
+        If a feature bitmap is given, patterns whose needs it does not meet are
+        skipped. Returns (None, None) if no pattern in the tier is accepted.
+
+        If a sender plan is given (see plans.py), the pattern that won last time
+        for the same plan is used as a guess, and the winner is recorded in the
+        plan. The result is the same as without a plan.
+        """
+        if features is None:
+            candidates = tuple(range(len(self.patterns)))
+        else:
+            candidates = self.candidates(features)
+        if plan is None:
+            return self._search_accepted(text, candidates, accept)
+        hint = plan.get(self.name)
+        if hint in candidates:
+            index, match = self._search_hinted(text, candidates, candidates.index(hint), accept)
+        else:
+            index, match = self._search_accepted(text, candidates, accept)
+        if match is not None:
+            plan[self.name] = index
+        return index, match
+
+def register_tier(prefix: str, patterns: list, flags: int = 0, alternate: bool = True) -> PatternTier:
+    """Register patterns as a family and return them as a PatternTier.
+
+    Entries may be (pattern, needs) tuples to declare the features each pattern needs.
+    """
+    family = register_family(prefix, patterns, flags)
+    if family and isinstance(family[0], tuple):
+        return PatternTier(prefix, [pattern for pattern, _ in family], [needs for _, needs in family], alternate)
+    return PatternTier(prefix, family, alternate=alternate)
@@ -0,0 +1,345 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from .batch import warm_up, classify_messages, recognize_entities, _start_method
+from .transaction_extractor import extract_transaction_details
+
+# Items a queue between two stages holds before the stage feeding it waits
+QUEUE_SIZE = 256
+
+# How often a waiting worker checks whether the pipeline was stopped, in seconds
+POLL_SECONDS = 0.05
+
+class _Skip:
+    """The type of SKIP; a copy unpickled from a process stage is SKIP itself."""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "SKIP"
+
+    def __repr__(self):
+        return "SKIP"
+
+# Returned by a stage function for an item that goes no further
+SKIP = _Skip()
+
+# Put in a queue once per worker of the stage reading it, when no more items will come
+_STOP = object()
+
+class _Failure:
+    """An item whose stage function raised; it is passed on untouched, and raised in run()."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def _apply(function, batched: bool, items: list) -> list:
+    """Run a stage function over a batch of items, in a worker thread or process."""
+    if batched:
+        try:
+            results = function(items)
+        except Exception as error:
+            return [_Failure(error)] * len(items)
+        if len(results) != len(items):
+            return [_Failure(ValueError("a batched stage must return one result per item"))] * len(items)
+        return results
+    results = []
+    for item in items:
+        try:
+            results.append(function(item))
+        except Exception as error:
+            results.append(_Failure(error))
+    return results
+
+class Stage:
+    """One step of a Pipeline: a function applied to every item by its own workers.
+
+    kind is "thread" for I/O-bound work or "process" for CPU-bound work, which
+    runs in a process pool of the given number of workers. A worker takes up
+    to batch_size items at a time from its queue; a process stage sends them
+    to the pool together. With batched, the function takes the list of items
+    and returns the list of results (as for classifying or NER with nlp.pipe);
+    otherwise it takes one item and returns its result, or SKIP to drop it.
+    initializer(*initargs) is called once before the pipeline starts, and in
+    each process of a process stage.
+
+    processed, skipped and failed count the items through the stage, and busy
+    the seconds its workers spent on them.
+    """
+
+    __slots__ = ("name", "function", "workers", "kind", "batch_size", "batched", "initializer", "initargs",
+                 "processed", "skipped", "failed", "busy", "_lock", "_active")
+
+    def __init__(self, name: str, function, workers: int = 1, kind: str = "thread", batch_size: int = 1,
+                 batched: bool = False, initializer=None, initargs: tuple = ()):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown stage kind '{kind}'")
+        if workers < 1 or batch_size < 1:
+            raise ValueError("A stage needs at least one worker and a batch size of at least 1")
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.kind = kind
+        self.batch_size = batch_size
+        self.batched = batched
+        self.initializer = initializer
+        self.initargs = initargs
+        self.processed = self.skipped = self.failed = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def _count(self, results: list, seconds: float):
+        with self._lock:
+            self.processed += len(results)
+            self.skipped += sum(result is SKIP for result in results)
+            self.failed += sum(isinstance(result, _Failure) for result in results)
+            self.busy += seconds
+
+class Pipeline:
+    """Stages connected by bounded queues, each with its own workers.
+
+    run(items) feeds the items through the stages in order and yields what
+    comes out of the last one. Every queue holds at most queue_size items,
+    so a slow stage holds back the stages before it (backpressure), and at
+    most max_in_flight items are between the source and the caller at once,
+    which bounds memory whatever the speed of each stage. With ordered, the
+    results come out in input order; otherwise as they are ready. An item
+    whose stage function raised is raised from run() in its turn.
+
+    stats() reports the throughput of each stage while it runs and after.
+    """
+
+    __slots__ = ("stages", "queue_size", "max_in_flight", "ordered", "_started", "_finished", "_queues")
+
+    def __init__(self, stages: list, queue_size: int = QUEUE_SIZE, max_in_flight: int = None,
+                 ordered: bool = True):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        if max_in_flight is None:
+            max_in_flight = queue_size * (len(self.stages) + 1) + sum(
+                stage.workers * stage.batch_size for stage in self.stages)
+        self.max_in_flight = max_in_flight
+        self.ordered = ordered
+        self._started = self._finished = None
+        self._queues = []
+
+    def run(self, items):
+        """Yield the result of the last stage for every item not skipped, running the stages meanwhile."""
+        stop = threading.Event()
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        pools, threads = [], []
+        for stage in self.stages:
+            if stage.initializer is not None:
+                # Before any process forks, so that what it loads is shared
+                stage.initializer(*stage.initargs)
+        try:
+            for index, stage in enumerate(self.stages):
+                pool = None
+                if stage.kind == "process":
+                    pool = ProcessPoolExecutor(stage.workers, multiprocessing.get_context(_start_method()),
+                                               initializer=stage.initializer, initargs=stage.initargs)
+                    pools.append(pool)
+                stage._active = stage.workers
+                after = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                for _ in range(stage.workers):
+                    threads.append(threading.Thread(
+                        target=self._work, args=(stage, pool, self._queues[index], self._queues[index + 1], after, stop),
+                        name=f"pipeline-{stage.name}", daemon=True))
+            threads.append(threading.Thread(target=self._feed, args=(items, in_flight, stop),
+                                            name="pipeline-source", daemon=True))
+            self._started, self._finished = time.perf_counter(), None
+            for thread in threads:
+                thread.start()
+            yield from self._collect(in_flight, stop)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for pool in pools:
+                pool.shutdown(cancel_futures=True)
+            if self._finished is None:
+                self._finished = time.perf_counter()
+
+    def _feed(self, items, in_flight: threading.Semaphore, stop: threading.Event):
+        first = self._queues[0]
+        sequence = 0
+        try:
+            for item in items:
+                if not _acquire(in_flight, stop) or not _put(first, (sequence, item), stop):
+                    return
+                sequence += 1
+        except Exception as error:
+            # The items themselves raised: report it after what was read before
+            if _acquire(in_flight, stop):
+                _put(first, (sequence, _Failure(error)), stop)
+        for _ in range(self.stages[0].workers):
+            _put(first, _STOP, stop)
+
+    def _work(self, stage: Stage, pool, inbox: queue.Queue, outbox: queue.Queue, after: int,
+              stop: threading.Event):
+        done = False
+        while not done:
+            message = _get(inbox, stop)
+            if message is None:
+                return
+            if message is _STOP:
+                break
+            batch = [message]
+            while len(batch) < stage.batch_size:
+                try:
+                    message = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if message is _STOP:
+                    done = True
+                    break
+                batch.append(message)
+
+            # Items skipped or failed upstream pass through untouched
+            live = [item for _, item in batch if item is not SKIP and not isinstance(item, _Failure)]
+            start = time.perf_counter()
+            if not live:
+                results = []
+            elif pool is None:
+                results = _apply(stage.function, stage.batched, live)
+            else:
+                try:
+                    results = pool.submit(_apply, stage.function, stage.batched, live).result()
+                except Exception as error:
+                    # The pool itself failed (a worker crashed, or the items do not pickle)
+                    results = [_Failure(error)] * len(live)
+            stage._count(results, time.perf_counter() - start)
+            results = iter(results)
+            for sequence, item in batch:
+                if item is not SKIP and not isinstance(item, _Failure):
+                    item = next(results)
+                if not _put(outbox, (sequence, item), stop):
+                    return
+        with stage._lock:
+            stage._active -= 1
+            last = stage._active == 0
+        if last:
+            for _ in range(after):
+                _put(outbox, _STOP, stop)
+
+    def _collect(self, in_flight: threading.Semaphore, stop: threading.Event):
+        outbox = self._queues[-1]
+        waiting, expected = {}, 0
+        while True:
+            message = _get(outbox, stop)
+            if message is None or message is _STOP:
+                self._finished = time.perf_counter()
+                return
+            sequence, item = message
+            if self.ordered:
+                waiting[sequence] = item
+                ready = []
+                while expected in waiting:
+                    ready.append(waiting.pop(expected))
+                    expected += 1
+            else:
+                ready = [item]
+            for item in ready:
+                in_flight.release()
+                if isinstance(item, _Failure):
+                    raise item.error
+                if item is not SKIP:
+                    yield item
+
+    def stats(self) -> dict:
+        """Return, for each stage by name, its counters, items per second and queue length, and the elapsed time."""
+        if self._started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished or time.perf_counter()) - self._started
+        stages = {}
+        for index, stage in enumerate(self.stages):
+            stages[stage.name] = {
+                "kind": stage.kind, "workers": stage.workers, "processed": stage.processed,
+                "skipped": stage.skipped, "failed": stage.failed, "busy_seconds": stage.busy,
+                "per_second": stage.processed / elapsed if elapsed else 0.0,
+                "queued": self._queues[index].qsize() if self._queues else 0,
+            }
+        return {"elapsed_seconds": elapsed, "stages": stages}
+
+def _acquire(semaphore: threading.Semaphore, stop: threading.Event) -> bool:
+    """Take a slot, waiting for one unless the pipeline is stopped; return whether it was taken."""
+    while not stop.is_set():
+        if semaphore.acquire(timeout=POLL_SECONDS):
+            return True
+    return False
+
+def _put(target: queue.Queue, message, stop: threading.Event) -> bool:
+    """Put a message, waiting for room unless the pipeline is stopped; return whether it was put."""
+    while not stop.is_set():
+        try:
+            target.put(message, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(source: queue.Queue, stop: threading.Event):
+    """Get a message, waiting for one unless the pipeline is stopped (then return None)."""
+    while not stop.is_set():
+        try:
+            return source.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            pass
+    return None
+
+# Stages of the SMS pipeline. Its items are dicts holding the SMS under "text" (and
+# its sender ID under "sender"); each stage adds its results to them.
+
+def classify_records(records: list, only_financial: bool = False) -> list:
+    """Set "financial" on each record, classifying the batch in one call; with only_financial, skip the others."""
+    results = []
+    for record, financial in zip(records, classify_messages([record["text"] for record in records])):
+        record["financial"] = financial
+        results.append(record if financial or not only_financial else SKIP)
+    return results
+
+def extract_record(record: dict, now: datetime = None, fields: tuple = None) -> dict:
+    """Set "details" on a financial record (or one not classified), None on the others."""
+    if record.get("financial", True):
+        record["details"] = extract_transaction_details(record["text"], now, record.get("sender"),
+                                                        fields=fields).copy()
+    else:
+        record["details"] = None
+    return record
+
+def recognize_records(records: list) -> list:
+    """Set "entities" on each record, running the NER model over the batch."""
+    for record, entities in zip(records, recognize_entities([record["text"] for record in records])):
+        record["entities"] = entities
+    return records
+
+def sms_pipeline(classify_workers: int = 1, extract_workers: int = 1, ner_workers: int = 0,
+                 only_financial: bool = False, fields: tuple = None, now: datetime = None,
+                 batch_size: int = 64, queue_size: int = QUEUE_SIZE) -> Pipeline:
+    """Build the pipeline that classifies SMS records, extracts their details and, with ner_workers, their entities.
+
+    Classification runs in threads, a batch per call to the classifier;
+    extraction and NER run in process pools. The caller reads the records
+    from its source into run() and writes what comes out to its sink.
+    """
+    now = now or datetime.now()
+    stages = [
+        Stage("classify", partial(classify_records, only_financial=only_financial), classify_workers,
+              "thread", batch_size, batched=True, initializer=warm_up, initargs=(True, False)),
+        Stage("extract", partial(extract_record, now=now, fields=fields), extract_workers, "process", batch_size),
+    ]
+    if ner_workers:
+        stages.append(Stage("ner", recognize_records, ner_workers, "process", batch_size, batched=True,
+                            initializer=warm_up, initargs=(False, True)))
+    return Pipeline(stages, queue_size)
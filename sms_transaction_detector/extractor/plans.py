@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+# Senders whose plans are kept, if plans are wanted (see SENDER_PLANS); the least
+# recently seen sender is dropped beyond this
+MAX_SENDERS = 512
+
+def sender_key(sender: str) -> str:
+    """Reduce a sender ID to the part naming the bank: "AD-HDFCBK" and "VM-HDFCBK-S" are both "HDFCBK"."""
+    parts = sender.strip().upper().split("-")
+    return parts[1] if len(parts) > 1 else parts[0]
+
+class SenderPlans:
+    """A bounded cache of extraction plans, one per SMS sender.
+
+    A plan maps the name of a pattern tier to the index of the pattern that
+    produced the accepted value the last time that tier was searched for the
+    sender. PatternTier.search tries that pattern first and keeps the plan up
+    to date (see patterns.py); the result never depends on the plan.
+
+    With max_senders 0 no plan is kept. The cache may be used from several
+    threads at once.
+    """
+
+    __slots__ = ("max_senders", "_plans", "_lock", "hits", "misses")
+
+    def __init__(self, max_senders: int = MAX_SENDERS):
+        self.max_senders = max_senders
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def plan(self, sender: str) -> dict:
+        """Return the plan for a sender, starting an empty one the first time it is seen, or None if none are kept."""
+        if not self.max_senders:
+            return None
+        key = sender_key(sender)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                plan = self._plans[key] = {}
+                while len(self._plans) > self.max_senders:
+                    self._plans.popitem(last=False)
+            else:
+                self.hits += 1
+                self._plans.move_to_end(key)
+        return plan
+
+    def clear(self):
+        """Forget every plan and reset the counters."""
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+# The plans used by extract_transaction_details. None are kept until max_senders is set
+# (to MAX_SENDERS, say): on mixed traffic they save little, and the result is the same
+SENDER_PLANS = SenderPlans(max_senders=0)
@@ -0,0 +1,144 @@
+from datetime import datetime
+from .transaction_extractor import (
+    extract_transaction_details, FIELDS, MAX_SMS_LENGTH, BUDGET_ERROR, FAILURE_ERROR
+)
+
+# The error of a field, as a small integer; ERROR_MESSAGES[code] is its text
+OK = 0
+AMOUNT_NOT_FOUND = 1
+DATE_NOT_FOUND = 2
+PAYEE_NOT_FOUND = 3
+TYPE_NOT_FOUND = 4
+SOURCE_NOT_FOUND = 5
+DESTINATION_NOT_FOUND = 6
+BANK_NOT_FOUND = 7
+OUT_OF_TIME = 8
+FAILED = 9
+
+ERROR_MESSAGES = (
+    None,
+    "Amount not found",
+    "Date not found",
+    "Payee not found",
+    "Transaction type not found",
+    "Source account not found",
+    "Destination account not found",
+    "Bank name not found",
+    BUDGET_ERROR,
+    FAILURE_ERROR,
+)
+ERROR_CODES = {message: code for code, message in enumerate(ERROR_MESSAGES)}
+
+def error_code(message: str) -> int:
+    """Return the code of an error message of the extractor."""
+    try:
+        return ERROR_CODES[message]
+    except KeyError:
+        raise ValueError(f"Unknown error '{message}'") from None
+
+class FieldResult:
+    """One field of a TransactionRecord: its value, confidence, error code and span in the SMS."""
+
+    __slots__ = ("value", "confidence", "code", "span")
+
+    def __init__(self, value: str = None, confidence: float = 0.0, code: int = OK, span: tuple = None):
+        self.value = value
+        self.confidence = confidence
+        self.code = code
+        self.span = span
+
+    @property
+    def error(self) -> str:
+        """The error message, or None."""
+        return ERROR_MESSAGES[self.code]
+
+    @classmethod
+    def from_dict(cls, field: dict) -> "FieldResult":
+        if "bank" in field:
+            return PayeeResult(field["value"], field["confidence"], error_code(field["error"]), field["bank"],
+                               field["span"])
+        return cls(field["value"], field["confidence"], error_code(field["error"]), field["span"])
+
+    def to_dict(self) -> dict:
+        """Return the field as extract_transaction_details gives it."""
+        return {"value": self.value, "confidence": self.confidence, "error": ERROR_MESSAGES[self.code],
+                "span": self.span}
+
+    def __eq__(self, other):
+        if not isinstance(other, FieldResult):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.value!r}, {self.confidence!r}, {self.code!r}, span={self.span!r})"
+
+class PayeeResult(FieldResult):
+    """A payee, with the bank behind its UPI handle (None unless it was found as a UPI ID)."""
+
+    __slots__ = ("bank",)
+
+    def __init__(self, value: str = None, confidence: float = 0.0, code: int = OK, bank: str = None,
+                 span: tuple = None):
+        super().__init__(value, confidence, code, span)
+        self.bank = bank
+
+    def to_dict(self) -> dict:
+        return {"value": self.value, "confidence": self.confidence, "error": ERROR_MESSAGES[self.code],
+                "span": self.span, "bank": self.bank}
+
+    def __repr__(self) -> str:
+        return f"PayeeResult({self.value!r}, {self.confidence!r}, {self.code!r}, {self.bank!r}, span={self.span!r})"
+
+class TransactionRecord:
+    """The details of one SMS in compact form: one FieldResult per field.
+
+    It holds the same as the dict of extract_transaction_details, in about a
+    third of the memory, for services that keep many results. A field left out
+    of the extraction (see its fields argument) is None.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, amount=None, date=None, payee=None, transaction_type=None,
+                 account_from=None, account_to=None, bank=None):
+        self.amount = amount
+        self.date = date
+        self.payee = payee
+        self.transaction_type = transaction_type
+        self.account_from = account_from
+        self.account_to = account_to
+        self.bank = bank
+
+    @classmethod
+    def from_dict(cls, details: dict) -> "TransactionRecord":
+        """Build a record from the dict of extract_transaction_details."""
+        return cls(**{field: FieldResult.from_dict(value) for field, value in details.items()})
+
+    def to_dict(self) -> dict:
+        """Return the record as extract_transaction_details gives it."""
+        details = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                details[field] = value.to_dict()
+        return details
+
+    def __eq__(self, other):
+        if not isinstance(other, TransactionRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return "TransactionRecord(" + ", ".join(
+            f"{field}={getattr(self, field)!r}" for field in FIELDS if getattr(self, field) is not None
+        ) + ")"
+
+def extract_transaction_record(sms: str, now: datetime = None, sender: str = None,
+                               max_length: int = MAX_SMS_LENGTH, budget: float = None,
+                               fields: tuple = None) -> TransactionRecord:
+    """Same as extract_transaction_details, as a TransactionRecord."""
+    return TransactionRecord.from_dict(extract_transaction_details(sms, now, sender, max_length, budget, fields))
@@ -0,0 +1,48 @@
+import re
+from .patterns import register
+
+# Where one clause of an SMS ends and the next begins: a line break, or the blank
+# after a sentence end (. ! ? ;) that is followed by a capital letter. A dot after
+# an abbreviation such as "Rs." or "No." ends no clause.
+CLAUSE_BREAK = register("segmenter.break", r"""
+    \n
+  | (?<=[.!?;])(?<!\bRs\.)(?<!\bNo\.)(?<!\bDr\.)(?<!\bMr\.)(?<!\bMs\.)(?<!\bMrs\.)(?<!\bSt\.)(?<!\bA/c\.)
+    [ ]+(?=[A-Z])
+""", re.VERBOSE)
+
+# The start of a clause that only ever follows the transaction: balances, fraud and
+# dispute helplines, blocking instructions, safety advice and mail-style subjects
+TRAILER = register("segmenter.trailer", r"""
+    [\s\-:,.*]*
+    (?: not\s+(?:you|u|done\s+by\s+(?:you|u))\b      # Not you? / Not done by you?
+      | if\s+not\b                                   # If not done by you, call ...
+      | (?:to\s+)?dispute\b | report\s+(?:fraud|it|this)\b
+      | call\b | sms\b | give\s+(?:a\s+)?missed\s+call\b
+      | for\s+(?:any\s+)?(?:quer(?:y|ies)|help|assistance|support|details)\b
+      | (?:avl|avail(?:able)?|clear|closing|net\s+avl)\.?\s*bal(?:ance)?\b
+      | bal(?:ance)?\b\s*(?:[:\-]|is\b|rs\b|inr\b)
+      | subject\s*:
+      | never\s+share\b | (?:do\s+not|don'?t|pls\s+do\s+not)\s+share\b
+      | t\s?&\s?c\b | download\b | visit\b | click\b
+    )
+""", re.IGNORECASE | re.VERBOSE)
+
+# A clause that reports a transaction is kept even if it starts like a trailer
+# ("Balance: Rs.245.00 debited from ...")
+TRANSACTION = register("segmenter.transaction",
+                       r"(?i)\b(?:debited|credited|sent|spent|paid|transferred|withdrawn|received|deposited)\b")
+
+def crop_trailers(sms: str) -> str:
+    """Drop the trailer clauses at the end of an SMS, and return what is left.
+
+    Clauses are dropped from the end for as long as they are trailers (see
+    TRAILER) that report no transaction; the first clause is always kept. The result is a prefix of the
+    SMS, so an offset into it is the same offset into the SMS.
+    """
+    breaks = [match.span() for match in CLAUSE_BREAK.finditer(sms)]
+    end = len(sms)
+    for break_start, break_end in reversed(breaks):
+        if not TRAILER.match(sms, break_end, end) or TRANSACTION.search(sms, break_end, end):
+            break
+        end = break_start
+    return sms[:end]
@@ -0,0 +1,248 @@
+from collections import OrderedDict
+from datetime import datetime
+from .helpers.bank_helpers import match_bank_patterns, match_upi_or_account, vpa_bank, KNOWN_BANKS, KNOWN_BANK_CODES
+from .helpers.date_helpers import parse_date_match
+from .lexer import tokenize, first_token
+from .normalizer import normalize_sms
+from .patterns import register
+from .segmenter import crop_trailers
+from .transaction_extractor import (
+    extract_transaction_details, extract_amount, extract_date, extract_transaction_type, extract_payee,
+    extract_account_details, BANK_PATTERNS, ACCOUNT_PREFIX_TO_BANK, DATE_GATE, DATE_TIER, DATE_FORMATS,
+    MAX_SMS_LENGTH, BUDGET_ERROR
+)
+
+# Skeletons kept by the default cache; the least recently seen one is dropped beyond this
+MAX_TEMPLATES = 8192
+
+# Sightings of a new skeleton that are extracted in full as well, to check its template
+VERIFY_SIGHTINGS = 2
+
+# The skeleton of an SMS is its canonical text with every digit written "0", one for
+# one, so that amounts, dates, masked accounts and the digits of VPAs are masked but
+# keep their shape ("Rs.0,000.00", "XX0000", "paytmqr000000@paytm"), and the patterns
+# (and the trailer segmenter) read two SMS with the same skeleton the same way. The payee patterns read "2 " as
+# "to ", so a 2 before a blank or a line break is kept.
+DIGIT = register("template.digit", r"[013-9]|2(?![ \n])")
+_DIGITS = str.maketrans("0123456789", "0000000000")
+
+# The number inside an amount token ("1,234.50" in "Rs.1,234.50/-"), as in the lexer grammar
+AMOUNT_NUMBER = register("template.amount", r"[0-9,]+(?:\.[0-9]{1,2})?")
+
+# How a template reads each field of a later SMS
+CONST = "const"          # the field of the first SMS, unchanged
+SPAN = "span"            # the text at the same place
+AMOUNT = "amount"        # the same, without commas
+DATE = "date"            # the date pattern that won, matched at the same place and parsed
+INFERRED = "inferred"    # the bank behind a UPI handle or an account number
+RECOMPUTE = "recompute"  # the field extractor, run on the SMS
+
+def skeleton(text: str) -> str:
+    """Mask the digits of an SMS in canonical form (see normalizer.py) to give its skeleton."""
+    if "2 " in text or "2\n" in text:
+        return DIGIT.sub("0", text)
+    return text.translate(_DIGITS)
+
+class Template:
+    """How to read every field of an SMS, learnt from the first SMS with its skeleton.
+
+    end is where the trailer clauses of the SMS begin (see segmenter.py). A
+    field read from a fixed place has the same span in every SMS with the
+    skeleton, so the span of the first SMS is kept; spans are in canonical text.
+    """
+
+    __slots__ = ("recipes", "end", "unverified")
+
+    def __init__(self, recipes: dict, end: int):
+        self.recipes = recipes
+        self.end = end
+        self.unverified = VERIFY_SIGHTINGS
+
+    def extract(self, text: str, now: datetime = None) -> dict:
+        """Read the fields of an SMS with this skeleton, or return None if its date does not parse."""
+        result, accounts = {}, None
+        body = text[:self.end]
+        for field, (kind, data, first) in self.recipes.items():
+            if kind == CONST:
+                result[field] = dict(first)
+            elif kind == SPAN or kind == AMOUNT:
+                value = body[data[0]:data[1]]
+                result[field] = dict(first, value=value.replace(",", "") if kind == AMOUNT else value)
+                if first.get("bank") is not None:
+                    result[field]["bank"] = vpa_bank(value)
+            elif kind == DATE:
+                index, start = data
+                pattern = DATE_TIER.patterns[index]
+                match = pattern.match(body, start)
+                value = match and parse_date_match(match, DATE_FORMATS[pattern])
+                if not value:
+                    return None
+                result[field] = dict(first, value=value)
+            elif kind == INFERRED:
+                result[field] = match_upi_or_account(text, KNOWN_BANKS, ACCOUNT_PREFIX_TO_BANK)
+            elif field in ("account_from", "account_to"):
+                if accounts is None:
+                    account_from, account_to = extract_account_details(body)
+                    accounts = {"account_from": account_from, "account_to": account_to}
+                result[field] = accounts[field]
+            elif field == "date":
+                result[field] = extract_date(body, now=now)
+            else:
+                result[field] = _EXTRACTORS[field](body)
+        return result
+
+# The extractors a RECOMPUTE recipe runs, besides date and accounts (a bank is CONST or INFERRED)
+_EXTRACTORS = {
+    "amount": extract_amount,
+    "transaction_type": extract_transaction_type,
+    "payee": extract_payee,
+}
+
+def _span_recipe(text: str, value: str):
+    """Return how to read a value found in the text, or None if it cannot be told.
+
+    A value without digits is the same in every SMS with the skeleton (CONST).
+    A value with digits, found once, is read at that place (SPAN).
+    """
+    start = text.find(value)
+    if start == -1:
+        return None
+    if value.translate(_DIGITS) == value:
+        return CONST, None
+    if text.find(value, start + 1) == -1:
+        return SPAN, (start, start + len(value))
+    return None
+
+def _date_recipe(text: str, value: str):
+    """Find the date pattern behind an explicit date, as extract_date does, or return None."""
+    rejected = []
+
+    def parses(match) -> bool:
+        if parse_date_match(match, DATE_FORMATS[match.re]) is None:
+            rejected.append(match)
+            return False
+        return True
+
+    index, match = DATE_TIER.search(text, accept=parses)
+    # A date that did not parse might in a later SMS, and win there
+    if match is None or rejected or parse_date_match(match, DATE_FORMATS[match.re]) != value:
+        return None
+    return DATE, (index, match.start())
+
+def _timed_out(result: dict) -> bool:
+    return any(field["error"] == BUDGET_ERROR for field in result.values())
+
+def compile_template(text: str, result: dict, spans: dict) -> Template:
+    """Work out from the first SMS with a skeleton, and its full result, how to read each field.
+
+    spans gives the span of each field in the canonical text (see TransactionDetails.text_span).
+    """
+    recipes = {}
+    # As in extract_transaction_details, only the bank is read from the trailer
+    body = crop_trailers(text)
+    for field, first in result.items():
+        first = dict(first, span=spans[field])
+        value = first["value"]
+        recipe = None
+        if field == "bank":
+            # A bank named in the words is CONST; one read from an account number is not
+            named = match_bank_patterns(text, KNOWN_BANK_CODES, BANK_PATTERNS)[0]
+            recipe = (CONST, None) if named else (INFERRED, None)
+        elif field == "date":
+            if not DATE_GATE.search(body):
+                # No literal date: none is CONST, a relative one ("yesterday") is recomputed against now
+                recipe = (CONST, None) if value is None else None
+            elif value is not None:
+                recipe = _date_recipe(body, value)
+        elif value is None or field == "transaction_type":
+            # The type is read from keywords, which no digit can change
+            recipe = CONST, None
+        elif field == "amount":
+            token = first_token(tokenize(body), "amount")
+            number = token and AMOUNT_NUMBER.search(body, token.start, token.end)
+            if number and number.group().replace(",", "") == value:
+                recipe = AMOUNT, number.span()
+        else:
+            recipe = _span_recipe(body, value)
+        kind, data = recipe or (RECOMPUTE, None)
+        recipes[field] = kind, data, first
+    return Template(recipes, len(body))
+
+class TemplateCache:
+    """A bounded LRU of templates, keyed on the skeleton of the SMS.
+
+    Bank alerts are written from fixed templates in which only the numbers
+    change. The first SMS with a new skeleton is extracted in full, and a
+    template is compiled from its result: for each field, whether it is the
+    same in every SMS with the skeleton, is read from a fixed place, or has to
+    be extracted again. Later SMS with that skeleton are read from the
+    template; the first VERIFY_SIGHTINGS of them are also extracted in full,
+    and a template that gets any of them wrong is never used again.
+
+    hits and misses count skeletons found in and missing from the cache,
+    compiles the templates built, and rejects those dropped by the check.
+    """
+
+    __slots__ = ("max_templates", "_templates", "hits", "misses", "compiles", "rejects")
+
+    def __init__(self, max_templates: int = MAX_TEMPLATES):
+        self.max_templates = max_templates
+        self._templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.compiles = 0
+        self.rejects = 0
+
+    def extract(self, sms: str, now: datetime = None, sender: str = None) -> dict:
+        """Same as extract_transaction_details, read from the SMS template where one is known."""
+        normalized = normalize_sms(sms)
+        text = normalized.text[:MAX_SMS_LENGTH]
+        key = skeleton(text)
+        template = self._templates.get(key)
+        if template is None and key not in self._templates:
+            self.misses += 1
+            result = extract_transaction_details(sms, now, sender)
+            if _timed_out(result):
+                # Fields were given up on; the template is learnt from a later SMS
+                return result
+            self._templates[key] = compile_template(text, result, {field: result.text_span(field) for field in result})
+            self.compiles += 1
+            if len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+            return result
+
+        self.hits += 1
+        self._templates.move_to_end(key)
+        if template is None:
+            # Rejected: this skeleton is always extracted in full
+            return extract_transaction_details(sms, now, sender)
+        result = template.extract(text, now)
+        if result is not None:
+            for field in result.values():
+                if field["span"] is not None:
+                    field["span"] = normalized.original_span(*field["span"])
+        if template.unverified or result is None:
+            full = extract_transaction_details(sms, now, sender)
+            if template.unverified and result is not None and not _timed_out(full):
+                template.unverified -= 1
+                if result != full:
+                    self._templates[key] = None
+                    self.rejects += 1
+            return full
+        return result
+
+    def stats(self) -> dict:
+        """Return the counters and the number of templates held."""
+        return {"templates": len(self._templates), "hits": self.hits, "misses": self.misses,
+                "compiles": self.compiles, "rejects": self.rejects}
+
+    def clear(self):
+        """Forget every template and reset the counters."""
+        self._templates.clear()
+        self.hits = self.misses = self.compiles = self.rejects = 0
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+# The default cache
+TEMPLATE_CACHE = TemplateCache()
@@ -1,311 +1,384 @@
 import re
+import time
 from datetime import datetime, timedelta
-from .helpers.bank_helpers import match_bank_patterns, match_upi_or_account
-from .helpers.amount_helpers import match_amount_pattern
-from .helpers.date_helpers import match_date_patterns, match_relative_dates
+from .helpers.bank_helpers import (
+    match_bank_patterns_with_span, match_upi_or_account, vpa_bank, KNOWN_BANKS, KNOWN_BANK_CODES
+)
+from .helpers.amount_helpers import match_amount_pattern_with_span
+from .helpers.account_helpers import resolve_accounts_with_spans
+from .helpers.date_helpers import (
+    match_date_tier_with_span, match_relative_dates_with_span, match_relative_tokens_with_span
+)
+from .lexer import tokenize, first_token
+from .lexicon import Lexicon
+from .normalizer import normalize_sms, NormalizedSms
+from .patterns import register, register_family, register_tier, stripped_span, PatternTier
+from .plans import SENDER_PLANS
+from .segmenter import crop_trailers
+from .features import (
+    scan_features, TO, AT, AT_SIGN, ACCOUNT, UPI, BENEFICIARY,
+    BILL, DUES, SERVICE, RECURRING, PAID, PAREN, DASH, TWO
+)
+
+# Extract bank name - enhanced with more patterns and bank-account prefix mapping
+BANK_PATTERNS = register_family("bank.name", [
+    r"(?:^|\s)([A-Z]{2,}(?:\s+[A-Z]+)?\s+Bank)",  # "HDFC Bank", "SBI Bank"
+    r"(?:^|\s)([A-Z]{2,}(?:\s+[A-Z]+)?):?(?:\s|$)",  # "HDFC:", "SBI:", "ICICI"
+    r"(?:from|on|to|in|your)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?\s+[Bb]ank)",  # "your Axis Bank", "from HDFC Bank"
+    r"(?:from|on|to|in|your)\s+([A-Z]{2,}\s+FIRST)"  # "IDFC FIRST"
+], re.IGNORECASE)
+
+# First, try to extract full date patterns with year
+DATE_PATTERNS = register_family("date.full", [
+    # Explicit full dates with different separators and formats
+    (r"\b(\d{2})[/-](\d{2})[/-](\d{2,4})\b", "%d-%m-%y"),          # 03-04-25 or 03/04/25
+    (r"\b(\d{4})-(\d{2})-(\d{2})\b", "%Y-%m-%d"),                  # 2025-03-25
+    (r"\b(\d{2})\.(\d{2})\.(\d{4})\b", "%d.%m.%Y"),                # 05.04.2025
+    (r"\b(\d{2})/(\d{2})/(\d{4})\b", "%d/%m/%Y"),                  # 05/04/2025
+    (r"\b(\d{2})-([A-Za-z]{3})-(\d{2,4})\b", "%d-%b-%y"),          # 01-Apr-25
+    (r"\bon\s+(\d{2})[/-](\d{2})[/-](\d{2,4})\b", "%d-%m-%y"),     # on 03-04-25
+    (r"\bon\s+(\d{2})\.(\d{2})\.(\d{4})\b", "%d.%m.%Y"),           # on 05.04.2025
+    (r"\bon\s+(\d{1,2})\s+([A-Za-z]{3,9})[,]?\s+(\d{4})\b", "%d %B %Y"),  # on 5 April 2025
+    (r"\bon\s+(\d{2})-([A-Za-z]{3})-(\d{2,4})\b", "%d-%b-%y"),     # on 01-Apr-25
+    (r"\b([A-Za-z]{3,9})\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b", "%B %d %Y"),  # April 5th, 2025
+    (r"\b(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\s+(\d{4})\b", "%d %B %Y"),    # 5th April 2025
+], re.IGNORECASE)
+# The same patterns as a tier, tried one by one, so that they can follow a sender plan
+DATE_TIER = PatternTier("date.full", [pattern for pattern, _ in DATE_PATTERNS], alternate=False)
+DATE_FORMATS = dict(DATE_PATTERNS)
+# Every date the patterns above can find contains one of these, each starting at
+# a digit: 03-04, 05.04.2, 01-Apr-2, 5th April 2025 or 5th, 2025. An SMS without
+# any is ruled out in one scan.
+DATE_GATE = register("date.full_gate", r"""
+    \d(?:[/\-]\d
+      |\.\d{2}\.\d
+      |-[a-z]{3}-\d
+      |(?:st|nd|rd|th)?,?\s+(?:[a-z]{3,9},?\s+)?\d{4})
+""", re.IGNORECASE | re.VERBOSE)
+
+# Enhanced transaction type detection
+DEBIT_KEYWORDS = register("type.debit", r"(?i)\b(debited|spent|paid|sent|withdrawn|withdrawal|purchase|payment)\b")
+CREDIT_KEYWORDS = register("type.credit", r"(?i)\b(credited|received|deposit|salary|credit|cash\s+in)\b")
+TRANSFER_KEYWORDS = register("type.transfer", r"(?i)\b(transferred|transfer|sent|paid|payment)\b")
+CARD_USAGE = register("type.card_used", r"(?i)\b(card|debit card).+used\b")
+# The same keywords as word sets, for the lexicon
+DEBIT_WORDS = frozenset(["debited", "spent", "paid", "sent", "withdrawn", "withdrawal", "purchase", "payment"])
+CREDIT_WORDS = frozenset(["credited", "received", "deposit", "salary", "credit"])  # and "cash in"
+TRANSFER_WORDS = frozenset(["transferred", "transfer", "sent", "paid", "payment"])
+
+# 1. Merchant name extraction (for card transactions, POS, etc.)
+MERCHANT_TIER = register_tier("payee.merchant", [
+    (r"(?i)(?:at|@)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)", (AT | AT_SIGN,)),  # at AMAZON.IN
+    (r"(?i)(?:at|to|@)\s+([A-Z][A-Z0-9\s]+)(?:\s+using|\s+via|\s+on|\.|$)", (AT | TO | AT_SIGN,)),  # at AMAZON using
+    (r"(?i)(?:POS|purchase)\s+(?:at|@)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)", (AT | AT_SIGN,)),  # POS at WALMART
+    (r"(?i)(?:for purchase at|spent at|paid to|payment to)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)", (AT | TO,)),  # for purchase at FLIPKART
+    (r"(?i)(?:card|debit card|credit card).+(?:used|transaction|purchase).+(?:at|@)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)", (AT | AT_SIGN,)) # card used at STORE
+])
+# Filter out non-merchant text that might be mistakenly captured
+NON_MERCHANT_PREFIX = register("payee.merchant_filter", r'(?i)(on|using|via|the|your|our)')
+
+# 2. UPI ID extraction
+UPI_TIER = register_tier("payee.upi", [
+    (r"(?i)(?:to|2|sent to|paid to|payment to)\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)", (AT_SIGN,)),  # to user@bank
+    (r"(?i)(?:UPI:?\s+|VPA:?\s+)([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)", (AT_SIGN,)),  # UPI: user@bank
+    (r"(?i)(?:UPI ID|VPA ID):?\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)", (AT_SIGN,)),  # UPI ID: user@bank
+    (r"(?i)(?:UPI|VPA|UPI Ref):?\s+(?:.*?)\s+(?:to|2|ID:?)\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)", (AT_SIGN,)) # UPI payment to user@bank
+])
+
+# 3. Person name extraction (for fund transfers, IMPS, NEFT, etc.)
+PERSON_TIER = register_tier("payee.person", [
+    (r"(?i)(?:transferred|sent|payment|paid)(?:\s+to)?\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})(?:'s)?\s+(?:A\/C|A\/c|Acct|account|a/c)", (ACCOUNT,)),  # transferred to Rajesh Kumar's A/c
+    (r"(?i)(?:transferred|sent|payment|paid)(?:\s+to)?\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})(?:'s)?\s+(?:A\/C|A\/c|Acct|account|a/c)", (ACCOUNT,)),  # transferred to PRIYA SHARMA a/c
+    (r"(?i)(?:to|2)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})(?:\s+via|\s+through|\s+using|\s+by)?", (TO | TWO,)),  # to Rajesh Kumar via
+    (r"(?i)(?:to|2)\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})(?:\s+via|\s+through|\s+using|\s+by)?", (TO | TWO,)),  # to PRIYA SHARMA via
+    (r"(?i)(?:beneficiary|benef|recipient):?\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})", (BENEFICIARY,)),  # beneficiary: Rajesh Kumar
+    (r"(?i)(?:beneficiary|benef|recipient):?\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})", (BENEFICIARY,)),  # beneficiary: PRIYA SHARMA
+    (r"(?i)(?:to|2)\s+(?:the\s+account\s+of\s+)([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})", (TO | TWO, ACCOUNT)),  # to the account of Rajesh Kumar
+    (r"(?i)(?:to|2)\s+(?:the\s+account\s+of\s+)([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})", (TO | TWO, ACCOUNT)),  # to the account of PRIYA SHARMA
+    (r"(?i)(?:transfer|payment|sent|paid)\s+to\s+(?:[^.]*?)(?:\()([^)]+)(?:\))", (TO, PAREN)),  # transfer to account (PRIYA SHARMA)
+    (r"(?i)(?:fund\s+transfer|transfer|payment|sent|paid)\s+to\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})", (TO,)),  # fund transfer to Rajesh Kumar
+    (r"(?i)(?:fund\s+transfer|transfer|payment|sent|paid)\s+to\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})", (TO,)),  # fund transfer to PRIYA SHARMA
+    # Special case for Dr./Mr./Mrs. titles
+    (r"(?i)(?:to|2|sent to|paid to|payment to)\s+((?:Dr|Mr|Mrs|Ms|Prof)\.?\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)", (TO | TWO,))  # to Dr. John Smith
+])
+# Check if it's likely a person name (not containing common non-name words)
+NON_NAME_WORDS = register("payee.non_name", r'(?i)\b(bank|card|account|billing|payment|purchase|transaction|reference|paid|using|info)\b')
+
+# 4. Service payment extraction (bills, subscriptions, etc.)
+SERVICE_TIER = register_tier("payee.service", [
+    (r"(?i)(?:towards|for)\s+([A-Za-z\s]+\b(?:Bill|Payment|Recharge|Subscription))(?:\s+-\s+([A-Za-z\s]+))?", (BILL,)),  # towards Electricity Bill - Provider
+    (r"(?i)(?:towards|for)\s+([A-Za-z\s]+(?:Bill|Payment|Recharge|Subscription))(?:\s+to|\s+for|\s+of)?\s+([A-Za-z\s]+)", (BILL,)),  # for Mobile Bill Payment to Airtel
+    # DTH Recharge - Tata Sky. Was "(?:[A-Za-z\s]+(?:Bill|...))\s+-\s+(...)"; the lookbehind matches the
+    # same messages and captures the same provider without rescanning the words before the keyword
+    (r"(?i)(?<=[A-Za-z\s])(?:Bill|Payment|Recharge|Subscription)\s+-\s+([A-Za-z\s]+)", (BILL, DASH)),
+    (r"(?i)(?:payment|paid|transferred|sent)(?:\s+for)?\s+([A-Za-z\s]+(?:Bill|Invoice|Receipt|Statement|Dues|Fee|Fees))", (DUES,)),  # payment for Electricity Bill
+    (r"(?i)(?:payment|paid|transferred|sent)(?:\s+for)?\s+([A-Za-z\s]+)\s+(?:Bill|Invoice|Receipt|Dues|Fee|Fees)", (DUES,))  # payment for College Fees
+])
+
+# 5. Edge cases and mixed formats - combining merchant/person with UPI
+EDGE_TIER = register_tier("payee.edge", [
+    (r"(?i)(?:to|2|sent to|paid to|payment to)\s+([^()]+)(?:\s*\(UPI ID:?\s*([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)\))", (AT_SIGN, UPI, PAREN)),  # to Name (UPI ID: user@bank)
+    (r"(?i)(?:to|2|sent to|paid to|payment to)\s+([^()]+)(?:\s+via|through|using)\s+UPI", (UPI,)),  # to Name via UPI
+    (r"(?i)(?:to|2|sent to|paid to|payment to|for)\s+([A-Za-z\s]+(?:service|consultation|fee|invoice|subscription))", (SERVICE,)),  # for Medical Consultation
+    (r"(?i)(?:to|2|sent to|paid to|payment to)\s+([^()]+)(?:\s+-\s+([A-Za-z\s]+))", (DASH,)),  # to XYZ Corp - Invoice #12345
+    (r"(?i)(?:at|@)\s+([A-Za-z0-9\s]+)\s+(?:subscription|membership|recurring)", (AT | AT_SIGN, RECURRING))  # at NETFLIX subscription
+])
+
+# 6. Bank and credit card related payments
+BANK_PAYMENT_TIER = register_tier("payee.bank_payment", [
+    (r"(?i)(?:payment|paid)(?:\s+towards|\s+for)?\s+(?:your)?\s+([A-Za-z\s]+(?:Card|credit\s+card|loan|mortgage)(?:\s+Bill)?)", (PAID,)),  # payment towards your Credit Card Bill
+    (r"(?i)(?:payment|paid)(?:\s+towards|\s+for)?\s+(?:your)?\s+([A-Za-z\s]+(?:EMI|Loan\s+EMI|Dues|Statement))", (PAID,)),  # payment towards your Home Loan EMI
+    (r"(?i)(?:payment|paid)(?:\s+to)?\s+(?:your)?\s+([A-Za-z\s]+(?:Bank|Financial|Finance|Insurance)(?:\s+[A-Za-z\s]+)?)", (PAID,))  # payment to ICICI Home Finance
+])
+
+# Mapping of account prefixes to likely banks
+ACCOUNT_PREFIX_TO_BANK = {
+    "45": "HDFC",
+    "21": "SBI",
+    "33": "ICICI",
+    "91": "AXIS",
+    "59": "KOTAK",
+    "36": "CITI",
+    "40": "YES"
+    # Add more mappings based on real-world observations
+}
 
 def extract_bank(sms: str) -> dict:
-    """Extract bank name from SMS message."""
-    result = {"value": None, "confidence": 0.0, "error": None}
-    
-    # List of known banks for validation
-    known_banks = [
-        "HDFC", "SBI", "ICICI", "AXIS", "IDFC FIRST", "YES", "KOTAK", "PNB", 
-        "BOB", "BOI", "CANARA", "UNION", "DEUTSCHE", "INDUSIND", "FEDERAL",
-        "RBL", "CITI", "HSBC", "IDBI", "UCO", "BANDHAN", "KARNATAKA", "INDIAN"
-    ]
-    
-    # Mapping of account prefixes to likely banks
-    account_prefix_to_bank = {
-        "45": "HDFC",
-        "21": "SBI",
-        "33": "ICICI",
-        "91": "AXIS",
-        "59": "KOTAK",
-        "36": "CITI",
-        "40": "YES"
-        # Add more mappings based on real-world observations
-    }
-    
-    # Extract bank name - enhanced with more patterns and bank-account prefix mapping
-    bank_patterns = [
-        r"(?:^|\s)([A-Z]{2,}(?:\s+[A-Z]+)?\s+Bank)",  # "HDFC Bank", "SBI Bank"
-        r"(?:^|\s)([A-Z]{2,}(?:\s+[A-Z]+)?):?(?:\s|$)",  # "HDFC:", "SBI:", "ICICI"
-        r"(?:from|on|to|in|your)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?\s+[Bb]ank)",  # "your Axis Bank", "from HDFC Bank"
-        r"(?:from|on|to|in|your)\s+([A-Z]{2,}\s+FIRST)"  # "IDFC FIRST"
-    ]
-    
-    bank_name, bank_confidence = match_bank_patterns(sms, known_banks, bank_patterns)
+    """Extract bank name from SMS message.
+
+    As for every field, "span" is the (start, end) in the SMS of the text the
+    value was read from (here the bank name, UPI handle or account number), or None.
+    """
+    result = {"value": None, "confidence": 0.0, "error": None, "span": None}
+
+    bank_name, bank_confidence, span = match_bank_patterns_with_span(sms, KNOWN_BANK_CODES, BANK_PATTERNS)
     if bank_name:
-        result = {"value": bank_name, "confidence": bank_confidence, "error": None}
+        result = {"value": bank_name, "confidence": bank_confidence, "error": None, "span": span}
     else:
-        result = match_upi_or_account(sms, known_banks, account_prefix_to_bank)
-    
+        result = match_upi_or_account(sms, KNOWN_BANKS, ACCOUNT_PREFIX_TO_BANK)
+
     return result
 
-def extract_amount(sms: str) -> dict:
-    """Extract transaction amount from SMS message."""
-    result = {"value": None, "confidence": 0.0, "error": None}
-    
-    amount_value, confidence = match_amount_pattern(sms)
+def extract_amount(sms: str, tokens: list = None) -> dict:
+    """Extract transaction amount from SMS message, or from its lexer tokens if given.
+
+    The span is that of the currency mention, such as "Rs.1,200.00".
+    """
+    result = {"value": None, "confidence": 0.0, "error": None, "span": None}
+
+    if tokens is None:
+        amount_value, confidence, span = match_amount_pattern_with_span(sms)
+    else:
+        amount = first_token(tokens, "amount")
+        amount_value, confidence, span = (amount.value, 1.0, (amount.start, amount.end)) if amount else (None, 0.0, None)
     if amount_value:
-        result = {"value": amount_value, "confidence": confidence, "error": None}
+        result = {"value": amount_value, "confidence": confidence, "error": None, "span": span}
     else:
         result["error"] = "Amount not found"
-    
+
     return result
 
-def extract_date(sms: str) -> dict:
-    """Extract transaction date from SMS message."""
-    result = {"value": None, "confidence": 0.0, "error": None}
-    
-    today = datetime.now()
+def extract_date(sms: str, tokens: list = None, now: datetime = None, plan: dict = None) -> dict:
+    """Extract transaction date from SMS message.
+
+    If the lexer tokens are given, relative dates (today/yesterday/tomorrow) are read from them.
+    Relative dates are resolved against now (default: the current time).
+    With a sender plan (see plans.py) the date pattern that won last time is tried first.
+    The span is that of the date as written, without a word such as "on" before it.
+    """
+    result = {"value": None, "confidence": 0.0, "error": None, "span": None}
+
+    today = now or datetime.now()
     current_year = today.year
-    
-    # First, try to extract full date patterns with year
-    date_patterns = [
-        # Explicit full dates with different separators and formats
-        (r"\b(\d{2})[/-](\d{2})[/-](\d{2,4})\b", "%d-%m-%y"),          # 03-04-25 or 03/04/25
-        (r"\b(\d{4})-(\d{2})-(\d{2})\b", "%Y-%m-%d"),                  # 2025-03-25
-        (r"\b(\d{2})\.(\d{2})\.(\d{4})\b", "%d.%m.%Y"),                # 05.04.2025
-        (r"\b(\d{2})/(\d{2})/(\d{4})\b", "%d/%m/%Y"),                  # 05/04/2025
-        (r"\b(\d{2})-([A-Za-z]{3})-(\d{2,4})\b", "%d-%b-%y"),          # 01-Apr-25
-        (r"\bon\s+(\d{2})[/-](\d{2})[/-](\d{2,4})\b", "%d-%m-%y"),     # on 03-04-25
-        (r"\bon\s+(\d{2})\.(\d{2})\.(\d{4})\b", "%d.%m.%Y"),           # on 05.04.2025
-        (r"\bon\s+(\d{1,2})\s+([A-Za-z]{3,9})[,]?\s+(\d{4})\b", "%d %B %Y"),  # on 5 April 2025
-        (r"\bon\s+(\d{2})-([A-Za-z]{3})-(\d{2,4})\b", "%d-%b-%y"),     # on 01-Apr-25
-        (r"\b([A-Za-z]{3,9})\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b", "%B %d %Y"),  # April 5th, 2025
-        (r"\b(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\s+(\d{4})\b", "%d %B %Y"),    # 5th April 2025
-    ]
-    
-    date_value, confidence = match_date_patterns(sms, date_patterns, today)
+
+    date_value, confidence, span = None, 0.0, None
+    if DATE_GATE.search(sms):
+        date_value, confidence, span = match_date_tier_with_span(sms, DATE_TIER, DATE_FORMATS, plan)
     if not date_value:
-        date_value, confidence = match_relative_dates(sms, today)
-    
+        if tokens is None:
+            date_value, confidence, span = match_relative_dates_with_span(sms, today)
+        else:
+            date_value, confidence, span = match_relative_tokens_with_span(tokens, today)
+
     if date_value:
-        result = {"value": date_value, "confidence": confidence, "error": None}
+        result = {"value": date_value, "confidence": confidence, "error": None, "span": span}
     else:
         result["error"] = "Date not found"
-    
+
     return result
 
-def extract_transaction_type(sms: str) -> dict:
-    """Extract transaction type from SMS message."""
-    result = {"value": None, "confidence": 0.0, "error": None}
-    
-    # Enhanced transaction type detection
-    if re.search(r"(?i)\b(debited|spent|paid|sent|withdrawn|withdrawal|purchase|payment)\b", sms):
+def _card_used(sms: str, tokens: list) -> tuple:
+    """Same as CARD_USAGE.search(sms): "card", then at least one character on the same line, then "used".
+
+    Returns the span from "card" to "used", or None.
+    """
+    cards = [token for token in tokens if token.kind == "card"]
+    for token in tokens:
+        if token.kind == "used":
+            for card in cards:
+                if card.end < token.start and "\n" not in sms[card.end:token.start]:
+                    return card.start, token.end
+    return None
+
+def _match_span(match, group: int = 0) -> tuple:
+    return match.span(group) if match else None
+
+def extract_transaction_type(sms: str, tokens: list = None) -> dict:
+    """Extract transaction type from SMS message, or from its lexer tokens if given.
+
+    The span is that of the first keyword of the type found ("debited"), or of
+    "card ... used".
+    """
+    result = {"value": None, "confidence": 0.0, "error": None, "span": None}
+
+    if tokens is None:
+        lexicon = Lexicon(sms)
+        is_debit = lambda sms: lexicon.has_word(DEBIT_WORDS, DEBIT_KEYWORDS) and _match_span(DEBIT_KEYWORDS.search(sms), 1)
+        is_credit = lambda sms: ((lexicon.has_word(CREDIT_WORDS, CREDIT_KEYWORDS)
+                                  or lexicon.has_phrase("cash", "in", CREDIT_KEYWORDS))
+                                 and _match_span(CREDIT_KEYWORDS.search(sms), 1))
+        is_transfer = lambda sms: (lexicon.has_word(TRANSFER_WORDS, TRANSFER_KEYWORDS)
+                                   and _match_span(TRANSFER_KEYWORDS.search(sms), 1))
+        is_card_used = lambda sms: _match_span(CARD_USAGE.search(sms))
+    else:
+        # The keyword tokens are the words of the patterns above. "sent", "paid" and
+        # "payment" are debit tokens, so the transfer check only needs the transfer words.
+        # Each check returns the span of the first keyword of its kind, or None.
+        first = {}
+        for token in tokens:
+            if token.kind in ("debit", "credit", "transfer"):
+                first.setdefault(token.kind, (token.start, token.end))
+        is_debit = lambda sms: first.get("debit")
+        is_credit = lambda sms: first.get("credit")
+        is_transfer = lambda sms: first.get("transfer")
+        is_card_used = lambda sms: _card_used(sms, tokens)
+
+    span = is_debit(sms)
+    if span:
         txn_type = "debit"
-        result = {"value": txn_type, "confidence": 0.95, "error": None}
-    elif re.search(r"(?i)\b(credited|received|deposit|salary|credit|cash\s+in)\b", sms):
+        result = {"value": txn_type, "confidence": 0.95, "error": None, "span": span}
+    elif (span := is_credit(sms)):
         txn_type = "credit"
-        result = {"value": txn_type, "confidence": 0.95, "error": None}
-    elif re.search(r"(?i)\b(transferred|transfer|sent|paid|payment)\b", sms):
+        result = {"value": txn_type, "confidence": 0.95, "error": None, "span": span}
+    elif (span := is_transfer(sms)):
         txn_type = "debit"  # Most transfers are debits unless explicitly stated otherwise
-        result = {"value": txn_type, "confidence": 0.95, "error": None}
-    elif re.search(r"(?i)\b(card|debit card).+used\b", sms):  # Card usage is typically a debit
+        result = {"value": txn_type, "confidence": 0.95, "error": None, "span": span}
+    elif (span := is_card_used(sms)):  # Card usage is typically a debit
         txn_type = "debit"
-        result = {"value": txn_type, "confidence": 0.95, "error": None}
+        result = {"value": txn_type, "confidence": 0.95, "error": None, "span": span}
     else:
         result["error"] = "Transaction type not found"
-    
+
     return result
 
-def extract_payee(sms: str) -> dict:
-    """Extract payee information from SMS message."""
-    result = {"value": None, "confidence": 0.0, "error": None}
-    
+def _is_merchant_name(match) -> bool:
+    """Filter out non-merchant text that might be mistakenly captured."""
+    merchant = match.group(1).strip()
+    return bool(merchant) and not NON_MERCHANT_PREFIX.match(merchant)
+
+def _is_person_name(match) -> bool:
+    """Check if it's likely a person name (not containing common non-name words)."""
+    person_name = match.group(1).strip()
+    return bool(person_name) and not NON_NAME_WORDS.search(person_name)
+
+def extract_payee(sms: str, features: int = None, plan: dict = None) -> dict:
+    """Extract payee information from SMS message.
+
+    Each tier is searched in one pass; the first pattern in tier order that
+    matches (and passes the tier's filter) wins, as if tried one by one.
+    Patterns whose anchor words are missing from the feature bitmap are skipped.
+    The payee also carries the bank behind its UPI handle under "bank": None
+    unless it was found as a UPI ID.
+    With a sender plan (see plans.py) each tier tries the pattern that won last time first.
+    The span is that of the name as captured; a name joined with a provider or
+    UPI ID ("Mobile Bill - Airtel") spans both.
+    """
+    result = {"value": None, "confidence": 0.0, "error": None, "span": None}
+    if features is None:
+        features = scan_features(sms)
+
     # 1. Merchant name extraction (for card transactions, POS, etc.)
-    merchant_patterns = [
-        r"(?i)(?:at|@)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)",  # at AMAZON.IN
-        r"(?i)(?:at|to|@)\s+([A-Z][A-Z0-9\s]+)(?:\s+using|\s+via|\s+on|\.|$)",  # at AMAZON using
-        r"(?i)(?:POS|purchase)\s+(?:at|@)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)",  # POS at WALMART
-        r"(?i)(?:for purchase at|spent at|paid to|payment to)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)",  # for purchase at FLIPKART
-        r"(?i)(?:card|debit card|credit card).+(?:used|transaction|purchase).+(?:at|@)\s+([A-Z0-9\s]+)(?:\s+on|\.|$)" # card used at STORE
-    ]
-    
-    for pattern in merchant_patterns:
-        match = re.search(pattern, sms)
-        if match:
-            merchant = match.group(1).strip()
-            # Filter out non-merchant text that might be mistakenly captured
-            if merchant and not re.match(r'(?i)(on|using|via|the|your|our)', merchant):
-                result = {"value": merchant, "confidence": 0.9, "error": None}
-                break
+    _, match = MERCHANT_TIER.search(sms, accept=_is_merchant_name, features=features, plan=plan)
+    if match:
+        merchant = match.group(1).strip()
+        result = {"value": merchant, "confidence": 0.9, "error": None, "span": stripped_span(match, 1)}
 
     # 2. UPI ID extraction
     if not result["value"]:
-        upi_patterns = [
-            r"(?i)(?:to|2|sent to|paid to|payment to)\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)",  # to user@bank
-            r"(?i)(?:UPI:?\s+|VPA:?\s+)([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)",  # UPI: user@bank
-            r"(?i)(?:UPI ID|VPA ID):?\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)",  # UPI ID: user@bank
-            r"(?i)(?:UPI|VPA|UPI Ref):?\s+(?:.*?)\s+(?:to|2|ID:?)\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)" # UPI payment to user@bank
-        ]
-        
-        for pattern in upi_patterns:
-            match = re.search(pattern, sms)
-            if match:
-                upi_id = match.group(1).strip()
-                result = {"value": upi_id, "confidence": 0.85, "error": None}
-                break
+        _, match = UPI_TIER.search(sms, features=features, plan=plan)
+        if match:
+            upi_id = match.group(1).strip()
+            result = {"value": upi_id, "confidence": 0.85, "error": None, "span": stripped_span(match, 1),
+                      "bank": vpa_bank(upi_id)}
 
     # 3. Person name extraction (for fund transfers, IMPS, NEFT, etc.)
     if not result["value"]:
-        person_patterns = [
-            r"(?i)(?:transferred|sent|payment|paid)(?:\s+to)?\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})(?:'s)?\s+(?:A\/C|A\/c|Acct|account|a/c)",  # transferred to Rajesh Kumar's A/c
-            r"(?i)(?:transferred|sent|payment|paid)(?:\s+to)?\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})(?:'s)?\s+(?:A\/C|A\/c|Acct|account|a/c)",  # transferred to PRIYA SHARMA a/c
-            r"(?i)(?:to|2)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})(?:\s+via|\s+through|\s+using|\s+by)?",  # to Rajesh Kumar via
-            r"(?i)(?:to|2)\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})(?:\s+via|\s+through|\s+using|\s+by)?",  # to PRIYA SHARMA via
-            r"(?i)(?:beneficiary|benef|recipient):?\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})",  # beneficiary: Rajesh Kumar
-            r"(?i)(?:beneficiary|benef|recipient):?\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})",  # beneficiary: PRIYA SHARMA
-            r"(?i)(?:to|2)\s+(?:the\s+account\s+of\s+)([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})",  # to the account of Rajesh Kumar
-            r"(?i)(?:to|2)\s+(?:the\s+account\s+of\s+)([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})",  # to the account of PRIYA SHARMA
-            r"(?i)(?:transfer|payment|sent|paid)\s+to\s+(?:[^.]*?)(?:\()([^)]+)(?:\))",  # transfer to account (PRIYA SHARMA)
-            r"(?i)(?:fund\s+transfer|transfer|payment|sent|paid)\s+to\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})",  # fund transfer to Rajesh Kumar
-            r"(?i)(?:fund\s+transfer|transfer|payment|sent|paid)\s+to\s+([A-Z]{2,}(?:\s+[A-Z]{2,}){1,2})",  # fund transfer to PRIYA SHARMA
-            # Special case for Dr./Mr./Mrs. titles
-            r"(?i)(?:to|2|sent to|paid to|payment to)\s+((?:Dr|Mr|Mrs|Ms|Prof)\.?\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)"  # to Dr. John Smith
-        ]
-
-        for pattern in person_patterns:
-            match = re.search(pattern, sms)
-            if match:
-                person_name = match.group(1).strip()
-                # Check if it's likely a person name (not containing common non-name words)
-                if person_name and not re.search(r'(?i)\b(bank|card|account|billing|payment|purchase|transaction|reference|paid|using|info)\b', person_name):
-                    result = {"value": person_name, "confidence": 0.85, "error": None}
-                    break
+        _, match = PERSON_TIER.search(sms, accept=_is_person_name, features=features, plan=plan)
+        if match:
+            person_name = match.group(1).strip()
+            result = {"value": person_name, "confidence": 0.85, "error": None, "span": stripped_span(match, 1)}
 
     # 4. Service payment extraction (bills, subscriptions, etc.)
     if not result["value"]:
-        service_patterns = [
-            r"(?i)(?:towards|for)\s+([A-Za-z\s]+\b(?:Bill|Payment|Recharge|Subscription))(?:\s+-\s+([A-Za-z\s]+))?",  # towards Electricity Bill - Provider
-            r"(?i)(?:towards|for)\s+([A-Za-z\s]+(?:Bill|Payment|Recharge|Subscription))(?:\s+to|\s+for|\s+of)?\s+([A-Za-z\s]+)",  # for Mobile Bill Payment to Airtel
-            r"(?i)(?:[A-Za-z\s]+(?:Bill|Payment|Recharge|Subscription))\s+-\s+([A-Za-z\s]+)",  # DTH Recharge - Tata Sky
-            r"(?i)(?:payment|paid|transferred|sent)(?:\s+for)?\s+([A-Za-z\s]+(?:Bill|Invoice|Receipt|Statement|Dues|Fee|Fees))",  # payment for Electricity Bill
-            r"(?i)(?:payment|paid|transferred|sent)(?:\s+for)?\s+([A-Za-z\s]+)\s+(?:Bill|Invoice|Receipt|Dues|Fee|Fees)"  # payment for College Fees
-        ]
-        
-        for pattern in service_patterns:
-            match = re.search(pattern, sms)
-            if match:
-                service = match.group(1).strip()
-                # Check if there's a provider/company specified
-                if match.lastindex > 1 and match.group(2):
-                    provider = match.group(2).strip()
-                    service = f"{service} - {provider}"
-                
-                result = {"value": service, "confidence": 0.8, "error": None}
-                break
+        _, match = SERVICE_TIER.search(sms, features=features, plan=plan)
+        if match:
+            service = match.group(1).strip()
+            span = stripped_span(match, 1)
+            # Check if there's a provider/company specified
+            if match.lastindex > 1 and match.group(2):
+                provider = match.group(2).strip()
+                service = f"{service} - {provider}"
+                span = span[0], stripped_span(match, 2)[1]
+
+            result = {"value": service, "confidence": 0.8, "error": None, "span": span}
 
     # 5. Edge cases and mixed formats - combining merchant/person with UPI
     if not result["value"]:
-        edge_patterns = [
-            r"(?i)(?:to|2|sent to|paid to|payment to)\s+([^()]+)(?:\s*\(UPI ID:?\s*([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+)\))",  # to Name (UPI ID: user@bank)
-            r"(?i)(?:to|2|sent to|paid to|payment to)\s+([^()]+)(?:\s+via|through|using)\s+UPI",  # to Name via UPI
-            r"(?i)(?:to|2|sent to|paid to|payment to|for)\s+([A-Za-z\s]+(?:service|consultation|fee|invoice|subscription))",  # for Medical Consultation
-            r"(?i)(?:to|2|sent to|paid to|payment to)\s+([^()]+)(?:\s+-\s+([A-Za-z\s]+))",  # to XYZ Corp - Invoice #12345
-            r"(?i)(?:at|@)\s+([A-Za-z0-9\s]+)\s+(?:subscription|membership|recurring)"  # at NETFLIX subscription
-        ]
-        
-        for pattern in edge_patterns:
-            match = re.search(pattern, sms)
-            if match:
-                payee = match.group(1).strip()
-                
-                # Check if there's additional info to include
-                if match.lastindex > 1 and match.group(2):
-                    additional_info = match.group(2).strip()
-                    # For UPI ID in parentheses
-                    if '@' in additional_info:
-                        payee = f"{payee} ({additional_info})"
-                    else:
-                        payee = f"{payee} - {additional_info}"
-                
-                result = {"value": payee, "confidence": 0.75, "error": None}
-                break
+        _, match = EDGE_TIER.search(sms, features=features, plan=plan)
+        if match:
+            payee = match.group(1).strip()
+            span = stripped_span(match, 1)
+
+            # Check if there's additional info to include
+            if match.lastindex > 1 and match.group(2):
+                additional_info = match.group(2).strip()
+                # For UPI ID in parentheses
+                if '@' in additional_info:
+                    payee = f"{payee} ({additional_info})"
+                else:
+                    payee = f"{payee} - {additional_info}"
+                span = span[0], stripped_span(match, 2)[1]
+
+            result = {"value": payee, "confidence": 0.75, "error": None, "span": span}
 
     # 6. Bank and credit card related payments
     if not result["value"]:
-        bank_payment_patterns = [
-            r"(?i)(?:payment|paid)(?:\s+towards|\s+for)?\s+(?:your)?\s+([A-Za-z\s]+(?:Card|credit\s+card|loan|mortgage)(?:\s+Bill)?)",  # payment towards your Credit Card Bill
-            r"(?i)(?:payment|paid)(?:\s+towards|\s+for)?\s+(?:your)?\s+([A-Za-z\s]+(?:EMI|Loan\s+EMI|Dues|Statement))",  # payment towards your Home Loan EMI
-            r"(?i)(?:payment|paid)(?:\s+to)?\s+(?:your)?\s+([A-Za-z\s]+(?:Bank|Financial|Finance|Insurance)(?:\s+[A-Za-z\s]+)?)"  # payment to ICICI Home Finance
-        ]
-        
-        for pattern in bank_payment_patterns:
-            match = re.search(pattern, sms)
-            if match:
-                bank_payment = match.group(1).strip()
-                result = {"value": bank_payment, "confidence": 0.8, "error": None}
-                break
+        _, match = BANK_PAYMENT_TIER.search(sms, features=features, plan=plan)
+        if match:
+            bank_payment = match.group(1).strip()
+            result = {"value": bank_payment, "confidence": 0.8, "error": None, "span": stripped_span(match, 1)}
 
     # If payee is still not found, set the error
     if not result["value"]:
         result["error"] = "Payee not found"
-    
+    result.setdefault("bank", None)
+
     return result
 
-def extract_account_details(sms: str) -> tuple:
-    """Extract account details (from and to) from SMS message."""
-    account_from = {"value": None, "confidence": 0.0, "error": None}
-    account_to = {"value": None, "confidence": 0.0, "error": None}
-
-    # Enhanced account extraction patterns
-    account_patterns = [
-        r"(?:A\/C|A\/c|Acct|Card|account)?\s*(?:xx|x|XX|ending|[Ee]nding in)?\s*([xX\d]{4,})",
-        r"[Aa](?:\/)?[Cc](?:count)?\s*(?:\w+\s*)?(?:no\.?)?\s*(?:xx|x|XX)?\s*([xX\d]{4,})",
-        r"(?:acct|account|a\/c)[.\s]*(?:no\.?)?[.\s]*(?:xx|x|XX)?[.\s]*([xX\d]{4,})",
-        r"(?:xx|XX)(\d{4,})"
-    ]
-
-    # First look for accounts with explicit role indicators
-    from_account_match = re.search(r"(?i)from\s+(?:A\/C|A\/c|Acct|account)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})", sms)
-    if from_account_match:
-        account_from = {"value": from_account_match.group(1), "confidence": 0.95, "error": None}
-
-    # Enhanced patterns for "account to" detection
-    to_account_patterns = [
-        r"(?i)to\s+(?:.*?)\s*\((?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})\)",  # to Name (A/c XX1234)
-        r"(?i)to\s+(?:A\/C|A\/c|Acct|account)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})",  # to A/c XX1234
-        r"(?i)credited\s+to\s+(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})",  # credited to A/c XX1234
-        r"(?i)transferred\s+to\s+(?:.*?)\s+(?:\()?(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX|ending)?\s*([xX\d]{4,})(?:\))?",  # transferred to Name A/c XX1234
-        r"(?i)deposited\s+to\s+(?:your)?\s+(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX)?\s*([xX\d]{4,})",  # deposited to your A/c XX1234
-        r"(?i)beneficiary\s+(?:A\/C|A\/c|Acct|account)?\s*(?:no\.?)?\s*(?:xx|x|XX)?\s*([xX\d]{4,})",  # beneficiary A/c XX1234
-        r"(?i)to\s+(?:.*?)@(?:\w+)/([\d]{4,})",  # to name@bank/1234567890 (UPI format with embedded account)
-        r"(?i)UPI[- ]P2A[- ](?:.*?)(?:to|a/c|account)[- ](\d{4,})",  # UPI P2A transfer to 1234567890
-        r"(?i)UPI/([\d]{4,})/",  # UPI/1234567890/reference
-        r"(?i)to\s+(?:.*?)\s+via\s+IMPS\s+Ref:\s+(\d{4,})",  # to Name via IMPS Ref: 123456
-        r"(?i)to\s+(?:.*?)\s+using\s+NEFT\s+Ref:\s+(\d{4,})",  # to Name using NEFT Ref: 123456
-        r"(?i)to\s+(?:.*?)\s+via\s+RTGS\s+Ref:\s+(\d{4,})"  # to Name via RTGS Ref: 123456
-    ]
-
-    # Try each "to account" pattern
-    for pattern in to_account_patterns:
-        to_account_match = re.search(pattern, sms)
-        if to_account_match:
-            account_to = {"value": to_account_match.group(1), "confidence": 0.95, "error": None}
-            break
-
-    # If from_account not found yet, try to find a general account number based on transaction type
-    if not account_from["value"]:
-        for pattern in account_patterns:
-            account_match = re.search(pattern, sms)
-            if account_match:
-                account_number = account_match.group(1)
-                if re.search(r"(?i)\b(debited|spent|paid|sent|withdrawn|withdrawal|purchase|payment)\b", sms):
-                    account_from = {"value": account_number, "confidence": 0.8, "error": None}
-                break
-
-    # If to_account not found yet, try to find a general account number based on transaction type
-    if not account_to["value"]:
-        for pattern in account_patterns:
-            account_match = re.search(pattern, sms)
-            if account_match:
-                account_number = account_match.group(1)
-                if re.search(r"(?i)\b(credited|received|deposit|salary|credit|cash\s+in)\b", sms):
-                    account_to = {"value": account_number, "confidence": 0.8, "error": None}
-                break
+def extract_account_details(sms: str, features: int = None, tokens: list = None, plan: dict = None) -> tuple:
+    """Extract account details (from and to) from SMS message, with an optional sender plan.
+
+    The span of an account is that of the digits reported, "1234" in "XX1234".
+    """
+    if features is None:
+        features = scan_features(sms)
+    if tokens is None:
+        tokens = tokenize(sms)
+
+    from_value, from_confidence, to_value, to_confidence, from_span, to_span = resolve_accounts_with_spans(
+        sms, features, tokens, plan)
+    account_from = {"value": from_value, "confidence": from_confidence, "error": None, "span": from_span}
+    account_to = {"value": to_value, "confidence": to_confidence, "error": None, "span": to_span}
 
     # Set errors if not found
     if not account_from["value"]:
@@ -316,35 +389,223 @@ def extract_account_details(sms: str) -> tuple:
 
     return account_from, account_to
 
-def extract_transaction_details(sms: str) -> dict:
+# Longest SMS read, in characters of canonical text: ten concatenated parts. The rest
+# is dropped, which bounds the time the patterns can take (see audit.py).
+MAX_SMS_LENGTH = 1600
+
+# Seconds a caller may allow an SMS (the budget is off unless given). Once they are
+# spent, the fields not yet extracted are reported not found, with this error.
+TIME_BUDGET = 0.1
+BUDGET_ERROR = "Time budget exceeded"
+
+# The error of every field of an SMS whose extraction raised or crashed its worker (see batch.py)
+FAILURE_ERROR = "Extraction failed"
+
+def missing_field(field: str, error: str) -> dict:
+    """The result of a field that was not extracted, with the keys the field always has."""
+    result = {"value": None, "confidence": 0.0, "error": error, "span": None}
+    if field == "payee":
+        result["bank"] = None
+    return result
+
+# The fields of a result, in order
+FIELDS = ("amount", "date", "payee", "transaction_type", "account_from", "account_to", "bank")
+
+# Stands for a field of a TransactionDetails not yet extracted
+_PENDING = object()
+
+class TransactionDetails(dict):
+    """The result of extract_transaction_details: a dict whose fields are extracted on first use.
+
+    Reading a field (details["amount"], details.get("payee")) extracts that
+    field alone, and keeps it. Whatever reads every value (values(), items(),
+    ==, repr, json.dumps, copy, pickle) extracts the fields still missing
+    first, so to existing callers it is the dict it always was; it pickles as
+    a plain dict. The keys, their order, len() and "in" need no extraction.
+
+    The time budget counts the time spent extracting, whenever it is spent.
+    The fields are read from the canonical text; given the NormalizedSms it
+    came from, their spans are mapped back to the original SMS, and
+    text_span() gives the span in the canonical text.
+    """
+
+    __slots__ = ("_text", "_normalized", "_text_spans", "_body", "_tokens", "_features", "_now", "_plan",
+                 "_budget", "_spent")
+
+    def __init__(self, text: str, fields: tuple, now: datetime = None, plan: dict = None, budget: float = None,
+                 normalized: NormalizedSms = None):
+        super().__init__(dict.fromkeys(fields, _PENDING))
+        self._text = text
+        self._normalized = normalized
+        self._text_spans = {}
+        self._body = self._tokens = self._features = None
+        self._now = now
+        self._plan = plan
+        self._budget = budget
+        self._spent = 0.0
+
+    def _extract(self, field: str):
+        """Extract a pending field (both accounts together), and return its value."""
+        if self._budget is not None and self._spent > self._budget:
+            value = missing_field(field, BUDGET_ERROR)
+            self._store(field, value)
+            return value
+
+        start = time.perf_counter()
+        if field == "bank":
+            # Banks often sign their SMS in the trailer ("... Not you? Call 1800-SBI"), so
+            # the bank is read from the whole SMS
+            value = extract_bank(self._text)
+        else:
+            # Every other field is read without the trailer clauses, whose balances,
+            # helplines and subjects would pass for transaction details. The rest of
+            # the SMS is tokenised once for amount, type, relative dates and account
+            # roles, and its anchor words scanned once for the payee and account patterns.
+            if self._body is None:
+                self._body = crop_trailers(self._text)
+            body = self._body
+            if self._tokens is None and field != "payee":
+                self._tokens = tokenize(body)
+            if self._features is None and field in ("payee", "account_from", "account_to"):
+                self._features = scan_features(body)
+
+            if field == "amount":
+                value = extract_amount(body, self._tokens)
+            elif field == "date":
+                value = extract_date(body, self._tokens, self._now, self._plan)
+            elif field == "transaction_type":
+                value = extract_transaction_type(body, self._tokens)
+            elif field == "payee":
+                value = extract_payee(body, self._features, self._plan)
+            else:
+                account_from, account_to = extract_account_details(body, self._features, self._tokens, self._plan)
+                for name, account in (("account_from", account_from), ("account_to", account_to)):
+                    if name != field and dict.get(self, name, None) is _PENDING:
+                        self._store(name, account)
+                value = account_from if field == "account_from" else account_to
+        self._store(field, value)
+        self._spent += time.perf_counter() - start
+        return value
+
+    def _store(self, field: str, value: dict):
+        """Keep an extracted field, with its span mapped to the original SMS."""
+        span = value["span"]
+        self._text_spans[field] = span
+        if span is not None and self._normalized is not None:
+            value["span"] = self._normalized.original_span(*span)
+        dict.__setitem__(self, field, value)
+
+    def text_span(self, field: str) -> tuple:
+        """Return the span of a field in the canonical text, or None if it was not found."""
+        self[field]
+        return self._text_spans[field]
+
+    def _extract_all(self):
+        for field, value in dict.items(self):
+            if value is _PENDING:
+                self._extract(field)
+
+    def __getitem__(self, field):
+        value = dict.__getitem__(self, field)
+        return self._extract(field) if value is _PENDING else value
+
+    def get(self, field, default=None):
+        return self[field] if field in self else default
+
+    def __iter__(self):
+        # A dict built from this one (dict(details), {**details}) reads it through __getitem__
+        return dict.__iter__(self)
+
+    def values(self):
+        self._extract_all()
+        return dict.values(self)
+
+    def items(self):
+        self._extract_all()
+        return dict.items(self)
+
+    def pop(self, field, *default):
+        if field in self:
+            self[field]
+        return dict.pop(self, field, *default)
+
+    def popitem(self):
+        self._extract_all()
+        return dict.popitem(self)
+
+    def setdefault(self, field, default=None):
+        if field in self:
+            return self[field]
+        return dict.setdefault(self, field, default)
+
+    def update(self, *args, **kwargs):
+        self._extract_all()
+        dict.update(self, *args, **kwargs)
+
+    def copy(self) -> dict:
+        self._extract_all()
+        return dict(dict.items(self))
+
+    def __eq__(self, other):
+        self._extract_all()
+        if isinstance(other, TransactionDetails):
+            other._extract_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        self._extract_all()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+def extract_transaction_details(sms: str, now: datetime = None, sender: str = None,
+                                max_length: int = MAX_SMS_LENGTH, budget: float = None,
+                                fields: tuple = None) -> dict:
     """Extract transaction details from an SMS message.
-    
+
     Args:
         sms: The SMS message text to extract transaction details from.
-        
+        now: The reference time for relative dates such as "yesterday". Defaults
+            to the current time; a batch can fix it once so that every message
+            is read against the same day.
+        sender: The sender ID of the SMS, such as "AD-HDFCBK". A bank writes its
+            messages in a few fixed formats, so when sender plans are kept
+            (SENDER_PLANS.max_senders, see plans.py) the payee, account and
+            date patterns that matched its last messages are tried first. The
+            result is the same with or without it.
+        max_length: The number of characters read, after normalisation.
+        budget: The seconds the SMS may take (such as TIME_BUDGET), or None,
+            the default, for no limit. It is checked before each field, and
+            once spent every field not yet extracted is reported not found
+            with BUDGET_ERROR. It is wall-clock time, so under load the same
+            SMS can come out differently, and it cannot stop a pattern that is
+            already running; max_length is what bounds those.
+        fields: The fields wanted, out of FIELDS; all of them by default. A
+            caller that needs only ("amount", "transaction_type") skips the
+            payee, date and account patterns.
+
     Returns:
-        dict: A dictionary containing the extracted transaction details with their confidence scores.
+        dict: A dictionary containing the extracted transaction details with their confidence
+        scores. It is a TransactionDetails, which extracts each field the first time it is read.
     """
-    result = {
-        "amount": {"value": None, "confidence": 0.0, "error": None},
-        "date": {"value": None, "confidence": 0.0, "error": None},
-        "payee": {"value": None, "confidence": 0.0, "error": None},
-        "transaction_type": {"value": None, "confidence": 0.0, "error": None},
-        "account_from": {"value": None, "confidence": 0.0, "error": None},
-        "account_to": {"value": None, "confidence": 0.0, "error": None},
-        "bank": {"value": None, "confidence": 0.0, "error": None}
-    }
-    
-    # Extract each component using the helper functions
-    result["bank"] = extract_bank(sms)
-    result["amount"] = extract_amount(sms)
-    result["date"] = extract_date(sms)
-    result["transaction_type"] = extract_transaction_type(sms)
-    result["payee"] = extract_payee(sms)
-    
-    # Extract account details (returns a tuple of from and to)
-    account_from, account_to = extract_account_details(sms)
-    result["account_from"] = account_from
-    result["account_to"] = account_to
-    
-    return result
+    if fields is None:
+        fields = FIELDS
+    else:
+        for field in fields:
+            if field not in FIELDS:
+                raise ValueError(f"Unknown field '{field}'")
+
+    # The SMS is put into canonical form once (see normalizer.py); every field is read from that
+    start = time.perf_counter()
+    normalized = normalize_sms(sms)
+    plan = SENDER_PLANS.plan(sender) if sender else None
+    details = TransactionDetails(normalized.text[:max_length], fields, now, plan, budget, normalized)
+    details._spent = time.perf_counter() - start
+    return details
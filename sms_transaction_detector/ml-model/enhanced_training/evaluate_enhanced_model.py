@@ -17,6 +17,10 @@ import fallback_rules
 # Initialize colorama
 init()
 
+def spans_overlap(first, second):
+    """Check whether two (start, end) spans share at least one character."""
+    return first[0] < second[1] and second[0] < first[1]
+
 def evaluate_model_with_categories(model_path, test_data_by_category):
     """Evaluate model performance by category with more detailed metrics"""
     # Load the model
@@ -93,6 +97,7 @@ def evaluate_model_with_categories(model_path, test_data_by_category):
                 if entity_label in result_dict:
                     result_dict[entity_label]["value"] = ent.text
                     result_dict[entity_label]["confidence"] = 0.85
+                    result_dict[entity_label]["span"] = ent.start_char, ent.end_char
                     result_dict[entity_label]["source"] = "ml"
                     ml_found.add(entity_label)
             
@@ -117,19 +122,15 @@ def evaluate_model_with_categories(model_path, test_data_by_category):
                     category_results["extracted_with_fallback"][mapping] += 1
                     all_stats["extracted_with_fallback"][mapping] += 1
                     
-                    # Check if it's correct by matching the text
-                    fallback_text = result_dict[field]["value"]
+                    # Check if it's correct by where it was found
+                    fallback_span = result_dict[field]["span"]
                     
-                    # Look for a matching true entity based on text overlap
-                    # This is more lenient than exact match and better represents real use
+                    # Look for a true entity whose span overlaps it. The same text elsewhere
+                    # in the SMS (an amount that is the balance) does not count; "Rs.500"
+                    # for an annotated "500" does
                     found_match = False
                     for (start, end, label), true_text in true_entities_dict.items():
-                        if label == mapping and (
-                            fallback_text in true_text or 
-                            true_text in fallback_text or
-                            # For dates, allow flexible matching
-                            (mapping == "DATE" and any(x in y for x, y in [(fallback_text, true_text), (true_text, fallback_text)]))
-                        ):
+                        if label == mapping and spans_overlap(fallback_span, (start, end)):
                             category_results["correct_with_fallback"][mapping] += 1  
                             all_stats["correct_with_fallback"][mapping] += 1
                             found_match = True
@@ -1,17 +1,32 @@
+import os
+import sys
 import spacy
 
+# Add the parent directory to sys.path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.normalizer import normalize_sms
+from extractor.segmenter import crop_trailers
+
 # Load the trained model
 nlp = spacy.load('ml-model/ner_model')
 
+def extract_entity_spans(text):
+    """Find the entities of the given text with the trained NER model, as {label: (start, end)}.
+
+    The model reads the normalised SMS (see extractor/normalizer.py) without its
+    trailer clauses (see extractor/segmenter.py), which is a prefix of it; each
+    span is mapped back to the part of the original text the entity was found in.
+    """
+    normalized = normalize_sms(text)
+    doc = nlp(crop_trailers(normalized.text))
+    return {ent.label_: normalized.original_span(ent.start_char, ent.end_char) for ent in doc.ents}
+
 def extract_entities(text):
     """Extract entities from the given text using the trained NER model."""
-    doc = nlp(text)
-    entities = {}
-    for ent in doc.ents:
-        entities[ent.label_] = ent.text
-    return entities
+    return {label: text[start:end] for label, (start, end) in extract_entity_spans(text).items()}
 
 # Example usage
 if __name__ == '__main__':
     sample_sms = "Your account has been credited with $500 on 2025-04-05."
-    print(extract_entities(sample_sms))
\ No newline at end of file
+    print(extract_entities(sample_sms))
@@ -1,4 +1,75 @@
+import os
 import re
+import sys
+
+# Add the parent directory to sys.path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.patterns import register, register_family, stripped_span
+from extractor.lexicon import Lexicon
+from extractor.segmenter import crop_trailers
+from extractor.helpers.bank_helpers import BANK_MENTIONS, vpa_bank
+from extractor.features import (
+    scan_features, can_match, TO, AT, FROM, FOR, YOUR, CARD, CREDITED, PAID, CURRENCY, DIGIT
+)
+
+AMOUNT_PATTERNS = register_family("fallback.amount", [
+    r'Rs\.?\s*([0-9,]+\.?[0-9]*)', 
+    r'INR\s*([0-9,]+\.?[0-9]*)',
+    r'Rs\s*([0-9,]+\.?[0-9]*)',
+    r'debited with\s*Rs\.?\s*([0-9,]+\.?[0-9]*)',
+    r'([0-9,]+(?:\.[0-9]*)?)\s*(?:Rs\.?|INR)',
+    r'of\s*Rs\.?\s*([0-9,]+\.?[0-9]*)',
+    r'for\s*Rs\.?\s*([0-9,]+\.?[0-9]*)'
+], re.IGNORECASE)
+
+DATE_PATTERNS = register_family("fallback.date", [
+    r'(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})',  # DD-MM-YYYY, MM/DD/YYYY
+    r'(\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2})',    # YYYY-MM-DD
+    r'(\d{1,2}[-/\.][A-Za-z]{3,4}[-/\.]\d{2,4})',  # DD-MMM-YYYY
+    r'on\s+(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})',
+    r'on\s+(\d{1,2}[-/\.][A-Za-z]{3,4}[-/\.]\d{2,4})'
+], re.IGNORECASE)
+
+# The banks are found with the extractor's matcher, built from its alias table (see
+# bank_helpers.BANK_ALIASES); when several are named, the one listed first wins. A few
+# are reported by the names the fallback has always given them.
+BANK_NAMES = {"AXIS": "Axis", "YES": "Yes Bank", "KOTAK": "Kotak", "BOB": "Bank of Baroda"}
+
+TRANSACTION_PATTERNS = {
+    "CREDIT": register_family("fallback.type.credit", [r'credited', r'received', r'credit', r'salary', r'deposited', r'added'], re.IGNORECASE),
+    "DEBIT": register_family("fallback.type.debit", [r'debited', r'spent', r'paid', r'payment', r'purchase', r'debit', r'withdrawn'], re.IGNORECASE),
+    "TRANSFER": register_family("fallback.type.transfer", [r'transferred', r'transfer', r'sent', r'IMPS', r'NEFT', r'RTGS', r'UPI'], re.IGNORECASE)
+}
+# The same keywords as lowercase substrings, for the lexicon
+TRANSACTION_WORDS = {txn_type: tuple(pattern.pattern.lower() for pattern in patterns)
+                     for txn_type, patterns in TRANSACTION_PATTERNS.items()}
+
+# Each payee and account pattern is paired with the features it needs (see extractor/features.py)
+PAYEE_PATTERNS = register_family("fallback.payee", [
+    (r'to\s+([A-Za-z0-9\s\.\-\']+?)\s+(?:on|via|ref|from|a\/c)', (TO,)),
+    (r'at\s+([A-Z0-9\s\*\/\.\-]+?)(?:\s+on|\.|$)', (AT,)),
+    (r'for\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+on|\.|$)', (FOR,)),
+    (r'paid\s+to\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+|\.|\(|$)', (PAID, TO)),
+    (r'transferred\s+to\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+|\.|\(|$)', (TO,)),
+    (r'credited\s+from\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+|\.|\(|$)', (CREDITED, FROM))
+], re.IGNORECASE)
+
+# UPI ID pattern
+UPI_PATTERN = register("fallback.upi", r'([a-zA-Z0-9\.\-\_]+@[a-z]+)')
+
+ACCOUNT_PATTERNS = register_family("fallback.account", [
+    # From account patterns
+    (r'from\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_from", (FROM,)),
+    (r'from\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([Xx\*]+\d{1,4})', "account_from", (FROM,)),
+    (r'your\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_from", (YOUR,)),
+    (r'card\s+[\w\s\.\-\']+?\s*(X+\d+|x+\d+|\*+\d+)', "account_from", (CARD,)),
+    
+    # To account patterns
+    (r'to\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_to", (TO,)),
+    (r'to\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([Xx\*]+\d{1,4})', "account_to", (TO,)),
+    (r'credited\s+to\s+.{1,30}?\s*(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_to", (CREDITED, TO))
+], re.IGNORECASE)
 
 def apply_fallback_rules(sms_text, result):
     """
@@ -8,127 +79,85 @@ def apply_fallback_rules(sms_text, result):
     Args:
         sms_text (str): The SMS text to analyze
         result (dict): Dictionary containing entity extraction results to update
+
+    Each entity found is given a "span", the (start, end) in sms_text of the
+    text it was read from.
     """
+    # The bank may be signed in the trailer clauses; every other entity is read without
+    # them (see extractor/segmenter.py)
+    body = crop_trailers(sms_text)
+
+    # Anchor words are scanned once; patterns whose anchors are missing are skipped
+    features = scan_features(body)
+
     # Amount extraction - if not found by ML model
-    if not result["amount"]["value"]:
-        amount_patterns = [
-            r'Rs\.?\s*([0-9,]+\.?[0-9]*)', 
-            r'INR\s*([0-9,]+\.?[0-9]*)',
-            r'Rs\s*([0-9,]+\.?[0-9]*)',
-            r'debited with\s*Rs\.?\s*([0-9,]+\.?[0-9]*)',
-            r'([0-9,]+\.?[0-9]*)\s*(?:Rs\.?|INR)',
-            r'of\s*Rs\.?\s*([0-9,]+\.?[0-9]*)',
-            r'for\s*Rs\.?\s*([0-9,]+\.?[0-9]*)'
-        ]
-        for pattern in amount_patterns:
-            match = re.search(pattern, sms_text, re.IGNORECASE)
+    if not result["amount"]["value"] and features & CURRENCY:
+        for pattern in AMOUNT_PATTERNS:
+            match = pattern.search(body)
             if match:
                 result["amount"]["value"] = match.group(0).strip()
                 result["amount"]["confidence"] = 0.7
+                result["amount"]["span"] = stripped_span(match)
                 break
     
     # Date extraction - if not found by ML model
-    if not result["date"]["value"]:
-        date_patterns = [
-            r'(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})',  # DD-MM-YYYY, MM/DD/YYYY
-            r'(\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2})',    # YYYY-MM-DD
-            r'(\d{1,2}[-/\.][A-Za-z]{3,4}[-/\.]\d{2,4})',  # DD-MMM-YYYY
-            r'on\s+(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})',
-            r'on\s+(\d{1,2}[-/\.][A-Za-z]{3,4}[-/\.]\d{2,4})'
-        ]
-        for pattern in date_patterns:
-            match = re.search(pattern, sms_text, re.IGNORECASE)
+    if not result["date"]["value"] and features & DIGIT:
+        for pattern in DATE_PATTERNS:
+            match = pattern.search(body)
             if match:
-                if match.group(0).startswith('on '):
-                    result["date"]["value"] = match.group(1).strip()
-                else:
-                    result["date"]["value"] = match.group(0).strip()
+                group = 1 if match.group(0).startswith('on ') else 0
+                result["date"]["value"] = match.group(group).strip()
                 result["date"]["confidence"] = 0.65
+                result["date"]["span"] = stripped_span(match, group)
                 break
     
     # Bank extraction - if not found by ML model
     if not result["bank"]["value"]:
-        banks = {
-            "HDFC": ["HDFC", "HDFC Bank"],
-            "SBI": ["SBI", "State Bank", "State Bank of India"],
-            "ICICI": ["ICICI", "ICICI Bank"],
-            "Axis": ["Axis", "Axis Bank"],
-            "IDFC FIRST": ["IDFC", "IDFC FIRST", "IDFC Bank"],
-            "Yes Bank": ["Yes Bank"],
-            "Kotak": ["Kotak", "Kotak Bank", "Kotak Mahindra"],
-            "PNB": ["PNB", "Punjab National Bank"],
-            "Bank of Baroda": ["BOB", "Bank of Baroda"]
-        }
-        
-        for bank, keywords in banks.items():
-            for keyword in keywords:
-                if keyword in sms_text:
-                    result["bank"]["value"] = bank
-                    result["bank"]["confidence"] = 0.75
-                    break
-            if result["bank"]["value"]:
-                break
+        mention = BANK_MENTIONS.first_bank_mention(sms_text)
+        if mention:
+            bank, start, end = mention
+            result["bank"]["value"] = BANK_NAMES.get(bank, bank)
+            result["bank"]["confidence"] = 0.75
+            result["bank"]["span"] = start, end
     
     # Transaction type detection - if not found by ML model
     if not result["transaction_type"]["value"]:
-        transaction_patterns = {
-            "CREDIT": [r'credited', r'received', r'credit', r'salary', r'deposited', r'added'],
-            "DEBIT": [r'debited', r'spent', r'paid', r'payment', r'purchase', r'debit', r'withdrawn'],
-            "TRANSFER": [r'transferred', r'transfer', r'sent', r'IMPS', r'NEFT', r'RTGS', r'UPI']
-        }
-        
-        for txn_type, patterns in transaction_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, sms_text, re.IGNORECASE):
-                    result["transaction_type"]["value"] = txn_type
-                    result["transaction_type"]["confidence"] = 0.7
-                    break
-            if result["transaction_type"]["value"]:
+        lexicon = Lexicon(body)
+        for txn_type, patterns in TRANSACTION_PATTERNS.items():
+            if lexicon.contains(TRANSACTION_WORDS[txn_type], patterns):
+                result["transaction_type"]["value"] = txn_type
+                result["transaction_type"]["confidence"] = 0.7
+                # The first keyword of the type in the SMS
+                matches = [match for match in (pattern.search(body) for pattern in patterns) if match]
+                result["transaction_type"]["span"] = min((match.span() for match in matches), default=None)
                 break
     
     # Payee extraction - if not found by ML model
     if not result["payee"]["value"]:
-        payee_patterns = [
-            r'to\s+([A-Za-z0-9\s\.\-\']+?)\s+(?:on|via|ref|from|a\/c)',
-            r'at\s+([A-Z0-9\s\*\/\.\-]+?)(?:\s+on|\.|$)',
-            r'for\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+on|\.|$)',
-            r'paid\s+to\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+|\.|\(|$)',
-            r'transferred\s+to\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+|\.|\(|$)',
-            r'credited\s+from\s+([A-Za-z0-9\s\.\-\']+?)(?:\s+|\.|\(|$)'
-        ]
-        
-        for pattern in payee_patterns:
-            match = re.search(pattern, sms_text, re.IGNORECASE)
+        for pattern, needs in PAYEE_PATTERNS:
+            if not can_match(features, needs):
+                continue
+            match = pattern.search(body)
             if match:
                 result["payee"]["value"] = match.group(1).strip()
                 result["payee"]["confidence"] = 0.6
+                result["payee"]["span"] = stripped_span(match, 1)
                 break
         
         # UPI ID pattern
-        if not result["payee"]["value"] and "@" in sms_text:
-            upi_pattern = r'([a-zA-Z0-9\.\-\_]+@[a-z]+)'
-            match = re.search(upi_pattern, sms_text)
+        if not result["payee"]["value"] and "@" in body:
+            match = UPI_PATTERN.search(body)
             if match:
                 result["payee"]["value"] = match.group(1).strip()
                 result["payee"]["confidence"] = 0.55
+                result["payee"]["span"] = stripped_span(match, 1)
+                result["payee"]["bank"] = vpa_bank(result["payee"]["value"])
     
     # Account extraction - if not found by ML model
-    account_patterns = [
-        # From account patterns
-        (r'from\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_from"),
-        (r'from\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([Xx\*]+\d{1,4})', "account_from"),
-        (r'your\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_from"),
-        (r'card\s+[\w\s\.\-\']+?\s*(X+\d+|x+\d+|\*+\d+)', "account_from"),
-        
-        # To account patterns
-        (r'to\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_to"),
-        (r'to\s+(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([Xx\*]+\d{1,4})', "account_to"),
-        (r'credited\s+to\s+.{1,30}?\s*(?:a\/c|account|acc\.?|ac)(?:\s+no\.?)?\s*[:\.#]?\s*([\dXx\*]{4,})', "account_to")
-    ]
-    
-    for pattern, field in account_patterns:
-        if not result[field]["value"]:
-            match = re.search(pattern, sms_text, re.IGNORECASE)
+    for pattern, field, needs in ACCOUNT_PATTERNS:
+        if not result[field]["value"] and can_match(features, needs):
+            match = pattern.search(body)
             if match:
                 result[field]["value"] = match.group(1).strip()
-                result[field]["confidence"] = 0.65
\ No newline at end of file
+                result[field]["confidence"] = 0.65
+                result[field]["span"] = stripped_span(match, 1)
\ No newline at end of file
@@ -69,6 +69,7 @@ def extract_transaction_details(sms_text):
             if entity_label in result:
                 result[entity_label]["value"] = ent.text
                 result[entity_label]["confidence"] = 0.85
+                result[entity_label]["span"] = ent.start_char, ent.end_char
                 result[entity_label]["source"] = "ml"
                 ml_found.add(entity_label)
         
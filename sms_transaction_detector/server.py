@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from extractor.aio import AsyncExtractor, CONCURRENCY_LIMIT, MAX_BATCH, MAX_WAIT
+from extractor.batch import warm_up, MODELS
+from extractor.transaction_extractor import FIELDS
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Larger request bodies are refused with 413
+MAX_BODY = 4 * 1024 * 1024
+
+class InferenceServer(ThreadingHTTPServer):
+    """A local HTTP server for classification, extraction and NER.
+
+    Each request is handled in its own thread, which hands its SMS to an
+    AsyncExtractor on the server's event loop. Concurrent requests to the
+    classifier and the NER model are collected there into micro-batches of
+    at most max_batch SMS, waiting at most max_wait seconds for one to fill.
+    The models load in the background from start(); until they have, the
+    POST endpoints answer 503 and /readyz says what is still loading.
+    """
+
+    daemon_threads = True
+    # socketserver listens with a backlog of 5, which resets bursts of concurrent clients
+    request_queue_size = 1024
+
+    def __init__(self, address: tuple = (HOST, PORT), ner: bool = False, max_batch: int = MAX_BATCH,
+                 max_wait: float = MAX_WAIT, limit: int = CONCURRENCY_LIMIT, quiet: bool = False):
+        super().__init__(address, InferenceHandler)
+        self.ner = ner
+        self.quiet = quiet
+        self.ready = threading.Event()
+        self.load_error = None
+        self.extractor = AsyncExtractor(limit=limit, max_batch=max_batch, max_wait=max_wait)
+        self.loop = asyncio.new_event_loop()
+        self._background = [threading.Thread(target=self.loop.run_forever, name="server-loop", daemon=True),
+                            threading.Thread(target=self._load, name="server-load", daemon=True)]
+
+    def start(self):
+        """Start the event loop and load the models, without waiting for them."""
+        for thread in self._background:
+            thread.start()
+
+    def _load(self):
+        try:
+            warm_up(classifier=True, ner=self.ner)
+            if self.ner and "ner" not in MODELS:
+                raise RuntimeError("The NER model needs spaCy, which is not installed")
+        except Exception as error:
+            self.load_error = f"{type(error).__name__}: {error}"
+            return
+        self.ready.set()
+
+    def models(self) -> dict:
+        """Which models the server needs, and whether each is loaded."""
+        models = {"classifier": "classifier" in MODELS}
+        if self.ner:
+            models["ner"] = "ner" in MODELS
+        return models
+
+    def call(self, coroutine):
+        """Run a coroutine on the server's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def extract(self, text: str, sender: str, fields: tuple) -> dict:
+        details = self.extractor.extract(text, sender=sender, fields=fields)
+        if not self.ner:
+            return {"details": await details}
+        details, entities = await asyncio.gather(details, self.extractor.recognize(text))
+        return {"details": details, "entities": entities}
+
+    async def classify(self, text: str) -> dict:
+        return {"financial": await self.extractor.classify(text)}
+
+    async def batch(self, messages: list, fields: tuple) -> dict:
+        """Classify every SMS, then extract (and recognize) the financial ones, as the command line does."""
+        financial = await asyncio.gather(*(self.extractor.classify(text) for text, _ in messages))
+        results = await asyncio.gather(*(self.extract(text, sender, fields) if is_financial else _nothing()
+                                         for (text, sender), is_financial in zip(messages, financial)))
+        for result, is_financial in zip(results, financial):
+            result["financial"] = is_financial
+            result.setdefault("details", None)
+        return {"results": results}
+
+    def server_close(self):
+        super().server_close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.extractor.close()
+
+async def _nothing() -> dict:
+    return {}
+
+def _text(value, name: str = "text") -> str:
+    if not isinstance(value, str):
+        raise ValueError(f"'{name}' must be a string")
+    return value
+
+def _fields(value) -> tuple:
+    if value is None:
+        return None
+    if not isinstance(value, list) or any(field not in FIELDS for field in value):
+        raise ValueError(f"'fields' must be a list out of {', '.join(FIELDS)}")
+    return tuple(value)
+
+def _message(value) -> tuple:
+    """A /batch message, an SMS or {"text", "sender"}, as (text, sender)."""
+    if isinstance(value, dict):
+        sender = value.get("sender")
+        return _text(value.get("text")), None if sender is None else _text(sender, "sender")
+    return _text(value, "messages"), None
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    """GET /healthz and /readyz; POST /extract, /classify and /batch with a JSON body."""
+
+    server_version = "sms-transaction-detector"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/readyz":
+            ready = self.server.ready.is_set()
+            status = {"ready": ready, "models": self.server.models()}
+            if self.server.load_error:
+                status["error"] = self.server.load_error
+            self._send(200 if ready else 503, status)
+        else:
+            self._send(404, {"error": f"No such endpoint '{self.path}'"})
+
+    def do_POST(self):
+        routes = {"/extract": self._extract, "/classify": self._classify, "/batch": self._batch}
+        if self.path not in routes:
+            self._send(404, {"error": f"No such endpoint '{self.path}'"})
+            return
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self._send(411, {"error": "Content-Length is required"})
+            return
+        if int(length) > MAX_BODY:
+            self.close_connection = True
+            self._send(413, {"error": f"The body is larger than {MAX_BODY} bytes"})
+            return
+        body = self.rfile.read(int(length))
+        if not self.server.ready.is_set():
+            self._send(503, {"error": "The models are not loaded yet"})
+            return
+        try:
+            request = json.loads(body)
+            if not isinstance(request, dict):
+                raise ValueError("The body must be a JSON object")
+            result = routes[self.path](request)
+        except ValueError as error:
+            self._send(400, {"error": str(error)})
+            return
+        except Exception as error:
+            self._send(500, {"error": f"{type(error).__name__}: {error}"})
+            return
+        self._send(200, result)
+
+    def _extract(self, request: dict) -> dict:
+        sender = request.get("sender")
+        return self.server.call(self.server.extract(
+            _text(request.get("text")), None if sender is None else _text(sender, "sender"),
+            _fields(request.get("fields"))))
+
+    def _classify(self, request: dict) -> dict:
+        return self.server.call(self.server.classify(_text(request.get("text"))))
+
+    def _batch(self, request: dict) -> dict:
+        messages = request.get("messages")
+        if not isinstance(messages, list):
+            raise ValueError("'messages' must be a list")
+        return self.server.call(self.server.batch([_message(message) for message in messages],
+                                                  _fields(request.get("fields"))))
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sms_transaction_detector serve",
+        description="Serve classification and extraction over HTTP on this machine, batching concurrent requests.")
+    parser.add_argument("--host", default=HOST, help=f"address to listen on (default {HOST}, this machine only)")
+    parser.add_argument("--port", type=int, default=PORT, help=f"port to listen on (default {PORT})")
+    parser.add_argument("--ner", action="store_true", help="also run the spaCy NER model on /extract and /batch")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="most SMS a model sees in one batch")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT * 1000,
+                        help="most milliseconds a request waits for its batch to fill")
+    parser.add_argument("--limit", type=int, default=CONCURRENCY_LIMIT, help="most SMS processed at once")
+    parser.add_argument("--quiet", action="store_true", help="do not log every request to stderr")
+    args = parser.parse_args(argv)
+    if args.max_batch < 1 or args.limit < 1 or args.max_wait_ms < 0:
+        parser.error("--max-batch and --limit must be at least 1, and --max-wait-ms not negative")
+    if args.ner and not importlib.util.find_spec("spacy"):
+        parser.error("--ner needs spaCy, which is not installed")
+
+    server = InferenceServer((args.host, args.port), args.ner, args.max_batch, args.max_wait_ms / 1000,
+                             args.limit, args.quiet)
+    server.start()
+    print(f"Serving on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
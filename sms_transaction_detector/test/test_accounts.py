@@ -0,0 +1,38 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.transaction_extractor import extract_account_details
+from extractor.helpers.account_helpers import resolve_accounts, resolve_accounts_with_spans
+from extractor.features import scan_features
+from extractor.lexer import tokenize
+
+def resolve(sms):
+    return resolve_accounts_with_spans(sms, scan_features(sms), tokenize(sms))
+
+class TestAccountResolver(unittest.TestCase):
+
+    def test_explicit_roles(self):
+        sms = "Rs.500 transferred from A/c XX1234 to A/c XX5678"
+        self.assertEqual(resolve(sms), ("1234", 0.95, "5678", 0.95, (30, 34), (44, 48)))
+
+    def test_role_from_transaction_keyword(self):
+        self.assertEqual(resolve("A/c XX1234 debited by Rs.500"), ("1234", 0.8, None, 0.0, (6, 10), None))
+        self.assertEqual(resolve("A/c XX1234 credited with Rs.500"), (None, 0.0, "1234", 0.8, None, (6, 10)))
+        self.assertEqual(resolve("A/c XX1234 balance is Rs.500"), (None, 0.0, None, 0.0, None, None))
+
+    def test_without_spans(self):
+        sms = "Rs.500 transferred from A/c XX1234 to A/c XX5678"
+        self.assertEqual(resolve_accounts(sms, scan_features(sms), tokenize(sms)), ("1234", 0.95, "5678", 0.95))
+
+    def test_legacy_shape(self):
+        account_from, account_to = extract_account_details("A/c XX1234 debited by Rs.500")
+        self.assertEqual(account_from, {"value": "1234", "confidence": 0.8, "error": None, "span": (6, 10)})
+        self.assertEqual(account_to["error"], "Destination account not found")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from unittest import mock
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import aio
+from extractor.aio import AsyncExtractor, MicroBatcher
+from extractor.transaction_extractor import extract_transaction_details
+
+NOW = datetime(2025, 4, 10, 12, 0)
+FINANCIAL = "Sent Rs.73.00 From HDFC Bank A/C x2228 To Marvel On 04/04/25 Ref 509482752071"
+OTHER = "Your OTP for login is 234556. Valid for 10 minutes."
+
+class TestAio(unittest.TestCase):
+
+    def test_extract_and_classify(self):
+        async def main():
+            extractor = AsyncExtractor()
+            try:
+                details = await asyncio.gather(*(extractor.extract(sms, NOW) for sms in (FINANCIAL, OTHER)))
+                financial = await asyncio.gather(*(extractor.classify(sms) for sms in (FINANCIAL, OTHER)))
+                return details, financial, extractor._classifier.batches
+            finally:
+                extractor.close()
+
+        details, financial, batches = asyncio.run(main())
+        self.assertEqual(details, [extract_transaction_details(sms, NOW) for sms in (FINANCIAL, OTHER)])
+        self.assertEqual(financial, [True, False])
+        # Both went to the classifier together
+        self.assertEqual(batches, 1)
+
+    def test_coalescing(self):
+        sizes = []
+
+        def double(numbers):
+            sizes.append(len(numbers))
+            return [number * 2 for number in numbers]
+
+        async def main():
+            batcher = MicroBatcher(double, max_size=4, max_wait=0.01)
+            together = await asyncio.gather(*(batcher.submit(number) for number in range(10)))
+            alone = await batcher.submit(5)
+            return together, alone
+
+        self.assertEqual(asyncio.run(main()), ([number * 2 for number in range(10)], 10))
+        self.assertEqual(sizes, [4, 4, 2, 1])
+
+    def test_batch_error_reaches_every_caller(self):
+        def fail(numbers):
+            raise ValueError("no")
+
+        async def main():
+            batcher = MicroBatcher(fail)
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(error, ValueError) for error in asyncio.run(main())))
+
+    def test_concurrency_limit(self):
+        lock, running, most = threading.Lock(), [0], [0]
+
+        def slow(sms, *args):
+            with lock:
+                running[0] += 1
+                most[0] = max(most[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return {}
+
+        async def main():
+            extractor = AsyncExtractor(limit=2)
+            try:
+                await asyncio.gather(*(extractor.extract(FINANCIAL) for _ in range(10)))
+            finally:
+                extractor.close()
+
+        with mock.patch.object(aio, "_extract", slow):
+            asyncio.run(main())
+        self.assertLessEqual(most[0], 2)
+
+    def test_one_loop_at_a_time(self):
+        extractor = AsyncExtractor()
+        self.addCleanup(extractor.close)
+        first = asyncio.new_event_loop()
+        self.addCleanup(first.close)
+        first.run_until_complete(extractor.extract(FINANCIAL, NOW, fields=("amount",)))
+        with self.assertRaises(RuntimeError):
+            asyncio.run(extractor.extract(FINANCIAL, NOW, fields=("amount",)))
+        first.close()
+        self.assertEqual(asyncio.run(extractor.extract(FINANCIAL, NOW, fields=("amount",))),
+                         extract_transaction_details(FINANCIAL, NOW, fields=("amount",)))
+
+    def test_shared_extractor_across_loops(self):
+        for _ in range(2):
+            self.assertEqual(asyncio.run(aio.extract_transaction_details_async(FINANCIAL, NOW, fields=("amount",))),
+                             extract_transaction_details(FINANCIAL, NOW, fields=("amount",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
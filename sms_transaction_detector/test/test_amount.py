@@ -0,0 +1,35 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.helpers.amount_helpers import scan_money_mentions, to_paise
+
+class TestMoneyMentions(unittest.TestCase):
+
+    def test_roles_and_paise(self):
+        sms = "Your A/c XX1234 debited Rs.1,23,456.78 on 05-Apr. Avl Bal: Rs.987654.32"
+        mentions = scan_money_mentions(sms)
+        self.assertEqual([(m["role"], m["value"]) for m in mentions],
+                         [("transaction", 12345678), ("available_balance", 98765432)])
+        self.assertEqual(sms[mentions[0]["start"]:mentions[0]["end"]], "Rs.1,23,456.78")
+
+    def test_card_statement(self):
+        sms = "Card stmt: Total Amt Due Rs 12,500.00, Min Amt Due Rs 625/-. Credit Limit: INR 1,00,000"
+        self.assertEqual([(m["role"], m["value"]) for m in scan_money_mentions(sms)],
+                         [("total_due", 1250000), ("min_due", 62500), ("limit", 10000000)])
+
+    def test_rupee_sign_and_trailing_dash(self):
+        self.assertEqual([m["value"] for m in scan_money_mentions("Paid ₹250.5 for fee of 500/-")], [25050, 50000])
+        self.assertEqual(scan_money_mentions("5 hours 30 minutes"), [])
+
+    def test_to_paise(self):
+        self.assertEqual(to_paise("1,234"), 123400)
+        self.assertEqual(to_paise("0.05"), 5)
+        self.assertEqual(to_paise(".50"), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
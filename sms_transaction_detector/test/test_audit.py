@@ -0,0 +1,51 @@
+import unittest
+import re
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.audit import audit_pattern, generate_inputs, pattern_words, GROWTH_LIMIT
+from extractor.transaction_extractor import extract_transaction_details, BUDGET_ERROR
+
+SMS = "Rs.500 debited from A/c XX1234 on 05-04-2025 to ravi@okaxis"
+
+class TestAudit(unittest.TestCase):
+
+    def test_inputs_from_pattern_words(self):
+        pattern = re.compile(r"to\s+(?:.*?)\s*\(")
+        self.assertEqual(pattern_words(pattern), ["to"])
+        kinds = dict(generate_inputs(pattern, 20))
+        self.assertEqual(kinds["repeat 'to'"], "to to to to to to to")
+        self.assertTrue(all(len(text) == 20 for text in kinds.values()))
+        self.assertEqual(list(kinds), [kind for kind, _ in generate_inputs(pattern, 40)])
+
+    def test_backtracking_pattern_reported(self):
+        # The digits can be split between the two runs in every way before "Rs" is missed
+        exponent, _, kind, _ = audit_pattern(re.compile(r"([0-9,]+\.?[0-9]*)\s*(?:Rs\.?|INR)"), (64, 128))
+        self.assertGreater(exponent, GROWTH_LIMIT)
+        self.assertEqual(kind, "run '1'")
+
+    def test_linear_pattern_not_reported(self):
+        exponent, _, _, _ = audit_pattern(re.compile(r"Rs\.?\s*([0-9,]+)"), (64, 128))
+        self.assertLessEqual(exponent, GROWTH_LIMIT)
+
+class TestLimits(unittest.TestCase):
+
+    def test_spent_budget_gives_up(self):
+        result = extract_transaction_details(SMS, budget=0)
+        self.assertEqual(result["amount"]["error"], BUDGET_ERROR)
+        self.assertEqual(result["payee"], {"value": None, "confidence": 0.0, "error": BUDGET_ERROR, "span": None,
+                                           "bank": None})
+        self.assertEqual(extract_transaction_details(SMS, budget=None), extract_transaction_details(SMS))
+
+    def test_length_cap(self):
+        result = extract_transaction_details(SMS, max_length=30)
+        self.assertEqual(result["amount"]["value"], "500")
+        self.assertEqual(result["account_from"]["value"], "1234")
+        self.assertIsNone(result["date"]["value"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.helpers.bank_helpers import (
+    BankMatcher, find_bank_mentions, vpa_bank, match_bank_patterns, match_upi_or_account, KNOWN_BANK_CODES,
+    KNOWN_BANKS
+)
+from extractor.transaction_extractor import extract_bank, extract_payee, BANK_PATTERNS
+
+class TestBankMatcher(unittest.TestCase):
+
+    def test_mentions_with_offsets(self):
+        sms = "Rs.500 sent from State Bank of India to kotak mahindra a/c"
+        self.assertEqual(find_bank_mentions(sms), [("SBI", 17, 36), ("KOTAK", 40, 54)])
+
+    def test_mentions_are_whole_words(self):
+        self.assertEqual(find_bank_mentions("Paid yesterday at Citizens Cafe, Indiranagar"), [])
+        self.assertEqual(find_bank_mentions("Sent via HDFCBANK NetBanking"), [])
+        self.assertEqual(find_bank_mentions("Yes Bank a/c debited"), [("YES", 0, 8)])
+        # A code that is also a word only names the bank in capitals, or followed by "Bank"
+        self.assertEqual(find_bank_mentions("Paid yesterday at union square, Bob's treat"), [])
+        self.assertEqual(find_bank_mentions("UNION a/c and Federal Bank a/c"), [("UNION", 0, 5), ("FEDERAL", 14, 26)])
+        # The codes alone are still found inside a longer word
+        self.assertTrue(KNOWN_BANK_CODES.search("HDFCBANK"))
+
+    def test_longest_alias_wins(self):
+        matcher = BankMatcher("test.bank", {"IDFC": ["IDFC"], "IDFC FIRST": ["IDFC FIRST"]})
+        self.assertEqual(matcher.find_all("IDFC FIRST Bank"), [("IDFC FIRST", 0, 10)])
+
+    def test_first_listed_bank(self):
+        matcher = BankMatcher("test.bank_order", {"HDFC": ["HDFC"], "SBI": ["SBI", "State Bank"]})
+        self.assertEqual(matcher.first_bank("State Bank to HDFC"), "HDFC")
+        self.assertIsNone(matcher.first_bank("no bank here"))
+
+    def test_known_banks_as_list(self):
+        sms = "Sent Rs.73.00 From HDFC Bank A/C x2228"
+        matched = match_bank_patterns(sms, KNOWN_BANK_CODES, BANK_PATTERNS)
+        self.assertEqual(matched[:2], ("HDFC Bank", 0.9))
+        self.assertEqual(match_bank_patterns(sms, KNOWN_BANKS, BANK_PATTERNS), matched)
+        self.assertEqual(match_bank_patterns(sms, KNOWN_BANKS, [pattern.pattern for pattern in BANK_PATTERNS]), matched)
+
+class TestUpiHandles(unittest.TestCase):
+
+    def test_handle_lookup(self):
+        self.assertEqual(vpa_bank("ravi@okhdfcbank"), "HDFC")
+        self.assertEqual(vpa_bank("shop@PAYTM"), "PAYTM")
+        self.assertEqual(vpa_bank("ibl"), "ICICI")
+        self.assertEqual(vpa_bank("ravi@okicicix"), "ICICI")
+        self.assertIsNone(vpa_bank("ravi@upi"))
+
+    def test_handle_named_after_known_bank(self):
+        self.assertEqual(match_upi_or_account("Paid to shop@zeta", ["ZETA"], {})["value"], "ZETA")
+        self.assertEqual(match_upi_or_account("Paid to shop@okaxis", [], {})["value"], "AXIS")
+        self.assertIsNone(match_upi_or_account("Paid to shop@zeta", KNOWN_BANKS, {})["value"])
+
+    def test_bank_and_payee_from_handle(self):
+        sms = "UPI: ravi.k@oksbi debited Rs.350"
+        self.assertEqual(extract_bank(sms), {"value": "SBI", "confidence": 0.65, "error": None, "span": (12, 17)})
+        self.assertEqual(extract_payee(sms)["bank"], "SBI")
+        # Every payee has the key, so that results share one schema
+        self.assertIsNone(extract_payee("Rs.350 spent at SWIGGY")["bank"])
+
+
+if __name__ == "__main__":
+    unittest.main()
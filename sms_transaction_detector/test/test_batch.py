@@ -0,0 +1,81 @@
+import unittest
+import importlib
+import multiprocessing
+import sys
+import os
+from datetime import datetime
+from unittest import mock
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import batch
+from extractor.batch import extract_transaction_details_batch, ExtractionPool
+from extractor.transaction_extractor import extract_transaction_details, FAILURE_ERROR
+
+NOW = datetime(2025, 4, 10, 12, 0)
+MESSAGES = [f"Rs.{amount} debited from A/c XX1234 on 05/04/25 to ravi{amount}@okaxis" for amount in range(1, 41)]
+
+def extract_or_crash(sms, *args):
+    if sms == "crash":
+        os._exit(1)
+    if sms == "raise":
+        raise RuntimeError(sms)
+    return extract_transaction_details(sms, *args)
+
+class TestBatch(unittest.TestCase):
+
+    def test_through_the_package(self):
+        # As a user imports it, without the test sys.path entry for the package directory
+        directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = [os.path.dirname(directory)] + [entry for entry in sys.path if entry != directory]
+        with mock.patch.object(sys, "path", path):
+            package = importlib.import_module("sms_transaction_detector.extractor.batch")
+            self.assertEqual(package.CLASSIFIER_MODULE, "sms_transaction_detector.model.transaction_classifier")
+            results = package.extract_transaction_details_batch(MESSAGES, workers=2, chunksize=10, now=NOW)
+            self.assertEqual(results, [extract_transaction_details(sms, NOW) for sms in MESSAGES])
+            package.warm_up(classifier=True)
+            self.assertIn("classifier", package.MODELS)
+
+    def test_pool_kept_across_batches(self):
+        with ExtractionPool(workers=2, chunksize=4) as pool:
+            self.assertEqual(pool.extract(MESSAGES[:20], NOW), [extract_transaction_details(sms, NOW) for sms in MESSAGES[:20]])
+            workers = pool._pool
+            self.assertEqual(pool.extract(MESSAGES[20:], NOW), [extract_transaction_details(sms, NOW) for sms in MESSAGES[20:]])
+            self.assertIs(pool._pool, workers)
+        self.assertIsNone(pool._pool)
+
+    def test_results_in_input_order(self):
+        results = extract_transaction_details_batch(MESSAGES, workers=3, chunksize=4, now=NOW, classifier=False)
+        self.assertEqual(results, [extract_transaction_details(sms, NOW) for sms in MESSAGES])
+        self.assertEqual(extract_transaction_details_batch(MESSAGES, workers=1, now=NOW), results)
+
+    def test_thousands_of_chunks(self):
+        # More chunk starts than the pipe behind the started queue holds at once
+        messages = ["Your OTP is 1234"] * 6000
+        results = extract_transaction_details_batch(messages, workers=2, chunksize=1, now=NOW)
+        self.assertEqual(results, [extract_transaction_details(messages[0], NOW)] * 6000)
+
+    def test_selected_fields(self):
+        results = extract_transaction_details_batch(MESSAGES[:3], now=NOW, fields=("amount",))
+        self.assertEqual([result["amount"]["value"] for result in results], ["1", "2", "3"])
+        self.assertEqual(list(results[0]), ["amount"])
+        with self.assertRaises(ValueError):
+            extract_transaction_details_batch(MESSAGES, fields=("balance",))
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "workers are not forked")
+    def test_crash_loses_only_its_message(self):
+        messages = list(MESSAGES)
+        messages[6], messages[13], messages[29] = "crash", "raise", "crash"
+        with mock.patch.object(batch, "extract_transaction_details", extract_or_crash):
+            results = extract_transaction_details_batch(messages, workers=2, chunksize=4, now=NOW, classifier=False)
+        self.assertEqual(len(results), len(messages))
+        for index, (sms, result) in enumerate(zip(messages, results)):
+            if index in (6, 13, 29):
+                self.assertEqual(result["amount"]["error"], FAILURE_ERROR)
+            else:
+                self.assertEqual(result, extract_transaction_details(sms, NOW))
+
+
+if __name__ == "__main__":
+    unittest.main()
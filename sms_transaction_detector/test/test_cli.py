@@ -0,0 +1,71 @@
+import unittest
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import read_records, process, main, open_input, input_format
+from extractor.batch import ExtractionPool
+from extractor.transaction_extractor import extract_transaction_details
+
+NOW = datetime(2025, 4, 10, 12, 0)
+FINANCIAL = "Sent Rs.73.00 From HDFC Bank A/C x2228 To Marvel On 04/04/25 Ref 509482752071"
+OTHER = "Your OTP for login is 234556. Valid for 10 minutes."
+
+class TestCli(unittest.TestCase):
+
+    def test_read_jsonl_and_csv(self):
+        jsonl = io.StringIO(json.dumps(FINANCIAL) + "\n\n" + json.dumps({"text": OTHER, "id": 7}) + "\n{}\n")
+        records = list(read_records(jsonl, "jsonl"))
+        self.assertEqual([(record["line"], record["text"], record["id"]) for record in records],
+                         [(1, FINANCIAL, None), (3, OTHER, 7)])
+        rows = io.StringIO('id,sender,text\n1,AD-HDFCBK,"' + FINANCIAL + '"\n')
+        self.assertEqual(next(read_records(rows, "csv"))["sender"], "AD-HDFCBK")
+        jsonl = io.StringIO(json.dumps({"text": FINANCIAL, "sender": 7}) + "\n" + json.dumps({"text": FINANCIAL, "sender": ""}))
+        self.assertEqual([record["sender"] for record in read_records(jsonl, "jsonl")], ["7", None])
+        self.assertEqual(input_format("dump.csv.gz"), "csv")
+        self.assertEqual(input_format("-"), "jsonl")
+
+    def test_process(self):
+        records = [{"line": 1, "text": FINANCIAL, "sender": None, "id": None},
+                   {"line": 2, "text": OTHER, "sender": None, "id": "b"}]
+        results = list(process(records, now=NOW))
+        self.assertEqual(results[0]["details"], extract_transaction_details(FINANCIAL, NOW))
+        self.assertEqual(results[1], {"line": 2, "id": "b", "financial": False, "details": None})
+        results = list(process(records, fields=("amount",), only_financial=True, now=NOW))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(list(results[0]["details"]), ["amount"])
+
+    def test_one_pool_for_the_stream(self):
+        records = [{"line": line, "text": FINANCIAL, "sender": None, "id": None} for line in range(1, 41)]
+        with mock.patch.object(ExtractionPool, "_start", autospec=True, side_effect=ExtractionPool._start) as start:
+            results = list(process(records, workers=2, chunksize=2, fields=("amount",), now=NOW))
+        self.assertEqual(len(results), 40)
+        # Three windows (of 16 SMS), all on the same workers
+        self.assertEqual(start.call_count, 1)
+
+    def test_gzip_file_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dump.jsonl.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as dump:
+                for sms in (FINANCIAL, OTHER, FINANCIAL):
+                    dump.write(json.dumps({"text": sms}) + "\n")
+            with open_input(path) as stream:
+                self.assertEqual(len(list(read_records(stream, "jsonl"))), 3)
+            output = os.path.join(directory, "out.jsonl")
+            main([path, "-o", output, "--only-financial", "--fields", "amount,bank"])
+            with open(output, encoding="utf-8") as out:
+                results = [json.loads(line) for line in out]
+        self.assertEqual([result["line"] for result in results], [1, 3])
+        self.assertEqual(results[0]["details"]["amount"]["value"], "73.00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import importlib.util
+import sys
+import os
+from datetime import datetime
+from unittest import mock
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import columns as columns_module
+from extractor.columns import extract_transaction_columns, MISSING_AMOUNT, MISSING_CODE
+from extractor.transaction_extractor import extract_transaction_details
+
+NOW = datetime(2025, 4, 10, 12, 0)
+MESSAGES = [
+    "Rs.500 debited from A/c XX1234 on 05/04/25 to ravi@okaxis",
+    "INR 1,200.50 received from Priya Sharma in HDFC Bank A/c XX1234 yesterday",
+    "Your OTP is 123456",
+    "Rs.99 paid to ravi@okaxis",
+]
+
+class TestTransactionColumns(unittest.TestCase):
+
+    def test_same_as_details(self):
+        columns = extract_transaction_columns(MESSAGES, NOW)
+        self.assertEqual(len(columns), len(MESSAGES))
+        self.assertEqual(columns.values["amount"].tolist(), [50000, 120050, MISSING_AMOUNT, 9900])
+        self.assertEqual(columns.values["date"].astype(str).tolist(), ["2025-04-05", "2025-04-09", "NaT", "NaT"])
+        self.assertEqual(columns.values["transaction_type"].tolist(), [0, 1, MISSING_CODE, 0])
+        banks = columns.categories["bank"]
+        for index, sms in enumerate(MESSAGES):
+            details = extract_transaction_details(sms, NOW)
+            code = columns.values["bank"][index]
+            self.assertEqual(banks[code] if code != MISSING_CODE else None, details["bank"]["value"])
+            for field in ("payee", "account_from", "account_to"):
+                self.assertEqual(columns.values[field][index], details[field]["value"])
+            for field, result in details.items():
+                self.assertAlmostEqual(float(columns.confidences[field][index]), result["confidence"], places=6)
+
+    def test_bad_value_left_missing(self):
+        messages = ["Rs ,.50 debited from A/c XX1234", MESSAGES[0]]
+        columns = extract_transaction_columns(messages, NOW, fields=("amount",))
+        self.assertEqual(columns.values["amount"].tolist(), [50, 50000])
+        with mock.patch.object(columns_module, "to_paise", side_effect=[ValueError("bad"), 50000]):
+            columns = extract_transaction_columns(messages, NOW, fields=("amount",))
+        self.assertEqual(columns.values["amount"].tolist(), [MISSING_AMOUNT, 50000])
+        self.assertEqual(columns.confidences["amount"].tolist(), [0.0, 1.0])
+
+    def test_selected_fields(self):
+        columns = extract_transaction_columns(iter(MESSAGES), NOW, fields=("amount", "bank"))
+        self.assertEqual(list(columns.values), ["amount", "bank"])
+        self.assertEqual(columns.values["amount"].dtype, np.int64)
+        with self.assertRaises(ValueError):
+            extract_transaction_columns(MESSAGES, fields=("balance",))
+        with self.assertRaises(ValueError):
+            extract_transaction_columns(MESSAGES, output="csv")
+
+    @unittest.skipUnless(importlib.util.find_spec("pandas"), "pandas is not installed")
+    def test_pandas(self):
+        frame = extract_transaction_columns(MESSAGES, NOW, output="pandas")
+        self.assertEqual(len(frame), len(MESSAGES))
+        self.assertEqual(frame["amount"].isna().tolist(), [False, False, True, False])
+        self.assertEqual(frame["amount"].sum(), 50000 + 120050 + 9900)
+        self.assertEqual(frame["transaction_type"].tolist()[:2], ["debit", "credit"])
+        self.assertEqual(str(frame["date"][0].date()), "2025-04-05")
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_arrow(self):
+        table = extract_transaction_columns(MESSAGES, NOW, output="arrow")
+        self.assertEqual(table.num_rows, len(MESSAGES))
+        self.assertEqual(table.column("amount").null_count, 1)
+        self.assertEqual(table.column("transaction_type").to_pylist()[:2], ["debit", "credit"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.helpers.date_helpers import DATE_GATE, MONTH_NAME_PARTS, extract_date, parse_time, parse_date_with_custom_formats
+from extractor.transaction_extractor import DATE_GATE as FULL_DATE_GATE, extract_transaction_details
+
+class TestDateGrammar(unittest.TestCase):
+
+    def test_gate(self):
+        for sms in ("on 05-04-2025", "dated 5th April", "paid today", "2025-03-25:06:43:19"):
+            self.assertTrue(DATE_GATE.search(sms), sms)
+        self.assertIsNone(DATE_GATE.search("Rs.1,234.50 debited from A/c XX1234"))
+        self.assertIsNone(FULL_DATE_GATE.search("Rs.1,234.50 debited on 12 items"))
+        self.assertTrue(FULL_DATE_GATE.search("credited on April 5th, 2025"))
+
+    def test_dates(self):
+        self.assertEqual(extract_date("Rs.500 debited on 05-04-2025"), ("2025-04-05", 0.85))
+        self.assertEqual(extract_date("Rs.50 paid 2025-03-25:06:43:19"), ("2025-03-25", 0.9))
+        self.assertEqual(extract_date("Rs.1,234.50 debited from A/c XX1234"), (None, 0.0))
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time("10:30"), datetime.time(10, 30))
+        self.assertEqual(parse_time("10:30:15 PM"), datetime.time(22, 30, 15))
+        self.assertEqual(parse_time("12:05am"), datetime.time(0, 5))
+        for text in ("13:30 PM", "24:00", "10:75"):
+            with self.assertRaises(ValueError):
+                parse_time(text)
+
+class TestReferenceClock(unittest.TestCase):
+
+    def test_fixed_clock(self):
+        now = datetime.datetime(2025, 4, 6, 12, 0)
+        details = extract_transaction_details("Rs.500 paid yesterday", now=now)
+        self.assertEqual(details["date"]["value"], "2025-04-05")
+        self.assertEqual(extract_date("Rs.500 paid dated today", now), ("2025-04-06", 0.9))
+        # No year: the year of the reference day, unless that puts it more than a week ahead
+        self.assertEqual(extract_date("Rs.500 paid on 5th April", now), ("2025-04-05", 0.85))
+        self.assertEqual(extract_date("Rs.500 paid on 5th May", now), ("2024-05-05", 0.85))
+
+    def test_parse_cache(self):
+        now = datetime.datetime(2025, 4, 6, 12, 0)
+        first = parse_date_with_custom_formats("5th April", now)
+        self.assertIs(parse_date_with_custom_formats("5th April", now.replace(hour=18)), first)
+
+    def test_month_name_parts(self):
+        self.assertEqual(MONTH_NAME_PARTS["mar"], 3)
+        self.assertEqual(MONTH_NAME_PARTS["ju"], 6)
+        self.assertNotIn("marvel", MONTH_NAME_PARTS)
+
+
+if __name__ == "__main__":
+    unittest.main()
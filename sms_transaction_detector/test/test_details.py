@@ -0,0 +1,64 @@
+import unittest
+import json
+import pickle
+import sys
+import os
+from datetime import datetime
+from unittest import mock
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import transaction_extractor
+from extractor.transaction_extractor import extract_transaction_details, TransactionDetails, FIELDS
+
+NOW = datetime(2025, 4, 10, 12, 0)
+SMS = "Rs.500 debited from A/c XX1234 on 05-04-2025 to ravi@okaxis. Avl bal Rs.10,000"
+
+class TestTransactionDetails(unittest.TestCase):
+
+    def setUp(self):
+        self.expected = dict(extract_transaction_details(SMS, NOW).items())
+
+    def test_behaves_like_a_dict(self):
+        details = extract_transaction_details(SMS, NOW)
+        self.assertIsInstance(details, dict)
+        self.assertEqual(list(details), list(FIELDS))
+        self.assertEqual(details, self.expected)
+        self.assertEqual(json.loads(json.dumps(extract_transaction_details(SMS, NOW))), json.loads(json.dumps(self.expected)))
+        self.assertEqual(dict(extract_transaction_details(SMS, NOW)), self.expected)
+        self.assertEqual(pickle.loads(pickle.dumps(extract_transaction_details(SMS, NOW))), self.expected)
+        self.assertEqual(extract_transaction_details(SMS, NOW), extract_transaction_details(SMS, NOW))
+        self.assertEqual(details["amount"]["value"], "500")
+
+    def test_fields_extracted_on_first_use(self):
+        with mock.patch.object(transaction_extractor, "extract_payee", wraps=transaction_extractor.extract_payee) as payee:
+            details = extract_transaction_details(SMS, NOW)
+            self.assertEqual(details["amount"], self.expected["amount"])
+            self.assertEqual(payee.call_count, 0)
+            details.get("payee")
+            details["payee"]
+            self.assertEqual(payee.call_count, 1)
+
+    def test_selected_fields(self):
+        with mock.patch.object(transaction_extractor, "extract_payee") as payee, \
+             mock.patch.object(transaction_extractor, "extract_date") as date:
+            details = extract_transaction_details(SMS, NOW, fields=("amount", "transaction_type"))
+            self.assertEqual(details, {field: self.expected[field] for field in ("amount", "transaction_type")})
+            self.assertNotIn("payee", details)
+            self.assertIsNone(details.get("payee"))
+            payee.assert_not_called()
+            date.assert_not_called()
+        with self.assertRaises(ValueError):
+            extract_transaction_details(SMS, fields=("amount", "balance"))
+
+    def test_accounts_extracted_together(self):
+        details = extract_transaction_details(SMS, NOW, fields=("account_to", "account_from"))
+        self.assertEqual(details["account_to"], self.expected["account_to"])
+        self.assertEqual(details, {"account_to": self.expected["account_to"],
+                                   "account_from": self.expected["account_from"]})
+        self.assertIsInstance(details, TransactionDetails)
+
+
+if __name__ == "__main__":
+    unittest.main()
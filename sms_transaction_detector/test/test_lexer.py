@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.lexer import tokenize, first_token
+from extractor.lexicon import Lexicon
+from extractor.transaction_extractor import extract_amount, extract_transaction_type, DEBIT_WORDS, DEBIT_KEYWORDS
+from extractor.helpers.date_helpers import extract_transaction_context
+
+class TestLexer(unittest.TestCase):
+
+    def test_token_kinds_and_offsets(self):
+        sms = ("Rs.1,234.50 debited from A/c XX1234 to ravi@okaxis on 05-Apr-25 10:30 PM. "
+               "Ref No: 512345678901")
+        tokens = tokenize(sms)
+        self.assertEqual([(token.kind, token.value) for token in tokens], [
+            ("amount", "1234.50"), ("debit", "debited"), ("cue", "from"), ("account", "XX1234"),
+            ("cue", "to"), ("vpa", "ravi@okaxis"), ("date", "05-Apr-25"), ("time", "10:30 PM"),
+            ("ref", "512345678901"),
+        ])
+        for token in tokens:
+            if token.kind in ("account", "vpa", "date", "time"):
+                self.assertEqual(sms[token.start:token.end], token.value)
+
+    def test_vpa_does_not_hide_neighbouring_tokens(self):
+        tokens = tokenize("paid@ybl")
+        self.assertEqual([token.kind for token in tokens], ["debit", "vpa"])
+        self.assertEqual(first_token(tokens, "vpa").value, "paid@ybl")
+
+    def test_same_fields_as_patterns(self):
+        messages = [
+            "INR 500/- credited to your account",
+            "Your card ending 1234 was used at STORE",
+            "Your card ending 1234\nwas used at STORE",
+            "Amount of rs 45 transferred today",
+            "Rs. 99 refused on your card",
+            "No transaction here",
+        ]
+        for sms in messages:
+            tokens = tokenize(sms)
+            self.assertEqual(extract_amount(sms, tokens), extract_amount(sms))
+            self.assertEqual(extract_transaction_type(sms, tokens), extract_transaction_type(sms))
+
+class TestLexicon(unittest.TestCase):
+
+    def test_whole_words_only(self):
+        self.assertTrue(Lexicon("Rs.500 DEBITED from a/c").has_word(DEBIT_WORDS, DEBIT_KEYWORDS))
+        self.assertFalse(Lexicon("Rs.500 undebited_x").has_word(DEBIT_WORDS, DEBIT_KEYWORDS))
+
+    def test_non_ascii_uses_the_pattern(self):
+        # "ſ" matches "s" case-insensitively, but does not lowercase to it
+        self.assertEqual(extract_transaction_type("Rs.500 ſent")["value"], "debit")
+
+    def test_context(self):
+        context = extract_transaction_context("Electricity bill paid, Ref: 12345")
+        self.assertEqual(context, {"is_service_payment": True, "contains_reference": True,
+                                   "contains_bill": True, "contains_subscription": False})
+        self.assertFalse(extract_transaction_context("bill paid. Ref: ___")["contains_reference"])
+
+
+if __name__ == "__main__":
+    unittest.main()
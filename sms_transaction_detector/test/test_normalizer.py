@@ -0,0 +1,36 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.normalizer import normalize_sms
+from extractor.transaction_extractor import extract_transaction_details
+
+class TestNormalizer(unittest.TestCase):
+
+    def test_canonical_form(self):
+        sms = "₹1,200  debited from a/c XX12​34\n  on 05-04-2025 (INR 5 fee)"
+        self.assertEqual(normalize_sms(sms).text, "Rs1,200 debited from A/c XX1234\non 05-04-2025 (Rs 5 fee)")
+
+    def test_offsets_map_back(self):
+        sms = "Acct XX12​34 ＲＳ 40"
+        normalized = normalize_sms(sms)
+        for word in ("XX1234", "40"):
+            start = normalized.text.index(word)
+            start, end = normalized.original_span(start, start + len(word))
+            self.assertEqual(sms[start:end].replace("​", ""), word)
+
+    def test_clean_sms_is_unchanged(self):
+        sms = "Rs.500 debited from A/c XX1234 on 05-04-2025"
+        normalized = normalize_sms(sms)
+        self.assertIs(normalized.text, sms)
+        self.assertEqual(normalized.original_span(3, 6), (3, 6))
+
+    def test_rupee_sign_amount(self):
+        self.assertEqual(extract_transaction_details("₹1,200 debited from A/c XX1234")["amount"]["value"], "1200")
+
+
+if __name__ == "__main__":
+    unittest.main()
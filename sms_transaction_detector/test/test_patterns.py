@@ -0,0 +1,85 @@
+import unittest
+import re
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extractor.transaction_extractor
+from extractor.patterns import register, register_family, register_tier, get_pattern, get_family
+from extractor.features import scan_features, can_match, ALL, TO, AT, AT_SIGN, PAID, MASKED
+
+class TestPatternRegistry(unittest.TestCase):
+
+    def test_extractor_patterns_are_precompiled(self):
+        # Importing the extractor registers every pattern it uses
+        for name in ["bank.name.0", "amount.currency", "payee.merchant.0", "payee.bank_payment.2",
+                     "account.to.11", "accounts.from.0", "date.full.0", "date.custom.9"]:
+            self.assertIsInstance(get_pattern(name), re.Pattern)
+
+    def test_family_keeps_order_and_extras(self):
+        family = register_family("test.family", [(r"a", "first"), (r"b", "second")], re.IGNORECASE)
+        self.assertEqual([extra for _, extra in family], ["first", "second"])
+        self.assertEqual([name for name, _ in get_family("test.family")], ["test.family.0", "test.family.1"])
+        self.assertTrue(family[0][0].flags & re.IGNORECASE)
+
+    def test_conflicting_registration(self):
+        register("test.conflict", r"abc")
+        register("test.conflict", r"abc")
+        with self.assertRaises(ValueError):
+            register("test.conflict", r"abd")
+
+class TestPatternTier(unittest.TestCase):
+
+    def setUp(self):
+        self.patterns = [r"(?i)paid\s+to\s+(\w+)", r"(?i)at\s+(\w+)", r"(?i)to\s+(\w+)"]
+        self.tier = register_tier("test.tier", self.patterns)
+
+    def test_matches_pattern_order_not_position(self):
+        # "at" matches further left, but "paid to" comes first in the tier
+        sms = "Spent at SHOP then paid to RAVI"
+        index, match = self.tier.search(sms)
+        self.assertEqual((index, match.group(1)), (0, "RAVI"))
+
+    def test_same_result_as_sequential_search(self):
+        messages = ["Rs.10 to ANU at CAFE", "at CAFE", "sent to RAVI", "nothing here", ""]
+        for sms in messages:
+            expected = next(((i, re.search(p, sms).group(1)) for i, p in enumerate(self.patterns)
+                             if re.search(p, sms)), (None, None))
+            index, match = self.tier.search(sms)
+            self.assertEqual((index, match.group(1) if match else None), expected)
+
+    def test_rejected_match_falls_through_to_next_pattern(self):
+        index, match = self.tier.search("paid to the shop at CAFE", accept=lambda m: m.group(1) != "the")
+        self.assertEqual((index, match.group(1)), (1, "CAFE"))
+
+    def test_patterns_without_their_features_are_skipped(self):
+        tier = register_tier("test.tier.needs", [(pattern, needs) for pattern, needs in
+                                                 zip(self.patterns, [(PAID, TO), (AT,), (TO,)])])
+        sms = "Spent at SHOP then paid to RAVI"
+        self.assertEqual(tier.search(sms, features=scan_features(sms))[0], 0)
+        # Without the "paid" feature the first pattern is not tried at all
+        self.assertEqual(tier.search(sms, features=AT | TO)[0], 1)
+        self.assertEqual(tier.search(sms, features=0), (None, None))
+
+class TestFeatures(unittest.TestCase):
+
+    def test_scan_sets_anchor_bits(self):
+        features = scan_features("Rs.500 paid to ravi@okaxis from A/c XX1234")
+        for feature in (PAID, TO, AT_SIGN, MASKED):
+            self.assertTrue(features & feature)
+        self.assertFalse(scan_features("hello") & (PAID | TO | MASKED))
+
+    def test_non_ascii_gets_every_feature(self):
+        # Case-insensitive patterns match "ſ" as "s", which str.lower() does not fold
+        self.assertEqual(scan_features("Rs.500 ſent"), ALL)
+
+    def test_can_match_needs_every_clause(self):
+        self.assertTrue(can_match(TO, ()))
+        self.assertTrue(can_match(TO, (TO | AT,)))
+        self.assertFalse(can_match(TO, (TO, AT)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import time
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.pipeline import Pipeline, Stage, SKIP, sms_pipeline
+from extractor.transaction_extractor import extract_transaction_details
+
+NOW = datetime(2025, 4, 10, 12, 0)
+
+def square(number):
+    return number * number
+
+def slow_square(number):
+    time.sleep(0.05)
+    return number * number
+
+def odd_only(number):
+    return number if number % 2 else SKIP
+
+def fail_on_seven(number):
+    if number == 7:
+        raise ValueError("seven")
+    return number
+
+class TestPipeline(unittest.TestCase):
+
+    def test_stages_in_order(self):
+        pipeline = Pipeline([Stage("odd", odd_only, workers=3, batch_size=4),
+                             Stage("square", square, workers=2, kind="process", batch_size=8)], queue_size=4)
+        self.assertEqual(list(pipeline.run(range(100))), [number * number for number in range(1, 100, 2)])
+        stats = pipeline.stats()["stages"]
+        self.assertEqual((stats["odd"]["processed"], stats["odd"]["skipped"]), (100, 50))
+        self.assertEqual(stats["square"]["processed"], 50)
+        self.assertEqual(stats["square"]["kind"], "process")
+
+    def test_skip_from_process_stage(self):
+        pipeline = Pipeline([Stage("odd", odd_only, workers=2, kind="process", batch_size=4)])
+        self.assertEqual(list(pipeline.run(range(20))), list(range(1, 20, 2)))
+        self.assertEqual(pipeline.stats()["stages"]["odd"]["skipped"], 10)
+
+    def test_source_failure_after_its_items(self):
+        def source():
+            yield from range(5)
+            raise ValueError("source")
+
+        seen = []
+        with self.assertRaises(ValueError):
+            # The failure passes the slow stage untouched, ahead of the items
+            for number in Pipeline([Stage("square", slow_square, workers=3)]).run(source()):
+                seen.append(number)
+        self.assertEqual(seen, [number * number for number in range(5)])
+
+    def test_batched_stage(self):
+        sizes = []
+
+        def squares(numbers):
+            sizes.append(len(numbers))
+            return [number * number for number in numbers]
+
+        pipeline = Pipeline([Stage("squares", squares, batch_size=10, batched=True)], ordered=False)
+        self.assertEqual(sorted(pipeline.run(range(30))), [number * number for number in range(30)])
+        self.assertLessEqual(max(sizes), 10)
+
+    def test_backpressure(self):
+        produced = []
+
+        def source():
+            for number in range(200):
+                produced.append(number)
+                yield number
+
+        pipeline = Pipeline([Stage("square", square)], queue_size=2, max_in_flight=5)
+        for consumed, _ in enumerate(pipeline.run(source()), 1):
+            # The source may have made one more, waiting for a slot
+            self.assertLessEqual(len(produced) - consumed, 5 + 1)
+        self.assertEqual(len(produced), 200)
+
+    def test_failure_raised_in_turn(self):
+        seen = []
+        with self.assertRaises(ValueError):
+            for number in Pipeline([Stage("check", fail_on_seven, workers=2)]).run(range(20)):
+                seen.append(number)
+        self.assertEqual(seen, list(range(7)))
+
+    def test_sms_pipeline(self):
+        messages = ["Sent Rs.73.00 From HDFC Bank A/C x2228 To Marvel On 04/04/25 Ref 509482752071",
+                    "Your OTP for login is 234556. Valid for 10 minutes.",
+                    "Rs.652 spent on HDFC Bank Card x1135 at PAY*Flipkart Internet on 2025-03-25:06:43:19"]
+        pipeline = sms_pipeline(extract_workers=2, only_financial=True, now=NOW, batch_size=2)
+        records = list(pipeline.run({"text": sms} for sms in messages))
+        self.assertEqual([record["text"] for record in records], [messages[0], messages[2]])
+        for record in records:
+            self.assertEqual(record["details"], extract_transaction_details(record["text"], NOW))
+        self.assertEqual(pipeline.stats()["stages"]["classify"]["skipped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
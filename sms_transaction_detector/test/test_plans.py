@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.plans import SenderPlans, SENDER_PLANS, MAX_SENDERS, sender_key
+from extractor.transaction_extractor import extract_transaction_details, MERCHANT_TIER, PERSON_TIER, DATE_TIER
+
+NOW = datetime(2025, 4, 10, 12, 0)
+
+# Formats from one sender, where the date patterns that win differ
+MESSAGES = [
+    "Rs.500 sent to RAVI KUMAR via IMPS on 05-Apr-25. Ref 512345678901",
+    "INR 1,200.00 received from Priya Sharma on 5 April 2025 in A/c XX1234",
+    "Rs.75 sent to ANIL GUPTA via IMPS on 06-Apr-25. Ref 512345678902",
+    "Rs.99 paid at STORE on 2025-04-07",
+]
+
+class TestSenderPlans(unittest.TestCase):
+
+    def setUp(self):
+        SENDER_PLANS.clear()
+        SENDER_PLANS.max_senders = MAX_SENDERS
+
+    def tearDown(self):
+        SENDER_PLANS.max_senders = 0
+        SENDER_PLANS.clear()
+
+    def test_sender_key(self):
+        self.assertEqual(sender_key("AD-HDFCBK"), "HDFCBK")
+        self.assertEqual(sender_key("vm-hdfcbk-s"), "HDFCBK")
+        self.assertEqual(sender_key("HDFCBK"), "HDFCBK")
+
+    def test_least_recent_sender_dropped(self):
+        plans = SenderPlans(max_senders=2)
+        plans.plan("AD-HDFCBK")["x"] = 1
+        plans.plan("AD-SBIINB")
+        plans.plan("JD-HDFCBK")
+        plans.plan("AD-ICICIB")
+        self.assertEqual(len(plans), 2)
+        self.assertEqual(plans.plan("HDFCBK"), {"x": 1})
+        self.assertEqual((plans.hits, plans.misses), (2, 3))
+
+    def test_off_unless_asked_for(self):
+        self.assertIsNone(SenderPlans(max_senders=0).plan("AD-HDFCBK"))
+
+    def test_shared_between_threads(self):
+        class SlowPlans(OrderedDict):
+            # Let the other threads run between looking a sender up and moving it to the end
+            def get(self, key):
+                plan = super().get(key)
+                time.sleep(0.0001)
+                return plan
+
+        plans, errors = SenderPlans(max_senders=4), []
+        plans._plans = SlowPlans()
+
+        def run():
+            try:
+                for index in range(200):
+                    plans.plan(f"AD-S{index % 9}")
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(plans), 4)
+        self.assertEqual(plans.hits + plans.misses, 1600)
+
+    def test_same_result_with_sender(self):
+        for _ in range(2):
+            for sms in MESSAGES:
+                self.assertEqual(extract_transaction_details(sms, NOW, sender="AD-HDFCBK"),
+                                 extract_transaction_details(sms, NOW))
+        plan = SENDER_PLANS.plan("HDFCBK")
+        self.assertIn(MERCHANT_TIER.name, plan)
+        self.assertIn(DATE_TIER.name, plan)
+
+    def test_plan_is_only_a_guess(self):
+        # A wrong guess must not change which pattern wins
+        for hint in range(len(DATE_TIER.patterns)):
+            plan = {DATE_TIER.name: hint}
+            for sms in MESSAGES:
+                self.assertEqual(DATE_TIER.search(sms, plan=plan)[0], DATE_TIER.search(sms)[0])
+            plan = {PERSON_TIER.name: hint % len(PERSON_TIER.patterns)}
+            for sms in MESSAGES:
+                self.assertEqual(PERSON_TIER.search(sms, plan=plan)[0], PERSON_TIER.search(sms)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
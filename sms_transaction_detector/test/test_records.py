@@ -0,0 +1,60 @@
+import unittest
+import pickle
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.records import (
+    TransactionRecord, FieldResult, PayeeResult, extract_transaction_record, error_code,
+    OK, DATE_NOT_FOUND, OUT_OF_TIME
+)
+from extractor.transaction_extractor import extract_transaction_details
+
+NOW = datetime(2025, 4, 10, 12, 0)
+MESSAGES = [
+    "Rs.500 debited from A/c XX1234 on 05-04-2025 to ravi@okaxis",
+    "INR 1,200.00 received from Priya Sharma in A/c XX1234",
+    "Your OTP is 123456",
+]
+
+class TestTransactionRecord(unittest.TestCase):
+
+    def test_same_as_dict(self):
+        for sms in MESSAGES:
+            details = extract_transaction_details(sms, NOW)
+            record = extract_transaction_record(sms, NOW)
+            self.assertEqual(record.to_dict(), details)
+            self.assertEqual(TransactionRecord.from_dict(details), record)
+            self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_fields(self):
+        record = extract_transaction_record(MESSAGES[0], NOW)
+        self.assertEqual(record.amount.value, "500")
+        self.assertEqual(record.amount.code, OK)
+        self.assertIsNone(record.amount.error)
+        self.assertIsInstance(record.payee, PayeeResult)
+        self.assertEqual(record.payee.bank, "AXIS")
+
+        record = extract_transaction_record(MESSAGES[1], NOW)
+        self.assertEqual(record.date.code, DATE_NOT_FOUND)
+        self.assertEqual(record.date.error, "Date not found")
+        self.assertIsNone(record.payee.bank)
+        with self.assertRaises(AttributeError):
+            record.balance = FieldResult()
+
+    def test_selected_fields_and_budget(self):
+        record = extract_transaction_record(MESSAGES[0], NOW, fields=("amount",), budget=None)
+        self.assertIsNone(record.payee)
+        self.assertEqual(list(record.to_dict()), ["amount"])
+        self.assertEqual(extract_transaction_record(MESSAGES[0], NOW, budget=0).amount.code, OUT_OF_TIME)
+
+    def test_unknown_error(self):
+        with self.assertRaises(ValueError):
+            error_code("Something else")
+
+
+if __name__ == "__main__":
+    unittest.main()
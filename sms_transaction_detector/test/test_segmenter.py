@@ -0,0 +1,49 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.segmenter import crop_trailers
+from extractor.transaction_extractor import extract_transaction_details
+
+NOW = datetime(2025, 4, 10, 12, 0)
+
+class TestSegmenter(unittest.TestCase):
+
+    def test_trailers_dropped(self):
+        body = "Rs.500 debited from A/c XX1234 on 05-Apr-25 to ravi@okaxis."
+        for trailer in (" Avl bal Rs.10,000.00. Not you? Call 18001234567",
+                        " Dispute? Call 18001234567 within 7 days",
+                        "\nSubject: APR-25 SALARY",
+                        " Available balance: INR 1,24,876.34"):
+            self.assertEqual(crop_trailers(body + trailer), body)
+
+    def test_clauses_kept(self):
+        for sms in ("Sent Rs.20 to Dr. Smith. Ref No. 1234.",
+                    "Rs.500 received. Balance: Rs.245.00 debited from A/c XX1234.",
+                    "Avl bal: Rs.100. Rs.50 sent to ravi@okaxis."):
+            self.assertEqual(crop_trailers(sms), sms)
+
+    def test_first_clause_kept(self):
+        self.assertEqual(crop_trailers("Not you? Call 18001234567"), "Not you?")
+
+    def test_result_is_a_prefix(self):
+        sms = "Rs.500 debited.\nAvl bal Rs.10.\nNot you? Call 1800"
+        self.assertTrue(sms.startswith(crop_trailers(sms)))
+
+    def test_trailer_not_read_as_fields(self):
+        result = extract_transaction_details(
+            "Cash Withdrawal of Rs.2,000.00 at ATM BG ROAD on 02.04.2025. Avl bal: Rs.45,320.78. "
+            "Need help? Call us at 18002022 - SBI Bank", NOW)
+        self.assertEqual(result["amount"]["value"], "2000.00")
+        self.assertNotEqual(result["account_from"]["value"], "18002022")
+        self.assertNotEqual(result["payee"]["value"], "18002022")
+        # The bank is still read from the signature in the trailer
+        self.assertEqual(result["bank"]["value"], "SBI Bank")
+
+
+if __name__ == "__main__":
+    unittest.main()
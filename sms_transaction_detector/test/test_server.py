@@ -0,0 +1,83 @@
+import unittest
+import importlib.util
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import InferenceServer
+from extractor.batch import recognize_entities
+from extractor.transaction_extractor import extract_transaction_details
+
+FINANCIAL = "Sent Rs.73.00 From HDFC Bank A/C x2228 To Marvel On 04/04/25 Ref 509482752071"
+OTHER = "Your OTP for login is 234556. Valid for 10 minutes."
+FIELDS = ["amount", "bank", "transaction_type"]
+
+def plain(value):
+    """What a value reads as after a trip through JSON (spans become lists)."""
+    return json.loads(json.dumps(value))
+
+class TestServer(unittest.TestCase):
+
+    def start(self, **options) -> InferenceServer:
+        server = InferenceServer(("127.0.0.1", 0), quiet=True, **options)
+        server.start()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.assertTrue(server.ready.wait(30), server.load_error)
+        return server
+
+    def request(self, server: InferenceServer, path: str, payload=None) -> tuple:
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        url = f"http://127.0.0.1:{server.server_port}{path}"
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data), timeout=30) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    def test_endpoints(self):
+        server = self.start()
+        self.assertEqual(self.request(server, "/healthz"), (200, {"status": "ok"}))
+        self.assertEqual(self.request(server, "/readyz"), (200, {"ready": True, "models": {"classifier": True}}))
+        status, result = self.request(server, "/extract", {"text": FINANCIAL, "fields": FIELDS})
+        self.assertEqual(status, 200)
+        self.assertEqual(result, {"details": plain(extract_transaction_details(FINANCIAL, fields=tuple(FIELDS)))})
+        self.assertEqual(self.request(server, "/classify", {"text": OTHER}), (200, {"financial": False}))
+        status, result = self.request(server, "/batch", {"messages": [FINANCIAL, {"text": OTHER}], "fields": FIELDS})
+        self.assertEqual(status, 200)
+        self.assertEqual([(item["financial"], item["details"] is None) for item in result["results"]],
+                         [(True, False), (False, True)])
+
+    def test_bad_requests(self):
+        server = self.start()
+        self.assertEqual(self.request(server, "/extract", {"text": 7})[0], 400)
+        self.assertEqual(self.request(server, "/extract", {"text": FINANCIAL, "fields": ["colour"]})[0], 400)
+        self.assertEqual(self.request(server, "/batch", {"messages": "no"})[0], 400)
+        self.assertEqual(self.request(server, "/nowhere", {})[0], 404)
+
+    def test_concurrent_requests_are_batched(self):
+        server = self.start(max_batch=8, max_wait=0.05)
+        with ThreadPoolExecutor(8) as pool:
+            statuses = list(pool.map(lambda _: self.request(server, "/classify", {"text": FINANCIAL})[0], range(16)))
+        self.assertEqual(statuses, [200] * 16)
+        self.assertLess(server.extractor._classifier.batches, 16)
+
+    @unittest.skipUnless(importlib.util.find_spec("spacy"), "spaCy is not installed")
+    def test_ner(self):
+        server = self.start(ner=True)
+        self.assertEqual(self.request(server, "/readyz")[1]["models"], {"classifier": True, "ner": True})
+        status, result = self.request(server, "/extract", {"text": FINANCIAL, "fields": ["amount"]})
+        self.assertEqual(status, 200)
+        self.assertEqual(result["entities"], plain(recognize_entities([FINANCIAL])[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
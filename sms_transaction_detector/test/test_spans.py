@@ -0,0 +1,93 @@
+import unittest
+import importlib.util
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.transaction_extractor import extract_transaction_details
+from extractor.templates import TemplateCache
+from extractor.helpers.amount_helpers import match_amount_pattern, match_amount_pattern_with_span
+from extractor.helpers.date_helpers import (
+    match_date_patterns, match_date_patterns_with_span, match_relative_dates, match_relative_dates_with_span,
+    EXPLICIT_PATTERNS
+)
+
+NOW = datetime(2025, 4, 10, 12, 0)
+
+spec = importlib.util.spec_from_file_location(
+    "fallback_rules", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml-model", "fallback_rules.py"))
+fallback_rules = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fallback_rules)
+
+def text_at(sms, field):
+    start, end = field["span"]
+    return sms[start:end]
+
+class TestSpans(unittest.TestCase):
+
+    def test_helpers_keep_their_shape(self):
+        # The helpers return (value, confidence); the *_with_span variants add the span
+        sms = "Rs.500 paid on 05/04/25, today"
+        self.assertEqual(match_amount_pattern(sms), ("500", 1.0))
+        self.assertEqual(match_amount_pattern_with_span(sms), ("500", 1.0, (0, 6)))
+        patterns = [(pattern, "%d/%m/%y") for pattern in EXPLICIT_PATTERNS[:1]]
+        self.assertEqual(match_date_patterns(sms, patterns, NOW), ("2025-04-05", 0.95))
+        self.assertEqual(match_date_patterns_with_span(sms, patterns, NOW)[2], (15, 23))
+        self.assertEqual(match_relative_dates(sms, NOW), ("2025-04-10", 0.85))
+        self.assertEqual(match_relative_dates_with_span(sms, NOW)[2], (25, 30))
+
+    def test_spans_of_fields(self):
+        sms = "Sent Rs.1,250.00 From HDFC Bank A/C XX1234 To ravi77@okaxis On 05/04/25 Ref 512345678901"
+        details = extract_transaction_details(sms, NOW)
+        self.assertEqual(text_at(sms, details["amount"]), "Rs.1,250.00")
+        self.assertEqual(text_at(sms, details["date"]), "05/04/25")
+        self.assertEqual(text_at(sms, details["payee"]), "ravi77@okaxis")
+        self.assertEqual(text_at(sms, details["transaction_type"]), "Sent")
+        self.assertEqual(text_at(sms, details["account_from"]), "1234")
+        self.assertEqual(text_at(sms, details["bank"]), "HDFC Bank")
+        self.assertIsNone(details["account_to"]["span"])
+
+    def test_spans_in_original_text(self):
+        # The fields are read from the canonical text ("Rs 1,200.00", single blanks)
+        sms = "INR  1,200.00 credited to your  a/c XX1234 yesterday"
+        details = extract_transaction_details(sms, NOW)
+        self.assertEqual(text_at(sms, details["amount"]), "INR  1,200.00")
+        self.assertEqual(text_at(sms, details["account_to"]), "1234")
+        self.assertEqual(text_at(sms, details["date"]), "yesterday")
+
+    def test_template_spans(self):
+        cache = TemplateCache()
+        template = "Sent Rs.{} From HDFC Bank A/C XX1234 To ravi@okaxis On 05/04/25"
+        for amount in ("1,250.00", "99.50", "3,040.75"):
+            sms = template.format(amount)
+            result = cache.extract(sms, NOW)
+            self.assertEqual(result, extract_transaction_details(sms, NOW))
+            self.assertEqual(text_at(sms, result["amount"]), "Rs." + amount)
+
+    def test_fallback_spans(self):
+        sms = "Rs.500 paid to Ravi Kumar on 05-04-2025 from HDFC Bank"
+        result = {field: {"value": None, "confidence": 0.0} for field in
+                  ("amount", "date", "bank", "transaction_type", "payee", "account_from", "account_to")}
+        fallback_rules.apply_fallback_rules(sms, result)
+        for field in ("amount", "date", "payee"):
+            self.assertEqual(text_at(sms, result[field]), result[field]["value"])
+        self.assertEqual(text_at(sms, result["bank"]), "HDFC Bank")
+        self.assertEqual(text_at(sms, result["transaction_type"]), "paid")
+        self.assertNotIn("span", result["account_from"])
+
+    def test_fallback_banks_from_alias_table(self):
+        for sms, bank in (("Rs.500 credited to your Citi Bank a/c", "CITI"),
+                          ("Rs.500 credited to your YES BANK a/c", "Yes Bank"),
+                          ("Paid yesterday at Bob's, Rs.500", None)):
+            result = {"bank": {"value": None, "confidence": 0.0}, "amount": {"value": "500"},
+                      "date": {"value": "x"}, "transaction_type": {"value": "x"}, "payee": {"value": "x"},
+                      "account_from": {"value": "x"}, "account_to": {"value": "x"}}
+            fallback_rules.apply_fallback_rules(sms, result)
+            self.assertEqual(result["bank"]["value"], bank)
+
+
+if __name__ == "__main__":
+    unittest.main()
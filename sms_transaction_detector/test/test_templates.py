@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.templates import TemplateCache, skeleton, CONST, SPAN, AMOUNT, DATE
+from extractor.transaction_extractor import extract_transaction_details
+from extractor.normalizer import normalize_sms
+
+NOW = datetime(2025, 4, 10, 12, 0)
+
+TEMPLATE = "Sent Rs.{} From HDFC Bank A/C XX{} To ravi{}@okaxis On {}/04/25 Ref {}"
+MESSAGES = [
+    TEMPLATE.format("1,250.00", "1234", "77", "05", "512345678901"),
+    TEMPLATE.format("9,999.50", "5678", "31", "17", "598765432109"),
+    TEMPLATE.format("3,040.75", "9013", "09", "28", "500000000001"),
+    TEMPLATE.format("7,110.10", "3456", "54", "30", "511111111111"),
+    TEMPLATE.format("4,800.00", "0987", "18", "31", "522222222222"),  # 31/04 is no date
+]
+
+class TestTemplates(unittest.TestCase):
+
+    def test_skeleton(self):
+        self.assertEqual(skeleton(MESSAGES[0]), skeleton(MESSAGES[1]))
+        self.assertEqual(skeleton("Rs.1,250.00 to ravi77@okaxis"), "Rs.0,000.00 to ravi00@okaxis")
+        # "2 " reads as "to " for the payee patterns
+        self.assertNotEqual(skeleton("Rs.12 Ravi Kumar"), skeleton("Rs.13 Ravi Kumar"))
+
+    def test_same_result_as_full_extraction(self):
+        cache = TemplateCache()
+        for _ in range(2):
+            for sms in MESSAGES:
+                self.assertEqual(cache.extract(sms, NOW), extract_transaction_details(sms, NOW))
+        self.assertEqual(cache.stats(), {"templates": 1, "hits": 9, "misses": 1, "compiles": 1, "rejects": 0})
+        recipes = {field: kind for field, (kind, _, _) in cache._templates[skeleton(normalize_sms(MESSAGES[0]).text)].recipes.items()}
+        self.assertEqual(recipes["amount"], AMOUNT)
+        self.assertEqual(recipes["date"], DATE)
+        self.assertEqual(recipes["transaction_type"], CONST)
+        self.assertEqual(recipes["payee"], SPAN)
+
+    def test_relative_date_follows_now(self):
+        cache = TemplateCache()
+        later = datetime(2025, 5, 1, 9, 0)
+        for sms in ("Rs.120 debited from A/c XX1234 yesterday", "Rs.99 paid today to Ravi"):
+            for now in (NOW, NOW, NOW, later):
+                self.assertEqual(cache.extract(sms, now), extract_transaction_details(sms, now))
+            recipes = cache._templates[skeleton(normalize_sms(sms).text)].recipes
+            self.assertNotEqual(recipes["date"][0], CONST)
+
+    def test_least_recent_template_dropped(self):
+        cache = TemplateCache(max_templates=2)
+        for sms in ("Rs.10 paid at A", "Rs.10 paid at B", "Rs.20 paid at A", "Rs.10 paid at C"):
+            cache.extract(sms, NOW)
+        self.assertEqual(len(cache), 2)
+        cache.extract("Rs.10 paid at B", NOW)
+        self.assertEqual((cache.hits, cache.misses, cache.compiles), (1, 4, 4))
+
+    def test_results_are_not_shared(self):
+        cache = TemplateCache()
+        cache.extract(MESSAGES[0], NOW)["transaction_type"]["value"] = "changed"
+        self.assertEqual(cache.extract(MESSAGES[1], NOW), extract_transaction_details(MESSAGES[1], NOW))
+
+
+if __name__ == "__main__":
+    unittest.main()